@@ -24,6 +24,7 @@ from src.scrapers.scrape_realtor import scrape_ottawa_listings  # Original scrap
 from src.scrapers.realtor_scraper import scrape_realtor_listings  # New Selenium-based scraper
 from src.scrapers.commute_time import scrape_commute_data
 from src.merge_data import create_final_dataset
+from src.address import unique_addresses
 from src.config import GOOGLE_MAPS_API_KEY, DEFAULT_DESTINATION
 # Import sample data generation
 from src.sample_data import generate_sample_listings, generate_sample_commute_data
@@ -140,8 +141,8 @@ def show_results():
                 commute_mode=commute_mode
             )
         
-        # Get addresses
-        addresses = realtor_df['address'].tolist()
+        # Get distinct addresses; the merge fans commute results back out to every listing
+        addresses = unique_addresses(realtor_df['address'].tolist())
         
         # Try to use real commute data if possible
         try:
@@ -0,0 +1,322 @@
+"""
+Address canonicalization.
+
+The same listing address arrives in many spellings, e.g.
+"#1203 - 160 GEORGE STREET|Ottawa, Ontario K1N9M2" from Realtor.ca and
+"160 George St Unit 1203, Ottawa, ON K1N 9M2" elsewhere. parse_address()
+splits an address into unit, number, street, suffix, direction, city,
+province and postal code, and canonical_key() turns those parts into a
+stable key. Enrichment stages run once per key, and merges and caches join
+on it.
+"""
+import hashlib
+import re
+from collections import namedtuple
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+
+ParsedAddress = namedtuple(
+    "ParsedAddress",
+    ["unit", "number", "street", "suffix", "direction", "city", "province", "postal_code"]
+)
+
+# Canada Post street type abbreviations (plus a few common US spellings)
+STREET_SUFFIXES = {
+    "avenue": "ave", "av": "ave", "ave": "ave",
+    "boulevard": "blvd", "blvd": "blvd",
+    "circle": "circ", "circ": "circ",
+    "court": "crt", "ct": "crt", "crt": "crt",
+    "crescent": "cres", "cr": "cres", "cres": "cres",
+    "drive": "dr", "dr": "dr",
+    "gate": "gate",
+    "grove": "grove",
+    "heights": "hts", "hts": "hts",
+    "highway": "hwy", "hwy": "hwy",
+    "lane": "lane", "ln": "lane",
+    "parkway": "pky", "pkwy": "pky", "pky": "pky",
+    "place": "pl", "pl": "pl",
+    "private": "pvt", "pvt": "pvt",
+    "road": "rd", "rd": "rd",
+    "square": "sq", "sq": "sq",
+    "street": "st", "st": "st",
+    "terrace": "terr", "terr": "terr",
+    "trail": "trail",
+    "way": "way",
+}
+
+DIRECTIONS = {
+    "north": "n", "n": "n",
+    "south": "s", "s": "s",
+    "east": "e", "e": "e",
+    "west": "w", "w": "w",
+    "northeast": "ne", "ne": "ne",
+    "northwest": "nw", "nw": "nw",
+    "southeast": "se", "se": "se",
+    "southwest": "sw", "sw": "sw",
+}
+
+PROVINCES = {
+    "ontario": "on", "on": "on", "ont": "on",
+    "quebec": "qc", "québec": "qc", "qc": "qc", "que": "qc",
+    "british columbia": "bc", "bc": "bc",
+    "alberta": "ab", "ab": "ab",
+    "manitoba": "mb", "mb": "mb",
+    "saskatchewan": "sk", "sk": "sk",
+    "nova scotia": "ns", "ns": "ns",
+    "new brunswick": "nb", "nb": "nb",
+    "newfoundland and labrador": "nl", "nl": "nl",
+    "prince edward island": "pe", "pe": "pe", "pei": "pe",
+}
+
+UNIT_WORDS = r"(?:unit|apt|apartment|suite|ste|#)"
+# Penthouse units keep their marker: "PH 1", "PH1" and "Penthouse 1" are all unit "ph1"
+_PENTHOUSE_UNIT = r"(penthouse|ph)(?:\s*(\d\w*|[a-z]))?"
+
+_POSTAL_CODE = re.compile(r"\b([a-z]\d[a-z])\s?(\d[a-z]\d)\b")
+_COORDINATES = re.compile(r"^\s*(-?\d{1,3}(?:\.\d+)?)\s*,\s*(-?\d{1,3}(?:\.\d+)?)\s*$")
+# "1203-160 george st" or "#1203 - 160 george st": unit before the civic number
+_UNIT_PREFIX = re.compile(rf"^(?:{_PENTHOUSE_UNIT}|{UNIT_WORDS}?\s*(\w+))\s*-\s*(\d+[a-z]?)\s+(.+)$")
+# "unit 1203", "apt 5", "suite 200", "#12" or "ph 1" anywhere in the street line
+_UNIT_WORD = re.compile(rf"(?:^|\s)(?:{_PENTHOUSE_UNIT}|{UNIT_WORDS}\s*(\w+))(?=\s|$)")
+_UNIT_ONLY = re.compile(rf"^(?:{_PENTHOUSE_UNIT}|{UNIT_WORDS}\s*\w+)$")
+_CIVIC_NUMBER = re.compile(r"^(\d+[a-z]?)\s+(.+)$")
+# A province trailing the city ("ottawa on"); longest names first so "ont" wins over "on"
+_PROVINCE_SUFFIX = re.compile(r"\s(" + "|".join(sorted(map(re.escape, PROVINCES), key=len, reverse=True)) + r")$")
+_APOSTROPHES = re.compile(r"['’]")
+_PUNCTUATION = re.compile(r"[^\w\s#,-]")
+_SPACES = re.compile(r"\s+")
+
+def _clean(text):
+    """Lowercase, drop punctuation other than '#', '-' and ',' and collapse whitespace."""
+    text = _APOSTROPHES.sub("", text.lower())
+    text = _PUNCTUATION.sub(" ", text)
+    return _SPACES.sub(" ", text).strip()
+
+def _unit(penthouse, penthouse_unit, unit):
+    """Unit from the groups of a unit pattern, prefixed with 'ph' for penthouses."""
+    return f"ph{penthouse_unit or ''}" if penthouse else unit
+
+def _parse_street_line(line):
+    """Split the street line into (unit, number, street, suffix, direction)."""
+    unit = number = None
+    match = _UNIT_PREFIX.match(line)
+    if match:
+        unit, number, line = _unit(*match.groups()[:3]), match.group(4), match.group(5)
+    else:
+        match = _UNIT_WORD.search(line)
+        if match:
+            unit = _unit(*match.groups())
+            line = (line[:match.start()] + " " + line[match.end():]).strip()
+        match = _CIVIC_NUMBER.match(line)
+        if match:
+            number, line = match.groups()
+
+    tokens = line.replace("-", " ").split()
+    direction = suffix = None
+    if len(tokens) > 1 and tokens[-1] in DIRECTIONS:
+        direction = DIRECTIONS[tokens.pop()]
+    if len(tokens) > 1 and tokens[-1] in STREET_SUFFIXES:
+        suffix = STREET_SUFFIXES[tokens.pop()]
+    return unit, number, " ".join(tokens) or None, suffix, direction
+
+def parse_address(address):
+    """
+    Parse an address into its components.
+
+    Args:
+        address (str): Address text
+
+    Returns:
+        ParsedAddress: Lowercased, abbreviated components; None where absent
+    """
+    text = _clean(str(address).replace("|", ","))
+
+    postal_code = None
+    matches = list(_POSTAL_CODE.finditer(text))
+    if matches:
+        last = matches[-1]
+        postal_code = f"{last.group(1)} {last.group(2)}".upper()
+        text = text[:last.start()] + text[last.end():]
+
+    parts = [part.strip(" -") for part in text.split(",")]
+    parts = [part for part in parts if part]
+    if not parts:
+        return ParsedAddress(None, None, None, None, None, None, None, postal_code)
+
+    # "Apt 5, 22 Main St" or "22 Main St, Apt 5, Ottawa": a unit written as its own part belongs
+    # to the street line
+    if len(parts) > 1 and _UNIT_ONLY.match(parts[0]):
+        parts = [f"{parts[1]} {parts[0]}"] + parts[2:]
+    units = [part for part in parts[1:] if _UNIT_ONLY.match(part)]
+    if units:
+        parts = [" ".join([parts[0]] + units)] + [part for part in parts[1:] if not _UNIT_ONLY.match(part)]
+
+    province = None
+    if len(parts) > 1:
+        # The province is either its own part or trails the city ("ottawa on")
+        last = parts[-1]
+        if last in PROVINCES:
+            province = PROVINCES[parts.pop()]
+        else:
+            match = _PROVINCE_SUFFIX.search(last)
+            if match:
+                province = PROVINCES[match.group(1)]
+                parts[-1] = last[:match.start()].strip()
+
+    # Anything between the street line and the city (e.g. a neighbourhood) is dropped
+    city = parts[-1] if len(parts) > 1 else None
+    unit, number, street, suffix, direction = _parse_street_line(parts[0])
+    return ParsedAddress(unit, number, street, suffix, direction, city, province, postal_code)
+
+@lru_cache(maxsize=65536)
+def canonical_key(address):
+    """
+    Build the stable key for an address.
+
+    Spelling variants of the same address (unit notation, street type
+    abbreviations, case, punctuation, province and postal code formatting)
+    map to the same key, e.g. "1203-160 george st, ottawa". The postal code
+    stands in for the city when there is none, so addresses without a city
+    are not all merged by street line. The province is only kept when there
+    is neither, since it is often missing from one of the spellings.
+    Coordinates ("45.42,-75.69") are kept as given.
+
+    Args:
+        address (str): Address text
+
+    Returns:
+        str: Canonical key ('' for a missing address)
+    """
+    if address is None or (isinstance(address, float) and address != address):
+        return ""
+    coordinates = _COORDINATES.match(str(address))
+    if coordinates:
+        return f"{float(coordinates.group(1)):.6f},{float(coordinates.group(2)):.6f}"
+
+    parsed = parse_address(address)
+    if not parsed.number and not parsed.street:
+        return re.sub(r"[\s,]+", " ", _clean(str(address))).strip()
+    place = parsed.city or (parsed.postal_code.lower() if parsed.postal_code else None) or parsed.province
+    return ", ".join(part for part in (street_line(parsed), place) if part)
+
+def street_line(parsed):
+    """
+    Format the street line of a parsed address, e.g. "1203-160 george st".
+
+    Args:
+        parsed (ParsedAddress): Output of parse_address()
+
+    Returns:
+        str: Unit, civic number, street, suffix and direction
+    """
+    civic = f"{parsed.unit}-{parsed.number}" if parsed.unit and parsed.number else (parsed.number or "")
+    return " ".join(part for part in (civic, parsed.street, parsed.suffix, parsed.direction) if part)
+
+def street_key(address):
+    """
+    Build the key of the building an address belongs to.
+
+    Like canonical_key() but without the unit and the city, so every unit of
+    a building and every municipality name used for it map to the same
+    address point, e.g. "160 george st".
+
+    Args:
+        address (str): Address text
+
+    Returns:
+        str: Street key, or None when the address has no civic number or street
+    """
+    if address is None or (isinstance(address, float) and address != address):
+        return None
+    parsed = parse_address(address)
+    if not parsed.number or not parsed.street:
+        return None
+    return " ".join(part for part in (parsed.number, parsed.street, parsed.suffix, parsed.direction) if part)
+
+def place_name(text):
+    """
+    Normalize a city or municipality name the way parse_address() does, e.g. "St. Albert" -> "st albert".
+
+    Returns:
+        str: Normalized name, or None when empty or missing
+    """
+    if text is None or (isinstance(text, float) and text != text):
+        return None
+    return _clean(str(text)) or None
+
+def qualified_street_keys(address):
+    """
+    Build the street keys an address can be geocoded by, most specific first.
+
+    The same civic address exists in many municipalities, so the street key
+    is qualified by the city and by the postal code's FSA where the address
+    has them, e.g. ["160 george st, ottawa", "160 george st, k1n", "160 george st"].
+
+    Args:
+        address (str): Address text
+
+    Returns:
+        list: Keys (empty when the address has no civic number or street)
+    """
+    street = street_key(address)
+    if not street:
+        return []
+    parsed = parse_address(address)
+    places = (parsed.city, parsed.postal_code[:3].lower() if parsed.postal_code else None)
+    return [f"{street}, {place}" for place in places if place] + [street]
+
+def key_hash(key):
+    """
+    Stable signed 64-bit hash of a key.
+
+    Unlike hash(), the value is the same in every process and run, so it can
+    be stored in on-disk indexes.
+
+    Args:
+        key (str): Key text
+
+    Returns:
+        int: Hash value
+    """
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little", signed=True)
+
+def address_codes(*columns):
+    """
+    Number the canonical keys of several address columns consistently.
+
+    The columns are factorized together, so each distinct spelling is
+    canonicalized once however many rows and columns it appears in, and the
+    keys are then factorized into dense int64 codes that are equal exactly
+    when the canonical keys are.
+
+    Args:
+        *columns (array-like): Address texts
+
+    Returns:
+        list: int64 code array per column; -1 where the address is missing
+    """
+    lengths = [len(column) for column in columns]
+    spellings = pd.Series(np.concatenate([np.asarray(column, dtype=object) for column in columns])
+                          if columns else [], dtype=object)
+    codes, uniques = pd.factorize(spellings)
+    # The spellings are already distinct, so bypass the canonical_key() memo
+    keys = pd.Series([canonical_key.__wrapped__(address) for address in uniques], dtype=object)
+    key_codes, _ = pd.factorize(keys.where(keys != ""))
+    codes = np.where(codes >= 0, key_codes[np.maximum(codes, 0)] if len(key_codes) else -1, -1)
+    return np.split(codes.astype(np.int64), np.cumsum(lengths)[:-1])
+
+def unique_addresses(addresses):
+    """
+    Keep the first spelling of every distinct address.
+
+    Args:
+        addresses (list): Addresses, possibly with duplicates and spelling variants
+
+    Returns:
+        list: One address per canonical key, in first-seen order
+    """
+    representatives = {}
+    for address in addresses:
+        representatives.setdefault(canonical_key(address), address)
+    return list(representatives.values())
@@ -0,0 +1,275 @@
+"""
+Persistent cache for commute times.
+
+Results are stored in SQLite, keyed by the canonical origin and destination
+addresses, travel mode and an optional departure-time bucket. Entries expire
+after a TTL and the least recently used ones are evicted once the cache grows
+past its size cap.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import logging
+from datetime import datetime
+
+from src.config import (COMMUTE_CACHE_PATH, COMMUTE_CACHE_TTL, COMMUTE_CACHE_MAX_ENTRIES,
+                        COMMUTE_CACHE_BUCKET_SECONDS)
+from src.address import canonical_key
+
+logger = logging.getLogger(__name__)
+
+# Element statuses that describe the route itself (worth caching), as opposed
+# to transient failures such as OVER_QUERY_LIMIT or a dropped connection
+CACHEABLE_STATUSES = {"OK", "NOT_FOUND", "ZERO_RESULTS"}
+
+class CommuteCache:
+    """SQLite-backed commute cache with TTL expiry and an LRU size cap."""
+
+    def __init__(self, path=COMMUTE_CACHE_PATH, ttl=COMMUTE_CACHE_TTL,
+                 max_entries=COMMUTE_CACHE_MAX_ENTRIES, bucket_seconds=COMMUTE_CACHE_BUCKET_SECONDS):
+        """
+        Open (or create) the cache.
+
+        Args:
+            path (str): SQLite file path, or ':memory:'
+            ttl (int): Seconds an entry stays valid
+            max_entries (int): Maximum number of entries kept
+            bucket_seconds (int): Width of the departure-time buckets within a week
+        """
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.bucket_seconds = bucket_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS commute_cache (
+                key TEXT PRIMARY KEY,
+                result TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_commute_cache_last_access ON commute_cache (last_access)"
+        )
+        self._conn.commit()
+
+    def departure_bucket(self, departure_time):
+        """
+        Map a departure time to its slot within the week.
+
+        Departures at the same weekday and time of day share a bucket, so a
+        Tuesday 8:00 commute routed last week is reused this week.
+
+        Args:
+            departure_time (int or str): 'now', a Unix timestamp, or None
+
+        Returns:
+            int: Bucket number, or None when no departure time was given
+        """
+        if departure_time is None:
+            return None
+        timestamp = time.time() if departure_time == "now" else float(departure_time)
+        moment = datetime.fromtimestamp(timestamp)
+        seconds_into_week = (moment.weekday() * 24 * 3600 + moment.hour * 3600
+                             + moment.minute * 60 + moment.second)
+        return int(seconds_into_week // self.bucket_seconds)
+
+    def make_key(self, origin, destination, mode="driving", departure_time=None):
+        """
+        Build the cache key for a route.
+
+        Args:
+            origin (str): Origin address
+            destination (str): Destination address
+            mode (str): Travel mode
+            departure_time (int or str): Departure time (optional)
+
+        Returns:
+            str: Cache key
+        """
+        bucket = self.departure_bucket(departure_time)
+        return "|".join([
+            canonical_key(origin),
+            canonical_key(destination),
+            mode,
+            "" if bucket is None else str(bucket)
+        ])
+
+    def get_many(self, origins, destination, mode="driving", departure_time=None):
+        """
+        Look up cached commutes for many origins.
+
+        Args:
+            origins (list): Origin addresses
+            destination (str): Destination address
+            mode (str): Travel mode
+            departure_time (int or str): Departure time (optional)
+
+        Returns:
+            dict: Origin to cached commute dict, for cache hits only
+        """
+        keys = {origin: self.make_key(origin, destination, mode, departure_time) for origin in origins}
+        if not keys:
+            return {}
+
+        now = time.time()
+        found = {}
+        unique_keys = list(set(keys.values()))
+        with self._lock:
+            # SQLite limits the number of bound parameters per statement
+            for i in range(0, len(unique_keys), 500):
+                chunk = unique_keys[i:i + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, result FROM commute_cache WHERE key IN ({placeholders}) AND created_at >= ?",
+                    chunk + [now - self.ttl]
+                ).fetchall()
+                found.update({key: json.loads(result) for key, result in rows})
+
+            if found:
+                self._conn.executemany(
+                    "UPDATE commute_cache SET last_access = ? WHERE key = ?",
+                    [(now, key) for key in found]
+                )
+                self._conn.commit()
+
+        results = {origin: found[key] for origin, key in keys.items() if key in found}
+        self.hits += len(results)
+        self.misses += len(keys) - len(results)
+        return results
+
+    def get(self, origin, destination, mode="driving", departure_time=None):
+        """
+        Look up a single cached commute.
+
+        Returns:
+            dict: Cached commute dict, or None on a miss
+        """
+        return self.get_many([origin], destination, mode, departure_time).get(origin)
+
+    def put_many(self, results, destination, mode="driving", departure_time=None):
+        """
+        Store commutes for many origins.
+
+        Transient failures (rate limits, network errors) are not stored.
+
+        Args:
+            results (dict): Origin to commute dict
+            destination (str): Destination address
+            mode (str): Travel mode
+            departure_time (int or str): Departure time (optional)
+        """
+        now = time.time()
+        rows = []
+        for origin, result in results.items():
+            status = result.get("status", "OK" if result.get("value") is not None else None)
+            if status not in CACHEABLE_STATUSES:
+                continue
+            key = self.make_key(origin, destination, mode, departure_time)
+            rows.append((key, json.dumps(result), now, now))
+        if not rows:
+            return
+
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO commute_cache (key, result, created_at, last_access) VALUES (?, ?, ?, ?)",
+                rows
+            )
+            self._conn.commit()
+        self.evict()
+
+    def put(self, origin, destination, result, mode="driving", departure_time=None):
+        """Store a single commute."""
+        self.put_many({origin: result}, destination, mode, departure_time)
+
+    def evict(self):
+        """
+        Drop expired entries and trim the cache to max_entries by last access.
+
+        Returns:
+            int: Number of entries removed
+        """
+        with self._lock:
+            removed = self._conn.execute(
+                "DELETE FROM commute_cache WHERE created_at < ?", (time.time() - self.ttl,)
+            ).rowcount
+            size = self._conn.execute("SELECT COUNT(*) FROM commute_cache").fetchone()[0]
+            if size > self.max_entries:
+                removed += self._conn.execute(
+                    "DELETE FROM commute_cache WHERE key IN "
+                    "(SELECT key FROM commute_cache ORDER BY last_access ASC LIMIT ?)",
+                    (size - self.max_entries,)
+                ).rowcount
+            self._conn.commit()
+        if removed:
+            logger.info(f"Evicted {removed} commute cache entries")
+        return removed
+
+    def entries(self, mode=None):
+        """
+        Iterate over unexpired entries, e.g. to calibrate offline estimates.
+
+        Args:
+            mode (str): Only yield entries for this travel mode (optional)
+
+        Yields:
+            tuple: (origin key, destination key, mode, result dict)
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, result FROM commute_cache WHERE created_at >= ?", (time.time() - self.ttl,)
+            ).fetchall()
+        for key, result in rows:
+            origin, destination, entry_mode, _ = key.split("|")
+            if mode is None or entry_mode == mode:
+                yield origin, destination, entry_mode, json.loads(result)
+
+    def stats(self):
+        """
+        Get cache statistics.
+
+        Returns:
+            dict: Hits, misses, hit rate and current size
+        """
+        with self._lock:
+            size = self._conn.execute("SELECT COUNT(*) FROM commute_cache").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "size": size
+        }
+
+    def clear(self):
+        """Remove every entry."""
+        with self._lock:
+            self._conn.execute("DELETE FROM commute_cache")
+            self._conn.commit()
+
+    def close(self):
+        """Close the database connection."""
+        self._conn.close()
+
+_default_cache = None
+
+def get_default_cache():
+    """
+    Get the process-wide commute cache at COMMUTE_CACHE_PATH.
+
+    Returns:
+        CommuteCache: Shared cache instance
+    """
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = CommuteCache()
+    return _default_cache
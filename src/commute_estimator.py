@@ -0,0 +1,205 @@
+"""
+Offline commute estimates from coordinates.
+
+Estimates distance and travel time for every listing/destination pair at once
+with NumPy: great-circle distance, scaled by a per-mode detour factor, divided
+by a per-mode speed, plus a fixed per-mode overhead (parking, waiting for a
+bus). The factors start from rough defaults and can be calibrated against
+Distance Matrix results already in the commute cache.
+"""
+import json
+import os
+import logging
+import numpy as np
+
+from src.config import COMMUTE_ESTIMATOR_PATH
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_M = 6371000
+
+# Rough defaults for Ottawa; replaced by calibrate() when cached routes are available
+DEFAULT_MODE_PROFILES = {
+    "driving": {"speed_kmh": 40.0, "detour": 1.35, "overhead_s": 120.0},
+    "transit": {"speed_kmh": 20.0, "detour": 1.40, "overhead_s": 600.0},
+    "bicycling": {"speed_kmh": 15.0, "detour": 1.25, "overhead_s": 60.0},
+    "walking": {"speed_kmh": 5.0, "detour": 1.20, "overhead_s": 0.0},
+}
+
+# Calibration needs at least this many routes for a mode
+MIN_CALIBRATION_SAMPLES = 10
+
+def haversine_matrix(lats, lons, dest_lats, dest_lons):
+    """
+    Great-circle distances between every origin and every destination.
+
+    Args:
+        lats, lons (array-like): Origin coordinates in decimal degrees, shape (n,)
+        dest_lats, dest_lons (array-like): Destination coordinates, shape (m,)
+
+    Returns:
+        ndarray: Distances in meters, shape (n, m)
+    """
+    phi1 = np.radians(np.asarray(lats, dtype=np.float64))[:, None]
+    lam1 = np.radians(np.asarray(lons, dtype=np.float64))[:, None]
+    phi2 = np.radians(np.asarray(dest_lats, dtype=np.float64))[None, :]
+    lam2 = np.radians(np.asarray(dest_lons, dtype=np.float64))[None, :]
+
+    a = (np.sin((phi2 - phi1) / 2) ** 2
+         + np.cos(phi1) * np.cos(phi2) * np.sin((lam2 - lam1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+class CommuteEstimator:
+    """Vectorized commute estimates with per-mode speed, detour and overhead."""
+
+    def __init__(self, profiles=None):
+        """
+        Initialize the estimator.
+
+        Args:
+            profiles (dict): Mode to {'speed_kmh', 'detour', 'overhead_s'}
+                (defaults to DEFAULT_MODE_PROFILES)
+        """
+        self.profiles = {mode: dict(profile) for mode, profile in (profiles or DEFAULT_MODE_PROFILES).items()}
+
+    def estimate(self, lats, lons, destinations, mode="driving"):
+        """
+        Estimate road distance and travel time for all origin/destination pairs.
+
+        Args:
+            lats, lons (array-like): Listing coordinates, shape (n,); NaN for unknown
+            destinations (list): (lat, lon) tuples, length m
+            mode (str): Travel mode
+
+        Returns:
+            tuple: (distance_m, duration_s) arrays of shape (n, m)
+        """
+        profile = self.profiles[mode]
+        dest = np.asarray(destinations, dtype=np.float64).reshape(-1, 2)
+        crow = haversine_matrix(lats, lons, dest[:, 0], dest[:, 1])
+        distance = crow * profile["detour"]
+        duration = profile["overhead_s"] + distance / (profile["speed_kmh"] / 3.6)
+        return distance, duration
+
+    def clearly_exceeds(self, lats, lons, destination, max_commute_seconds, mode="driving", margin=1.3):
+        """
+        Flag listings whose commute is clearly over a limit.
+
+        A listing is flagged only if even its estimate divided by margin is
+        over the limit, so the estimate's error does not drop listings that
+        might qualify. Listings without coordinates are never flagged.
+
+        Args:
+            lats, lons (array-like): Listing coordinates, shape (n,); NaN for unknown
+            destination (tuple): (lat, lon) of the destination
+            max_commute_seconds (float): Commute limit
+            mode (str): Travel mode
+            margin (float): Safety factor applied to the estimate
+
+        Returns:
+            ndarray: Boolean mask of shape (n,)
+        """
+        _, duration = self.estimate(lats, lons, [destination], mode)
+        duration = duration[:, 0]
+        return np.nan_to_num(duration / margin, nan=0.0) > max_commute_seconds
+
+    def calibrate(self, samples, mode):
+        """
+        Fit speed, detour and overhead for a mode from routed samples.
+
+        The detour is the median ratio of road distance to great-circle
+        distance; speed and overhead come from a least-squares line of
+        duration against road distance.
+
+        Args:
+            samples (DataFrame or dict of arrays): origin_lat, origin_lon,
+                dest_lat, dest_lon, distance_value (m) and commute_time_seconds
+            mode (str): Travel mode the samples were routed with
+
+        Returns:
+            dict: The updated profile, or None if there were too few samples
+        """
+        origin_lat = np.asarray(samples["origin_lat"], dtype=np.float64)
+        origin_lon = np.asarray(samples["origin_lon"], dtype=np.float64)
+        dest_lat = np.asarray(samples["dest_lat"], dtype=np.float64)
+        dest_lon = np.asarray(samples["dest_lon"], dtype=np.float64)
+        road = np.asarray(samples["distance_value"], dtype=np.float64)
+        duration = np.asarray(samples["commute_time_seconds"], dtype=np.float64)
+
+        # Pairwise (not all-pairs) great-circle distance
+        phi1, phi2 = np.radians(origin_lat), np.radians(dest_lat)
+        a = (np.sin((phi2 - phi1) / 2) ** 2
+             + np.cos(phi1) * np.cos(phi2) * np.sin(np.radians(dest_lon - origin_lon) / 2) ** 2)
+        crow = 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+        valid = np.isfinite(crow) & np.isfinite(road) & np.isfinite(duration) & (crow > 100) & (duration > 0)
+        if valid.sum() < MIN_CALIBRATION_SAMPLES:
+            logger.warning(f"Only {int(valid.sum())} usable routes for {mode}; keeping current profile")
+            return None
+
+        detour = float(np.median(road[valid] / crow[valid]))
+        slope, intercept = np.polyfit(road[valid], duration[valid], 1)
+        if slope <= 0:
+            logger.warning(f"Calibration for {mode} gave a non-positive slope; keeping current profile")
+            return None
+
+        profile = {
+            "speed_kmh": float(3.6 / slope),
+            "detour": max(1.0, detour),
+            "overhead_s": max(0.0, float(intercept))
+        }
+        self.profiles[mode] = profile
+        logger.info(f"Calibrated {mode} from {int(valid.sum())} routes: {profile}")
+        return profile
+
+    def calibrate_from_cache(self, cache, locate, mode="driving"):
+        """
+        Calibrate a mode from routes stored in the commute cache.
+
+        Args:
+            cache (CommuteCache): Commute cache with routed results
+            locate (callable): Maps a canonical address key to (lat, lon) or None
+            mode (str): Travel mode
+
+        Returns:
+            dict: The updated profile, or None if there were too few samples
+        """
+        rows = []
+        for origin, destination, _, result in cache.entries(mode):
+            if result.get("value") is None or result.get("distance_value") is None:
+                continue
+            origin_point, dest_point = locate(origin), locate(destination)
+            if origin_point is None or dest_point is None:
+                continue
+            rows.append((*origin_point, *dest_point, result["distance_value"], result["value"]))
+
+        if not rows:
+            logger.warning(f"No locatable cached routes for {mode}")
+            return None
+        columns = np.asarray(rows, dtype=np.float64).T
+        return self.calibrate({
+            "origin_lat": columns[0], "origin_lon": columns[1],
+            "dest_lat": columns[2], "dest_lon": columns[3],
+            "distance_value": columns[4], "commute_time_seconds": columns[5]
+        }, mode)
+
+    def save(self, path=COMMUTE_ESTIMATOR_PATH):
+        """Save the mode profiles as JSON."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.profiles, f, indent=2)
+        return path
+
+    @classmethod
+    def load(cls, path=COMMUTE_ESTIMATOR_PATH):
+        """
+        Load saved mode profiles, falling back to the defaults.
+
+        Returns:
+            CommuteEstimator: Estimator with calibrated profiles where available
+        """
+        profiles = {mode: dict(profile) for mode, profile in DEFAULT_MODE_PROFILES.items()}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                profiles.update(json.load(f))
+        return cls(profiles)
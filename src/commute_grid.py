@@ -0,0 +1,222 @@
+"""
+Precomputed commute-time grids around fixed destinations.
+
+For a fixed destination, commute time varies smoothly with the origin, so it
+is routed once for the centre of every cell of a square grid around the
+destination and persisted. Listings then get their estimate by cell lookup,
+and only listings in cells where the commute limit falls between neighbouring
+cell values need an exact Distance Matrix call.
+"""
+import os
+import re
+import math
+import logging
+import numpy as np
+
+from src.config import COMMUTE_GRID_DIRECTORY, COMMUTE_GRID_CELL_METERS, COMMUTE_GRID_RADIUS_KM
+from src.scrapers.distance_matrix import DistanceMatrixClient
+
+logger = logging.getLogger(__name__)
+
+METERS_PER_DEGREE_LAT = 111320.0
+
+class CommuteGrid:
+    """Commute times from grid-cell centres to one destination."""
+
+    def __init__(self, destination, mode, origin_lat, origin_lon, cell_lat, cell_lon, durations):
+        """
+        Wrap a computed grid.
+
+        Args:
+            destination (str): Destination address
+            mode (str): Travel mode
+            origin_lat, origin_lon (float): South-west corner of the grid
+            cell_lat, cell_lon (float): Cell size in degrees
+            durations (ndarray): Seconds per cell, shape (rows, cols); NaN if unroutable
+        """
+        self.destination = destination
+        self.mode = mode
+        self.origin_lat = float(origin_lat)
+        self.origin_lon = float(origin_lon)
+        self.cell_lat = float(cell_lat)
+        self.cell_lon = float(cell_lon)
+        self.durations = np.asarray(durations, dtype=np.float32)
+        self._neighbour_min, self._neighbour_max = self._neighbour_range()
+
+    @classmethod
+    def layout(cls, destination_lat, destination_lon, radius_km=COMMUTE_GRID_RADIUS_KM,
+               cell_meters=COMMUTE_GRID_CELL_METERS):
+        """
+        Compute the grid geometry around a destination.
+
+        Returns:
+            tuple: (origin_lat, origin_lon, cell_lat, cell_lon, rows, cols)
+        """
+        cell_lat = cell_meters / METERS_PER_DEGREE_LAT
+        cell_lon = cell_meters / (METERS_PER_DEGREE_LAT * math.cos(math.radians(destination_lat)))
+        cells_per_side = 2 * int(math.ceil(radius_km * 1000 / cell_meters))
+        origin_lat = destination_lat - cells_per_side / 2 * cell_lat
+        origin_lon = destination_lon - cells_per_side / 2 * cell_lon
+        return origin_lat, origin_lon, cell_lat, cell_lon, cells_per_side, cells_per_side
+
+    def _neighbour_range(self):
+        """Min and max duration over each cell's 3x3 neighbourhood (NaN-aware)."""
+        padded = np.pad(self.durations, 1, constant_values=np.nan)
+        rows, cols = self.durations.shape
+        stack = np.stack([padded[dr:dr + rows, dc:dc + cols] for dr in range(3) for dc in range(3)])
+        with np.errstate(invalid="ignore"):
+            return np.fmin.reduce(stack, axis=0), np.fmax.reduce(stack, axis=0)
+
+    def cell_index(self, lats, lons):
+        """
+        Grid cell of each point.
+
+        Args:
+            lats, lons (array-like): Coordinates in decimal degrees
+
+        Returns:
+            tuple: (rows, cols, inside) arrays; inside is False for points off the grid
+        """
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        rows = np.floor((lats - self.origin_lat) / self.cell_lat)
+        cols = np.floor((lons - self.origin_lon) / self.cell_lon)
+        n_rows, n_cols = self.durations.shape
+        inside = (rows >= 0) & (rows < n_rows) & (cols >= 0) & (cols < n_cols)
+        rows = np.where(inside, rows, 0).astype(np.int64)
+        cols = np.where(inside, cols, 0).astype(np.int64)
+        return rows, cols, inside
+
+    def lookup(self, lats, lons):
+        """
+        Estimated commute seconds for each point.
+
+        Returns:
+            ndarray: Seconds, NaN for points off the grid or in unroutable cells
+        """
+        rows, cols, inside = self.cell_index(lats, lons)
+        return np.where(inside, self.durations[rows, cols], np.nan)
+
+    def needs_exact(self, lats, lons, max_commute_seconds, margin_seconds=120):
+        """
+        Flag points whose grid estimate cannot settle the commute limit.
+
+        A point needs an exact route when it is off the grid, when its cell or
+        a neighbour is unroutable, or when the limit (widened by margin) falls
+        within the range of its 3x3 neighbourhood.
+
+        Returns:
+            ndarray: Boolean mask
+        """
+        rows, cols, inside = self.cell_index(lats, lons)
+        low = self._neighbour_min[rows, cols]
+        high = self._neighbour_max[rows, cols]
+        near_boundary = (low - margin_seconds <= max_commute_seconds) & (max_commute_seconds <= high + margin_seconds)
+        unknown = np.isnan(self.durations[rows, cols]) | np.isnan(low)
+        return ~inside | near_boundary | unknown
+
+    def save(self, filename=None):
+        """
+        Save the grid as .npz (default: COMMUTE_GRID_DIRECTORY/<destination>_<mode>.npz).
+
+        Returns:
+            str: Path to the saved file
+        """
+        filename = filename or grid_path(self.destination, self.mode)
+        os.makedirs(os.path.dirname(filename) or ".", exist_ok=True)
+        np.savez_compressed(
+            filename,
+            destination=np.array(self.destination),
+            mode=np.array(self.mode),
+            geometry=np.array([self.origin_lat, self.origin_lon, self.cell_lat, self.cell_lon]),
+            durations=self.durations
+        )
+        logger.info(f"Commute grid saved to {filename}")
+        return filename
+
+    @classmethod
+    def load(cls, filename):
+        """Load a grid saved with save()."""
+        with np.load(filename) as data:
+            return cls(str(data["destination"]), str(data["mode"]), *data["geometry"], data["durations"])
+
+def grid_path(destination, mode):
+    """Default file for a destination and mode's grid."""
+    slug = re.sub(r"[^a-z0-9]+", "_", destination.lower()).strip("_")
+    return os.path.join(COMMUTE_GRID_DIRECTORY, f"{slug}_{mode}.npz")
+
+def build_commute_grid(destination, destination_lat, destination_lon, mode="driving",
+                       radius_km=COMMUTE_GRID_RADIUS_KM, cell_meters=COMMUTE_GRID_CELL_METERS, client=None):
+    """
+    Route every grid-cell centre to a destination and persist the grid.
+
+    Args:
+        destination (str): Destination address
+        destination_lat, destination_lon (float): Destination coordinates
+        mode (str): Travel mode
+        radius_km (float): Half-width of the grid
+        cell_meters (float): Side of a grid cell
+        client (DistanceMatrixClient): Client to use (defaults to a cached client)
+
+    Returns:
+        CommuteGrid: The computed grid (also saved under COMMUTE_GRID_DIRECTORY)
+    """
+    client = client or DistanceMatrixClient()
+    origin_lat, origin_lon, cell_lat, cell_lon, n_rows, n_cols = CommuteGrid.layout(
+        destination_lat, destination_lon, radius_km, cell_meters)
+
+    rows, cols = np.mgrid[0:n_rows, 0:n_cols]
+    centre_lats = origin_lat + (rows.ravel() + 0.5) * cell_lat
+    centre_lons = origin_lon + (cols.ravel() + 0.5) * cell_lon
+    origins = [f"{lat:.6f},{lon:.6f}" for lat, lon in zip(centre_lats, centre_lons)]
+
+    logger.info(f"Building {n_rows}x{n_cols} commute grid to {destination} by {mode}")
+    results = client.get_commute_times(origins, destination, mode)
+    durations = np.array([
+        np.nan if results.get(o, {}).get("value") is None else results[o]["value"] for o in origins
+    ], dtype=np.float32).reshape(n_rows, n_cols)
+
+    grid = CommuteGrid(destination, mode, origin_lat, origin_lon, cell_lat, cell_lon, durations)
+    grid.save()
+    return grid
+
+def load_commute_grid(destination, mode="driving"):
+    """
+    Load the persisted grid for a destination and mode.
+
+    Returns:
+        CommuteGrid: The grid, or None if it has not been built
+    """
+    filename = grid_path(destination, mode)
+    if not os.path.exists(filename):
+        return None
+    return CommuteGrid.load(filename)
+
+def commute_times_from_grid(grid, addresses, lats, lons, max_commute_seconds, client=None, margin_seconds=120):
+    """
+    Commute times for listings: grid lookups, with exact routes only near the limit.
+
+    Args:
+        grid (CommuteGrid): Grid for the destination and mode
+        addresses (list): Listing addresses
+        lats, lons (array-like): Listing coordinates (NaN where unknown)
+        max_commute_seconds (float): Commute limit that decides which listings need exact routes
+        client (DistanceMatrixClient): Client for the exact routes (defaults to a cached client)
+        margin_seconds (float): Extra band around the limit that is routed exactly
+
+    Returns:
+        tuple: (seconds array, boolean array marking values that came from the grid)
+    """
+    seconds = grid.lookup(lats, lons).astype(np.float64)
+    exact = grid.needs_exact(lats, lons, max_commute_seconds, margin_seconds)
+
+    exact_addresses = [addresses[i] for i in np.flatnonzero(exact)]
+    if exact_addresses:
+        logger.info(f"Routing {len(exact_addresses)} of {len(addresses)} listings near the commute limit exactly")
+        client = client or DistanceMatrixClient()
+        results = client.get_commute_times(exact_addresses, grid.destination, grid.mode)
+        for i in np.flatnonzero(exact):
+            value = results.get(addresses[i], {}).get("value")
+            seconds[i] = np.nan if value is None else value
+
+    return seconds, ~exact
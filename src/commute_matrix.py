@@ -0,0 +1,194 @@
+"""
+Commute matrix across listings, destinations and travel modes.
+
+Durations and distances are held as dense float arrays with axes
+(listing, destination, mode) and labels for each axis, so household-level
+questions ("worst commute of two adults, each taking their fastest mode")
+are array reductions instead of repeated scrapes and merges.
+"""
+import logging
+import numpy as np
+import pandas as pd
+
+from src.scrapers.distance_matrix import DistanceMatrixClient
+from src.address import unique_addresses
+
+logger = logging.getLogger(__name__)
+
+class CommuteMatrix:
+    """Labelled (listing x destination x mode) commute durations and distances."""
+
+    def __init__(self, listings, destinations, modes, durations, distances):
+        """
+        Wrap commute arrays with their axis labels.
+
+        Args:
+            listings (list): Listing addresses (axis 0)
+            destinations (list): Destination addresses (axis 1)
+            modes (list): Travel modes (axis 2)
+            durations (ndarray): Seconds, shape (listings, destinations, modes); NaN if unavailable
+            distances (ndarray): Meters, same shape as durations
+        """
+        self.listings = list(listings)
+        self.destinations = list(destinations)
+        self.modes = list(modes)
+        self.durations = np.asarray(durations, dtype=np.float64)
+        self.distances = np.asarray(distances, dtype=np.float64)
+        expected = (len(self.listings), len(self.destinations), len(self.modes))
+        if self.durations.shape != expected or self.distances.shape != expected:
+            raise ValueError(f"Commute arrays must have shape {expected}")
+
+    def _indices(self, labels, axis_labels):
+        """Positions of the requested labels on an axis (all positions if labels is None)."""
+        if labels is None:
+            return list(range(len(axis_labels)))
+        if isinstance(labels, str):
+            labels = [labels]
+        return [axis_labels.index(label) for label in labels]
+
+    def select(self, destinations=None, modes=None):
+        """
+        Select a subset of destinations and modes.
+
+        Args:
+            destinations (list or str): Destination labels to keep (default all)
+            modes (list or str): Mode labels to keep (default all)
+
+        Returns:
+            CommuteMatrix: Matrix restricted to the selection
+        """
+        d = self._indices(destinations, self.destinations)
+        m = self._indices(modes, self.modes)
+        return CommuteMatrix(
+            self.listings,
+            [self.destinations[i] for i in d],
+            [self.modes[i] for i in m],
+            self.durations[:, d][:, :, m],
+            self.distances[:, d][:, :, m]
+        )
+
+    def fastest(self, destinations=None, modes=None):
+        """
+        Fastest available mode per listing and destination.
+
+        Args:
+            destinations (list or str): Destinations to consider (default all)
+            modes (list or str): Modes each commuter is willing to use (default all)
+
+        Returns:
+            DataFrame: Seconds, listings x destinations (NaN when no mode has a route)
+        """
+        sub = self.select(destinations, modes)
+        # fmin ignores NaN, so a missing route in one mode falls back to the others
+        values = np.fmin.reduce(sub.durations, axis=2)
+        return pd.DataFrame(values, index=sub.listings, columns=sub.destinations)
+
+    def worst_case(self, destinations=None, modes=None):
+        """
+        Longest commute in the household, each commuter taking their fastest mode.
+
+        Args:
+            destinations (list or str): One destination per commuter (default all)
+            modes (list or str): Modes the commuters are willing to use (default all)
+
+        Returns:
+            Series: Seconds per listing; NaN if any destination is unreachable
+        """
+        fastest = self.fastest(destinations, modes).to_numpy()
+        return pd.Series(fastest.max(axis=1), index=self.listings, name="worst_case_commute_seconds")
+
+    def total(self, destinations=None, modes=None):
+        """
+        Combined commute time of the household, each commuter taking their fastest mode.
+
+        Returns:
+            Series: Seconds per listing; NaN if any destination is unreachable
+        """
+        fastest = self.fastest(destinations, modes).to_numpy()
+        return pd.Series(fastest.sum(axis=1), index=self.listings, name="total_commute_seconds")
+
+    def rank(self, destinations=None, modes=None, by="worst_case"):
+        """
+        Rank listings by household commute.
+
+        Args:
+            destinations (list or str): Destinations to consider (default all)
+            modes (list or str): Modes to consider (default all)
+            by (str): 'worst_case' or 'total'
+
+        Returns:
+            Series: Seconds per listing, shortest first, unreachable listings last
+        """
+        scores = self.worst_case(destinations, modes) if by == "worst_case" else self.total(destinations, modes)
+        return scores.sort_values(na_position="last")
+
+    def to_frame(self):
+        """
+        Long-format view with one row per listing, destination and mode.
+
+        Returns:
+            DataFrame: address, destination, mode, commute_time_seconds and distance_value
+        """
+        index = pd.MultiIndex.from_product(
+            [self.listings, self.destinations, self.modes], names=["address", "destination", "mode"]
+        )
+        return pd.DataFrame({
+            "commute_time_seconds": self.durations.reshape(-1),
+            "distance_value": self.distances.reshape(-1)
+        }, index=index).reset_index()
+
+    def save(self, filename):
+        """Save the matrix and its labels as a compressed .npz file (labels as fixed-width strings)."""
+        np.savez_compressed(
+            filename,
+            listings=np.array(self.listings, dtype=str),
+            destinations=np.array(self.destinations, dtype=str),
+            modes=np.array(self.modes, dtype=str),
+            durations=self.durations,
+            distances=self.distances
+        )
+        return filename
+
+    @classmethod
+    def load(cls, filename):
+        """Load a matrix saved with save(); pickled arrays are refused."""
+        with np.load(filename, allow_pickle=False) as data:
+            return cls(data["listings"].tolist(), data["destinations"].tolist(), data["modes"].tolist(),
+                       data["durations"], data["distances"])
+
+def compute_commute_matrix(addresses, destinations, modes=("driving",), client=None, departure_time=None):
+    """
+    Route every listing to every destination with every mode in one batched, cached pass.
+
+    Args:
+        addresses (list): Listing addresses (duplicates and spelling variants are routed once)
+        destinations (list): Destination addresses, e.g. each adult's workplace
+        modes (list): Travel modes
+        client (DistanceMatrixClient): Client to use (defaults to a cached client)
+        departure_time (int or str): Departure time ('now' or a Unix timestamp, optional)
+
+    Returns:
+        CommuteMatrix: Durations and distances for all combinations
+    """
+    client = client or DistanceMatrixClient()
+    listings = unique_addresses(addresses)
+    destinations = unique_addresses(destinations)
+    modes = list(modes)
+
+    shape = (len(listings), len(destinations), len(modes))
+    durations = np.full(shape, np.nan)
+    distances = np.full(shape, np.nan)
+    listing_pos = {address: i for i, address in enumerate(listings)}
+    destination_pos = {destination: j for j, destination in enumerate(destinations)}
+
+    for k, mode in enumerate(modes):
+        logger.info(f"Routing {len(listings)} listings to {len(destinations)} destinations by {mode}")
+        results = client.get_commute_matrix(listings, destinations, mode, departure_time)
+        for (origin, destination), result in results.items():
+            i, j = listing_pos[origin], destination_pos[destination]
+            if result.get("value") is not None:
+                durations[i, j, k] = result["value"]
+            if result.get("distance_value") is not None:
+                distances[i, j, k] = result["distance_value"]
+
+    return CommuteMatrix(listings, destinations, modes, durations, distances)
@@ -3,4 +3,85 @@
 import os
 
 GMAPS_API_KEY = ""
-REALTOR_API_KEY = ""  # if using MappedBy/Houski, etc.
\ No newline at end of file
+REALTOR_API_KEY = ""  # if using MappedBy/Houski, etc.
+
+# Selenium driver profile shared by the browser-based scrapers.
+# "eager" returns from driver.get() once the DOM is ready instead of waiting
+# for every subresource to finish loading.
+PAGE_LOAD_STRATEGY = "eager"
+
+# URL patterns blocked through DevTools (Network.setBlockedURLs); "*" is a wildcard.
+# Stylesheets ("*.css") are left out until the result-card selectors (.cardCon)
+# have been checked against pages loaded without them.
+BLOCKED_URL_PATTERNS = [
+    # Images and fonts
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico",
+    "*.woff", "*.woff2", "*.ttf", "*.otf",
+    # Map tiles
+    "*/maps/vt*", "*/maps/api/js/StaticMapService*", "*/kh?v=*",
+    # Analytics and ads
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+    "*googlesyndication.com*", "*googleadservices.com*", "*facebook.net*",
+    "*hotjar.com*", "*adsrvr.org*", "*scorecardresearch.com*",
+]
+
+# Persistent commute-time cache
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_DIRECTORY = os.path.join(PROJECT_ROOT, "data", "cache")
+COMMUTE_CACHE_PATH = os.path.join(CACHE_DIRECTORY, "commute_cache.sqlite")
+COMMUTE_CACHE_TTL = 30 * 24 * 3600  # seconds before a cached commute is refetched
+COMMUTE_CACHE_MAX_ENTRIES = 100000  # least recently used entries are evicted beyond this
+COMMUTE_CACHE_BUCKET_SECONDS = 15 * 60  # departure times within the same weekly slot share an entry
+
+# Offline commute estimator calibration (per-mode speed, detour and overhead)
+COMMUTE_ESTIMATOR_PATH = os.path.join(CACHE_DIRECTORY, "commute_estimator.json")
+
+# Precomputed commute grids around destinations
+COMMUTE_GRID_DIRECTORY = os.path.join(CACHE_DIRECTORY, "commute_grids")
+COMMUTE_GRID_CELL_METERS = 1000  # side of a grid cell
+COMMUTE_GRID_RADIUS_KM = 25  # half-width of the grid around the destination
+
+# Offline geocoder
+ADDRESS_POINTS_FILE = os.path.join(PROJECT_ROOT, "data", "raw", "address_points.csv")
+GEOCODER_INDEX_PATH = os.path.join(CACHE_DIRECTORY, "geocoder_index.npz")
+GEOCODE_CACHE_PATH = os.path.join(CACHE_DIRECTORY, "geocode_cache.sqlite")
+GEOCODE_NEGATIVE_TTL = 30 * 24 * 3600  # seconds before an address the geocoder could not place is retried
+# Address points sharing a key but spread over more than this many meters are
+# different places (e.g. the same street name in two municipalities), not one address
+GEOCODER_MAX_SPREAD_METERS = 250
+
+# Columnar crime store (memory-mapped incident columns)
+CRIME_STORE_DIRECTORY = os.path.join(CACHE_DIRECTORY, "crime_store")
+
+# Pre-aggregated crime cube (year x offence type x grid cell)
+CRIME_CUBE_CELL_METERS = 500
+CRIME_CUBE_REFERENCE_LAT = 45.42  # latitude at which cube cells are CRIME_CUBE_CELL_METERS wide (Ottawa)
+
+# Crime density rasters (summed-area tables for constant-time area counts)
+CRIME_RASTER_CELL_METERS = 100
+
+# Crime scoring of many listings (processes > 1 scores in a process pool; None uses every CPU)
+CRIME_SCORING_PROCESSES = 1
+CRIME_SCORING_CHUNK_SIZE = 1000  # listings per batch query and per worker task
+
+# Memo of per-address crime statistics: locations in the same quantized cell share one result
+CRIME_STATS_MEMO_CELL_METERS = 50
+CRIME_STATS_MEMO_SIZE = 10000
+
+# Population density used to turn incident counts into crime rates:
+# about 2000 people per sq km in suburban areas (adjust as needed)
+PEOPLE_PER_SQ_KM = 2000
+
+# Crime columns of the final dataset (incidents within this radius of each listing)
+CRIME_RADIUS_KM = 1.0
+CRIME_TOP_TYPES = 3  # most common offence types reported per listing
+
+# Fuzzy second pass of the listing/commute merge (for rows the exact address join misses)
+FUZZY_MATCH_THRESHOLD = 0.85  # minimum street-name similarity
+FUZZY_MATCH_MAX_BLOCK = 1000  # candidate blocks larger than this are not searched
+
+# ArcGIS REST query endpoint of the crime layer (".../FeatureServer/<layer>/query"),
+# used for incremental refreshes; full downloads are used while it is unset
+CRIME_QUERY_URL = None
+CRIME_QUERY_DATE_FIELD = "REP_DATE"  # reported-date field filtered on by incremental refreshes
+CRIME_QUERY_PAGE_SIZE = 1000  # records per query page (at most the layer's maxRecordCount)
@@ -0,0 +1,193 @@
+"""
+Pre-aggregated crime counts by year, offence type and spatial cell.
+
+The cube is a dense int32 array with axes (year, offence, cell). Cells come
+from a fixed grid (a cell's id depends only on its coordinates), so counts
+for newly appended incidents land in the same cells as the old ones and the
+cube can be updated incrementally. Year totals, type breakdowns and area
+totals are then slices and sums of the array instead of scans over
+incidents.
+"""
+import math
+import os
+import logging
+import numpy as np
+
+from src.config import CRIME_CUBE_CELL_METERS, CRIME_CUBE_REFERENCE_LAT
+
+logger = logging.getLogger(__name__)
+
+METERS_PER_DEGREE_LAT = 111320.0
+# Cell id = row * CELL_ROW_STRIDE + col (cols stay far below the stride for any cell size used)
+CELL_ROW_STRIDE = 10 ** 8
+# Cell holding incidents without a location, so year and type totals stay complete
+UNLOCATED_CELL = -1
+
+class CrimeCube:
+    """Incident counts with axes (year, offence, cell)."""
+
+    def __init__(self, years=None, cells=None, counts=None, n_offences=0,
+                 cell_meters=CRIME_CUBE_CELL_METERS, reference_lat=CRIME_CUBE_REFERENCE_LAT):
+        """
+        Wrap cube arrays.
+
+        Args:
+            years (ndarray): Sorted years (axis 0)
+            cells (ndarray): Sorted cell ids (axis 2)
+            counts (ndarray): int32 counts, shape (years, offences, cells)
+            n_offences (int): Size of the offence axis (codes of the crime store)
+            cell_meters (float): Cell side
+            reference_lat (float): Latitude at which cells are cell_meters wide
+        """
+        self.years = np.asarray(years if years is not None else [], dtype=np.int64)
+        self.cells = np.asarray(cells if cells is not None else [], dtype=np.int64)
+        self.counts = (np.asarray(counts, dtype=np.int32) if counts is not None
+                       else np.zeros((len(self.years), n_offences, len(self.cells)), dtype=np.int32))
+        self.cell_meters = float(cell_meters)
+        self.reference_lat = float(reference_lat)
+        self.cell_lat = self.cell_meters / METERS_PER_DEGREE_LAT
+        self.cell_lon = self.cell_meters / (METERS_PER_DEGREE_LAT * math.cos(math.radians(self.reference_lat)))
+
+    def cell_ids(self, lats, lons):
+        """
+        Fixed-grid cell id of each location.
+
+        Returns:
+            ndarray: int64 ids; UNLOCATED_CELL where the location is unknown
+        """
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        located = np.isfinite(lats) & np.isfinite(lons)
+        rows = np.floor((np.where(located, lats, 0) + 90) / self.cell_lat).astype(np.int64)
+        cols = np.floor((np.where(located, lons, 0) + 180) / self.cell_lon).astype(np.int64)
+        return np.where(located, rows * CELL_ROW_STRIDE + cols, UNLOCATED_CELL)
+
+    def cell_centres(self, cells):
+        """Centre (lats, lons) of located cells."""
+        cells = np.asarray(cells, dtype=np.int64)
+        rows, cols = cells // CELL_ROW_STRIDE, cells % CELL_ROW_STRIDE
+        return (rows + 0.5) * self.cell_lat - 90, (cols + 0.5) * self.cell_lon - 180
+
+    def add(self, years, offences, lats, lons, n_offences=None):
+        """
+        Count incidents into the cube, growing its axes as needed.
+
+        Args:
+            years (array-like): Year per incident
+            offences (array-like): Offence code per incident
+            lats, lons (array-like): Location per incident (NaN when unknown)
+            n_offences (int): Size of the offence dictionary (default: largest code + 1)
+        """
+        years = np.asarray(years, dtype=np.int64)
+        offences = np.asarray(offences, dtype=np.int64)
+        if not len(years):
+            return
+        cells = self.cell_ids(lats, lons)
+        n_offences = max(n_offences or 0, int(offences.max()) + 1, self.counts.shape[1])
+
+        new_years = np.union1d(self.years, years)
+        new_cells = np.union1d(self.cells, cells)
+        if (len(new_years) != len(self.years) or len(new_cells) != len(self.cells)
+                or n_offences != self.counts.shape[1]):
+            grown = np.zeros((len(new_years), n_offences, len(new_cells)), dtype=np.int32)
+            year_pos = np.searchsorted(new_years, self.years)
+            cell_pos = np.searchsorted(new_cells, self.cells)
+            grown[np.ix_(year_pos, np.arange(self.counts.shape[1]), cell_pos)] = self.counts
+            self.years, self.cells, self.counts = new_years, new_cells, grown
+
+        np.add.at(self.counts, (np.searchsorted(self.years, years), offences,
+                                np.searchsorted(self.cells, cells)), 1)
+
+    @classmethod
+    def from_store(cls, store, cell_meters=CRIME_CUBE_CELL_METERS, reference_lat=CRIME_CUBE_REFERENCE_LAT):
+        """
+        Build a cube over every incident of a crime store.
+
+        Returns:
+            CrimeCube: The built cube
+        """
+        cube = cls(n_offences=len(store.offences), cell_meters=cell_meters, reference_lat=reference_lat)
+        cube.add(store.year, store.offence, store.lat, store.lon, len(store.offences))
+        logger.info(f"Built crime cube: {len(cube.years)} years x {cube.counts.shape[1]} offences x "
+                    f"{len(cube.cells)} cells from {len(store)} incidents")
+        return cube
+
+    def _year_slice(self, year):
+        """Counts for one year (all years when year is None), shape (offences, cells)."""
+        if year is None:
+            return self.counts.sum(axis=0)
+        pos = np.searchsorted(self.years, year)
+        if pos == len(self.years) or self.years[pos] != year:
+            return np.zeros(self.counts.shape[1:], dtype=np.int32)
+        return self.counts[pos]
+
+    def count_by_year(self, year):
+        """Number of incidents in a year."""
+        return int(self._year_slice(year).sum())
+
+    def year_totals(self):
+        """
+        Incidents per year.
+
+        Returns:
+            dict: Year to count
+        """
+        return {int(year): int(total) for year, total in zip(self.years, self.counts.sum(axis=(1, 2)))}
+
+    def type_counts(self, year=None, cells=None):
+        """
+        Incidents per offence code.
+
+        Args:
+            year (int): Restrict to one year (default all years)
+            cells (ndarray): Restrict to these cell positions on the cell axis (default all cells)
+
+        Returns:
+            ndarray: Count per offence code
+        """
+        counts = self._year_slice(year)
+        if cells is not None:
+            counts = counts[:, cells]
+        return counts.sum(axis=1)
+
+    def cells_within(self, lat, lon, radius_km):
+        """
+        Positions on the cell axis of cells whose centre is within a radius.
+
+        Returns:
+            ndarray: Cell positions
+        """
+        located = np.flatnonzero(self.cells != UNLOCATED_CELL)
+        centre_lats, centre_lons = self.cell_centres(self.cells[located])
+        phi1, phi2 = np.radians(centre_lats), math.radians(lat)
+        a = (np.sin((phi2 - phi1) / 2) ** 2
+             + np.cos(phi1) * math.cos(phi2) * np.sin(np.radians(lon - centre_lons) / 2) ** 2)
+        distances = 2 * 6371000 * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+        return located[distances <= radius_km * 1000]
+
+    def area_type_counts(self, lat, lon, radius_km, year=None):
+        """
+        Incidents per offence code in the cells around a location.
+
+        Counts are at cell resolution: a cell is included when its centre is
+        within the radius.
+
+        Returns:
+            ndarray: Count per offence code
+        """
+        return self.type_counts(year, self.cells_within(lat, lon, radius_km))
+
+    def save(self, path):
+        """Save the cube as .npz."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        np.savez(path, years=self.years, cells=self.cells, counts=self.counts,
+                 geometry=np.array([self.cell_meters, self.reference_lat]))
+        return path
+
+    @classmethod
+    def load(cls, path):
+        """Load a cube saved with save()."""
+        with np.load(path) as data:
+            cell_meters, reference_lat = data["geometry"]
+            return cls(data["years"], data["cells"], data["counts"],
+                       cell_meters=cell_meters, reference_lat=reference_lat)
@@ -2,54 +2,425 @@
 Module for accessing crime data from Ottawa's open data portal.
 """
 import requests
+import numpy as np
 import pandas as pd
 import math
+import re
 import logging
 import sys
 import os
+import threading
+from collections import OrderedDict
 
 # Add the parent directory to sys.path to allow for import
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from src.scrapers.base_scraper import APIScraper
-from src.config import CRIME_MAP_URL
+from src.spatial_index import GridIndex
+from src.crime_store import CrimeStore, features_to_columns, from_days, to_days, DATE_MISSING
+from src.crime_ingest import ingest_geojson_stream, DEFAULT_CHUNK_SIZE
+from src.crime_cube import CrimeCube
+from src.crime_raster import CrimeRaster
+from src.crime_parallel import count_crimes_by_type, score_points_parallel
+from src.geocoder import Geocoder, GoogleGeocoder, get_default_geocoder
+from src.config import (CRIME_MAP_URL, CRIME_STORE_DIRECTORY, CRIME_QUERY_URL, CRIME_QUERY_DATE_FIELD,
+                        CRIME_QUERY_PAGE_SIZE, CRIME_RASTER_CELL_METERS, CRIME_SCORING_PROCESSES,
+                        CRIME_SCORING_CHUNK_SIZE, CRIME_STATS_MEMO_CELL_METERS, CRIME_STATS_MEMO_SIZE,
+                        PEOPLE_PER_SQ_KM)
 
 logger = logging.getLogger(__name__)
 
 # ArcGIS REST API endpoint for Ottawa Crime data (Criminal Offences feature layer)
 ARCGIS_CRIME_FEATURE_URL = "https://opendata.arcgis.com/datasets/ottawa::criminal-offences-.geojson"
 
+# Crime cube file, kept inside the crime store directory
+CUBE_FILENAME = "cube.npz"
+
+# Saved spatial index shared by scoring worker processes, kept inside the crime store directory
+INDEX_DIRNAME = "index"
+
+def day_number(value):
+    """
+    Convert a since/until bound to a day number for the spatial index.
+    
+    Args:
+        value: date, datetime, ISO date string, or None
+        
+    Returns:
+        int: Days since 1970-01-01, or None for an open bound
+        
+    Raises:
+        ValueError: If the value is not a date
+    """
+    if value is None:
+        return None
+    days = to_days(str(value))
+    if days == DATE_MISSING:
+        raise ValueError(f"Not a date: {value!r}")
+    return days
+
+class CrimeStatsMemo:
+    """LRU memo of area crime statistics keyed by a quantized location."""
+    
+    METERS_PER_DEGREE_LAT = 111320.0
+    
+    def __init__(self, cell_meters=CRIME_STATS_MEMO_CELL_METERS, maxsize=CRIME_STATS_MEMO_SIZE):
+        """
+        Initialize an empty memo.
+        
+        Args:
+            cell_meters (float): Side of the cells locations are snapped to
+            maxsize (int): Maximum number of memoized results
+        """
+        self.cell_meters = cell_meters
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def quantize(self, lat, lon):
+        """
+        Snap a location to the centre of its cell.
+        
+        Returns:
+            tuple: ((row, col) cell key, (lat, lon) of the cell centre)
+        """
+        cell_lat = self.cell_meters / self.METERS_PER_DEGREE_LAT
+        row = math.floor(lat / cell_lat)
+        centre_lat = (row + 0.5) * cell_lat
+        # Longitude cells are sized at the row's latitude so they stay roughly square
+        cell_lon = cell_lat / max(math.cos(math.radians(centre_lat)), 1e-12)
+        col = math.floor(lon / cell_lon)
+        return (row, col), (centre_lat, (col + 0.5) * cell_lon)
+    
+    def get_or_compute(self, key, compute):
+        """
+        Get a memoized result, computing and storing it on a miss.
+        
+        Args:
+            key (tuple): Memo key
+            compute (callable): Function producing the result
+            
+        Returns:
+            The memoized or newly computed result
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+        result = compute()
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return result
+    
+    def stats(self):
+        """
+        Get memo statistics.
+        
+        Returns:
+            dict: Hits, misses, hit rate, current size and maximum size
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "size": len(self._entries),
+            "maxsize": self.maxsize
+        }
+    
+    def clear(self):
+        """Remove every memoized result (statistics are kept)."""
+        with self._lock:
+            self._entries.clear()
+
+def crime_type_column(name):
+    """Column name for per-type counts, e.g. 'Break and Enter' -> 'crimes_break_and_enter'."""
+    return "crimes_" + (re.sub(r"[^a-z0-9]+", "_", str(name).lower()).strip("_") or "unknown")
+
 class CrimeDataAPI(APIScraper):
     """Class for accessing Ottawa crime data."""
     
-    def __init__(self, api_url=ARCGIS_CRIME_FEATURE_URL, delay=2):
-        """Initialize the crime data API client."""
+    def __init__(self, api_url=ARCGIS_CRIME_FEATURE_URL, delay=2, cell_meters=500,
+                 store_directory=CRIME_STORE_DIRECTORY, query_url=CRIME_QUERY_URL,
+                 date_field=CRIME_QUERY_DATE_FIELD, page_size=CRIME_QUERY_PAGE_SIZE):
+        """
+        Initialize the crime data API client.
+        
+        Args:
+            api_url (str): GeoJSON endpoint for crime incidents
+            delay (int): Delay before each request in seconds
+            cell_meters (float): Cell size of the spatial index over incidents
+            store_directory (str): Directory of the columnar crime store
+            query_url (str): ArcGIS REST query endpoint for incremental refreshes (optional)
+            date_field (str): Reported-date field used to select new incidents
+            page_size (int): Records requested per query page
+        """
         super().__init__(delay=delay)
         self.api_url = api_url
-        self._cached_data = None
+        self.query_url = query_url
+        self.date_field = date_field
+        self.page_size = page_size
+        self.cell_meters = cell_meters
+        self.store = CrimeStore(store_directory)
+        self._index = None
+        self._cube = None
+        self._rasters = {}
+        self.stats_memo = CrimeStatsMemo()
     
-    def fetch_all_crimes(self, force_refresh=False):
+    def fetch_all_crimes(self):
         """
-        Fetch all crime incidents from the open data portal.
+        Download all crime incidents from the open data portal.
+        
+        Returns:
+            dict: GeoJSON data with crime incidents
+        """
+        logger.info(f"Fetching crime data from {self.api_url}")
+        json_data = self.fetch_json(self.api_url)
+        
+        if not json_data:
+            logger.error("Failed to fetch crime data")
+            return {"features": []}
+        
+        logger.info(f"Retrieved {len(json_data.get('features', []))} crime incidents")
+        return json_data
+    
+    def load_store(self, force_refresh=False):
+        """
+        Get the crime store, downloading the dataset into it on first use.
         
         Args:
-            force_refresh (bool): Whether to force refresh the cache
+            force_refresh (bool): Whether to replace the stored incidents with a fresh download
             
         Returns:
-            dict: GeoJSON data with crime incidents
+            CrimeStore: Store with every incident
+        """
+        if force_refresh or not self.store.exists():
+            self.download_to_store()
+        return self.store
+    
+    def download_to_store(self):
+        """
+        Stream the full dataset into the crime store.
+        
+        Features are parsed from the response as it arrives and written in
+        batches to a staging store, which replaces the current store only
+        once the download has completed. A download without any incidents
+        never replaces a non-empty store.
+        
+        Returns:
+            int: Number of incidents stored, or None if the download failed
+        """
+        logger.info(f"Streaming crime data from {self.api_url}")
+        response = self.make_request(self.api_url, timeout=60, stream=True)
+        if response is None:
+            logger.error("Failed to fetch crime data")
+            return None
+        
+        staging = CrimeStore(self.store.directory + ".staging")
+        staging.clear()
+        try:
+            with response:
+                count = ingest_geojson_stream(response.iter_content(chunk_size=DEFAULT_CHUNK_SIZE), staging)
+        except (ValueError, requests.exceptions.RequestException) as e:
+            logger.error(f"Crime data download failed, keeping the current store: {e}")
+            staging.clear()
+            return None
+        
+        if count == 0 and len(self.store):
+            logger.error("Crime data download returned no incidents, keeping the current store")
+            staging.clear()
+            return None
+        
+        CrimeCube.from_store(staging).save(os.path.join(staging.directory, CUBE_FILENAME))
+        self.store.replace_with(staging)
+        self._index = None
+        self._cube = None
+        self._rasters = {}
+        self.stats_memo.clear()
+        logger.info(f"Stored {count} crime incidents in {self.store.directory}")
+        return count
+    
+    def query_features(self, where, order_by=None):
         """
-        if self._cached_data is None or force_refresh:
-            logger.info(f"Fetching crime data from {self.api_url}")
-            json_data = self.fetch_json(self.api_url)
+        Page through an ArcGIS REST query.
+        
+        Args:
+            where (str): SQL where clause
+            order_by (str): orderByFields value that keeps paging stable (default: date field)
             
-            if not json_data:
-                logger.error("Failed to fetch crime data")
-                return {"features": []}
-                
-            self._cached_data = json_data
-            logger.info(f"Retrieved {len(json_data.get('features', []))} crime incidents")
+        Yields:
+            list: GeoJSON features of one page
+        """
+        offset = 0
+        while True:
+            params = {
+                "where": where,
+                "outFields": "*",
+                "outSR": 4326,
+                "f": "geojson",
+                "orderByFields": order_by or self.date_field,
+                "resultOffset": offset,
+                "resultRecordCount": self.page_size,
+            }
+            json_data = self.fetch_json(self.query_url, params=params)
+            if json_data is None or "error" in json_data:
+                error = json_data.get("error") if json_data else "no response"
+                raise ValueError(f"Query failed at offset {offset}: {error}")
             
-        return self._cached_data
+            features = json_data.get("features", [])
+            if features:
+                yield features
+            offset += len(features)
+            # exceededTransferLimit is top-level or under properties depending on the server version
+            more = json_data.get("exceededTransferLimit") or (json_data.get("properties") or {}).get(
+                "exceededTransferLimit")
+            if not features or (len(features) < self.page_size and not more):
+                return
+    
+    def refresh_store(self):
+        """
+        Bring the crime store up to date.
+        
+        With a query endpoint configured and a non-empty store, only
+        incidents reported on or after the latest stored day are fetched
+        (paged with resultOffset/resultRecordCount). That day may have been
+        stored while it was still being published, so its stored incidents
+        are replaced by the fetched ones rather than trusted or duplicated.
+        Otherwise the full dataset is downloaded.
+        
+        Returns:
+            int: Net number of incidents added (or stored, for a full download), or
+            None if the refresh failed
+        """
+        latest = self.store.meta.get("max_date")
+        if not self.query_url or not len(self.store) or latest is None:
+            return self.download_to_store()
+        
+        where = f"{self.date_field} >= DATE '{from_days(latest)}'"
+        logger.info(f"Fetching crime incidents where {where}")
+        features = []
+        try:
+            for page in self.query_features(where):
+                features.extend(page)
+        except (ValueError, requests.exceptions.RequestException) as e:
+            logger.error(f"Incremental crime refresh failed, keeping the current store: {e}")
+            return None
+        
+        if not features:
+            logger.info(f"No crime incidents returned (store holds {len(self.store)})")
+            return 0
+        
+        store = self.store
+        before = len(store)
+        columns = features_to_columns(features)
+        stale = np.asarray(store.date) == latest
+        if stale.any():
+            # Replace the re-fetched day in one rewrite, then rebuild the cube it invalidated
+            store.rewrite(~stale, columns)
+            self._cube = CrimeCube.from_store(store)
+            self._cube.save(os.path.join(store.directory, CUBE_FILENAME))
+        else:
+            # Append in one batch so an interrupted refresh leaves no partial day behind
+            cube = self.get_cube()
+            store.append(columns)
+            cube.add(store.year[before:], store.offence[before:], store.lat[before:], store.lon[before:],
+                     len(store.offences))
+            cube.save(os.path.join(store.directory, CUBE_FILENAME))
+        self._index = None
+        self._rasters = {}
+        self.stats_memo.clear()
+        added = len(store) - before
+        logger.info(f"Fetched {len(features)} crime incidents from {from_days(latest)} on, replacing "
+                    f"{int(stale.sum())} stored ones (store now holds {len(store)})")
+        return added
+    
+    def get_cube(self):
+        """
+        Get the pre-aggregated crime cube, rebuilding it if it does not match the store.
+        
+        Returns:
+            CrimeCube: Counts by year, offence code and grid cell
+        """
+        store = self.load_store()
+        path = os.path.join(store.directory, CUBE_FILENAME)
+        if self._cube is None and os.path.exists(path):
+            self._cube = CrimeCube.load(path)
+        if self._cube is None or int(self._cube.counts.sum()) != len(store):
+            self._cube = CrimeCube.from_store(store)
+            if len(store):
+                self._cube.save(path)
+        return self._cube
+    
+    def get_index(self):
+        """
+        Get the spatial index over incidents, building it after the store changes.
+        
+        Returns:
+            GridIndex: Index whose positions are rows of self.store
+        """
+        store = self.load_store()
+        if self._index is None:
+            self._index = GridIndex(store.lat, store.lon, self.cell_meters, store.date, DATE_MISSING)
+            logger.info(f"Indexed {len(self._index)} crime incidents in {self.cell_meters:g} m cells")
+        return self._index
+    
+    def get_raster(self, year=None, offence=None, cell_meters=CRIME_RASTER_CELL_METERS):
+        """
+        Get a crime density raster, building it after the store changes.
+        
+        Args:
+            year (int): Only count incidents of this year (default all years)
+            offence (str): Only count incidents of this type (default all types)
+            cell_meters (float): Raster cell side
+            
+        Returns:
+            CrimeRaster: Summed-area table over incident counts
+        """
+        key = (year, offence, cell_meters)
+        if key not in self._rasters:
+            self._rasters[key] = CrimeRaster.from_store(self.load_store(), year, offence, cell_meters)
+        return self._rasters[key]
+    
+    def estimate_crime_counts(self, lats, lons, radius_km=1.0, year=None, offence=None):
+        """
+        Estimate the number of crimes within a radius of many locations.
+        
+        Counts come from a density raster in constant time per location, so
+        they are approximate; use crimes_near_location for exact incident lists.
+        
+        Args:
+            lats, lons (array-like): Locations; NaN gives NaN
+            radius_km (float): Radius in kilometers
+            year (int): Year to filter by (default all years)
+            offence (str): Crime type to filter by (default all types)
+            
+        Returns:
+            ndarray: Estimated counts
+        """
+        return self.get_raster(year, offence).radius_count(lats, lons, radius_km)
+    
+    def get_shared_index_directory(self):
+        """
+        Save the spatial index next to the store for worker processes to memory-map.
+        
+        The saved index is rewritten when the store has changed since it was saved.
+        
+        Returns:
+            str: Directory of the saved index
+        """
+        store = self.load_store()
+        path = os.path.join(store.directory, INDEX_DIRNAME)
+        meta = GridIndex.saved_meta(path)
+        if meta is None or meta.get("store_count") != len(store) or meta["cell_meters"] != self.cell_meters:
+            self.get_index().save(path, store_count=len(store))
+        return path
     
     def count_crimes_by_year(self, year=2024):
         """
@@ -61,63 +432,64 @@ class CrimeDataAPI(APIScraper):
         Returns:
             int: Number of crimes in that year
         """
-        data = self.fetch_all_crimes()
-        features = data.get("features", [])
-        count = 0
-        
-        for feature in features:
-            props = feature.get("properties", {})
-            # Adjust field name as needed based on the actual dataset
-            reported_year = props.get("reported_year") or props.get("Year")
-            if reported_year == year:
-                count += 1
-                
-        return count
+        return self.get_cube().count_by_year(year)
     
-    def crimes_near_location(self, lat, lon, radius_km=1.0):
+    def count_crimes_by_type(self, year=None):
+        """
+        Count crimes per type.
+        
+        Args:
+            year (int): Year to filter by (default all years)
+            
+        Returns:
+            dict: Crime type to number of crimes
+        """
+        counts = self.get_cube().type_counts(year)
+        return {name: int(count) for name, count in zip(self.store.offences, counts) if count}
+    
+    def get_area_crime_counts(self, lat, lon, radius_km=1.0, year=None):
+        """
+        Count crimes per type around a location from the crime cube.
+        
+        Faster than get_crime_stats_by_area but at grid-cell resolution: whole
+        cells whose centre lies within the radius are counted.
+        
+        Args:
+            lat (float): Latitude
+            lon (float): Longitude
+            radius_km (float): Radius in kilometers
+            year (int): Year to filter by (default all years)
+            
+        Returns:
+            dict: Crime type to number of crimes
+        """
+        counts = self.get_cube().area_type_counts(lat, lon, radius_km, year)
+        return {name: int(count) for name, count in zip(self.store.offences, counts) if count}
+    
+    def crimes_near_location(self, lat, lon, radius_km=1.0, since=None, until=None):
         """
         Find crimes within a certain radius of a location.
         
+        Only the grid cells under the search area are scanned, with exact
+        distances checked on those candidates. Within a cell incidents are
+        sorted by reported date, so a date window is a binary search.
+        
         Args:
             lat (float): Latitude
             lon (float): Longitude
             radius_km (float): Radius in kilometers
+            since (date or str): Only crimes reported on or after this date (optional)
+            until (date or str): Only crimes reported on or before this date (optional)
             
         Returns:
             list: Crime records within the radius
         """
-        data = self.fetch_all_crimes()
-        features = data.get("features", [])
-        nearby_crimes = []
-        
-        # Filter by approximate bounding box first (for efficiency)
-        lat_deg = radius_km / 111  # approx degrees latitude per km
-        lon_deg = radius_km / (111 * abs(math.cos(math.radians(lat))))  # degrees longitude per km
-        
-        lat_min, lat_max = lat - lat_deg, lat + lat_deg
-        lon_min, lon_max = lon - lon_deg, lon + lon_deg
-        
-        for feature in features:
-            geom = feature.get("geometry", {})
-            if geom.get("type") == "Point":
-                coords = geom.get("coordinates")  # [lon, lat]
-                if not coords:
-                    continue
-                    
-                crime_lon, crime_lat = coords[0], coords[1]
-                
-                # Check if within bounding box
-                if (lat_min <= crime_lat <= lat_max and 
-                    lon_min <= crime_lon <= lon_max):
-                    
-                    # Calculate exact distance
-                    dist = haversine_distance(lat, lon, crime_lat, crime_lon)
-                    if dist <= radius_km * 1000:  # Convert km to meters
-                        nearby_crimes.append(feature["properties"])
-                        
-        return nearby_crimes
-    
-    def get_crime_stats_by_area(self, lat, lon, radius_km=1.0):
+        index = self.get_index()
+        positions = index.query_radius(lat, lon, radius_km * 1000,  # Convert km to meters
+                                       day_number(since), day_number(until))
+        return self.store.records(positions)
+    
+    def get_crime_stats_by_area(self, lat, lon, radius_km=1.0, since=None, until=None):
         """
         Get crime statistics for an area.
         
@@ -125,37 +497,101 @@ class CrimeDataAPI(APIScraper):
             lat (float): Latitude
             lon (float): Longitude
             radius_km (float): Radius in kilometers
+            since (date or str): Only crimes reported on or after this date (optional)
+            until (date or str): Only crimes reported on or before this date (optional)
             
         Returns:
             dict: Crime statistics for the area
         """
-        crimes = self.crimes_near_location(lat, lon, radius_km)
-        
-        if not crimes:
-            return {
-                "total_crimes": 0,
-                "crime_rate": 0,
-                "crime_types": {}
-            }
-        
-        # Count crime types
-        crime_types = {}
-        for crime in crimes:
-            crime_type = crime.get("offense_code") or crime.get("CrimeType") or "Unknown"
-            crime_types[crime_type] = crime_types.get(crime_type, 0) + 1
+        index = self.get_index()
+        positions = index.query_radius(lat, lon, radius_km * 1000, day_number(since), day_number(until))
+        counts = np.bincount(self.store.offence[positions], minlength=len(self.store.offences))
         
         # Calculate approximate population (rough estimate based on area)
-        # About 2000 people per sq km in suburban areas (adjust as needed)
-        area_sq_km = math.pi * radius_km * radius_km
-        estimated_population = area_sq_km * 2000
+        estimated_population = math.pi * radius_km * radius_km * PEOPLE_PER_SQ_KM
         
         return {
-            "total_crimes": len(crimes),
-            "crime_rate": (len(crimes) / estimated_population) * 1000,  # per 1000 people
-            "crime_types": crime_types
+            "total_crimes": len(positions),
+            "crime_rate": (len(positions) / estimated_population) * 1000,  # per 1000 people
+            "crime_types": {name: int(count) for name, count in zip(self.store.offences, counts) if count}
         }
     
-    def get_crime_dataframe(self, lat=None, lon=None, radius_km=None):
+    def get_memoized_crime_stats(self, lat, lon, radius_km=1.0, since=None, until=None):
+        """
+        Get crime statistics for an area, reusing results for nearby locations.
+        
+        The location is snapped to the centre of a small cell (see
+        CRIME_STATS_MEMO_CELL_METERS) and statistics are computed once per
+        cell, radius and date window, so listings in the same building or
+        block share one query. Use stats_memo.stats() for hit rates.
+        
+        Args:
+            lat (float): Latitude
+            lon (float): Longitude
+            radius_km (float): Radius in kilometers
+            since (date or str): Only crimes reported on or after this date (optional)
+            until (date or str): Only crimes reported on or before this date (optional)
+            
+        Returns:
+            dict: Crime statistics as returned by get_crime_stats_by_area
+        """
+        cell, (centre_lat, centre_lon) = self.stats_memo.quantize(lat, lon)
+        key = (cell, float(radius_km), day_number(since), day_number(until))
+        stats = self.stats_memo.get_or_compute(
+            key, lambda: self.get_crime_stats_by_area(centre_lat, centre_lon, radius_km, since, until))
+        # Callers get their own copy so they cannot alter the memoized result
+        return {**stats, "crime_types": dict(stats["crime_types"])}
+    
+    def get_crime_stats_for_points(self, lats, lons, radius_km=1.0, since=None, until=None,
+                                   processes=CRIME_SCORING_PROCESSES):
+        """
+        Get crime statistics around many locations at once.
+        
+        Every location's candidate incidents come from the spatial index and
+        their distances are computed in one NumPy pass; counts per location
+        and crime type are then a single bincount. With several processes,
+        large inputs are split into chunks scored by worker processes that
+        memory-map the store and a saved copy of the index.
+        
+        Args:
+            lats, lons (array-like): Coordinates per location; NaN where unknown
+            radius_km (float): Radius in kilometers
+            since (date or str): Only crimes reported on or after this date (optional)
+            until (date or str): Only crimes reported on or before this date (optional)
+            processes (int): Worker processes (1 scores in this process; None uses every CPU)
+            
+        Returns:
+            DataFrame: One row per location, aligned with the input: total_crimes,
+            crime_rate (per 1000 people) and a crimes_<type> count column per
+            crime type. Locations without coordinates get NaN.
+        """
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        store = self.load_store()
+        n_types = len(store.offences)
+        window = (day_number(since), day_number(until))
+        if processes != 1 and len(lats) > CRIME_SCORING_CHUNK_SIZE:
+            counts = score_points_parallel(store.directory, self.get_shared_index_directory(), n_types,
+                                           lats, lons, radius_km * 1000, *window, processes=processes)
+        else:
+            counts = count_crimes_by_type(self.get_index(), store.offence, n_types, lats, lons,
+                                          radius_km * 1000, *window)
+        totals = counts.sum(axis=1)
+        
+        # Calculate approximate population (rough estimate based on area)
+        estimated_population = math.pi * radius_km * radius_km * PEOPLE_PER_SQ_KM
+        
+        stats = pd.DataFrame(counts, columns=[crime_type_column(name) for name in self.store.offences])
+        if stats.columns.has_duplicates:
+            # Types differing only in case or punctuation share a column
+            stats = stats.T.groupby(level=0, sort=False).sum().T
+        stats.insert(0, "total_crimes", totals)
+        stats.insert(1, "crime_rate", totals / estimated_population * 1000)  # per 1000 people
+        located = np.isfinite(lats) & np.isfinite(lons)
+        stats.loc[~located] = np.nan
+        return stats
+    
+    def get_crime_dataframe(self, lat=None, lon=None, radius_km=None, since=None, until=None):
         """
         Get crime data as a pandas DataFrame.
         
@@ -163,16 +599,16 @@ class CrimeDataAPI(APIScraper):
             lat (float): Optional latitude to filter by
             lon (float): Optional longitude to filter by
             radius_km (float): Optional radius in kilometers
+            since (date or str): Only crimes reported on or after this date (with a radius)
+            until (date or str): Only crimes reported on or before this date (with a radius)
             
         Returns:
             DataFrame: Crime data
         """
         if lat and lon and radius_km:
-            crimes = self.crimes_near_location(lat, lon, radius_km)
-        else:
-            crimes = [feature["properties"] for feature in self.fetch_all_crimes().get("features", [])]
+            return pd.DataFrame(self.crimes_near_location(lat, lon, radius_km, since, until))
         
-        return pd.DataFrame(crimes)
+        return self.load_store().to_frame()
 
 # Helper function to compute distance between two lat/lon points
 def haversine_distance(lat1, lon1, lat2, lon2):
@@ -197,22 +633,59 @@ def haversine_distance(lat1, lon1, lat2, lon2):
     return R * c
 
 # Convenience functions
-def get_crime_stats(address, geocode_api_key=None, radius_km=1.0):
+_default_api = None
+_external_geocoders = {}
+
+def get_default_crime_api():
+    """
+    Get the process-wide crime data client (shared store, index and stats memo).
+    
+    Returns:
+        CrimeDataAPI: Shared client instance
+    """
+    global _default_api
+    if _default_api is None:
+        _default_api = CrimeDataAPI()
+    return _default_api
+
+def _get_geocoder(geocode_api_key=None):
+    """Default geocoder, or one falling back to Google geocoding with the given key."""
+    if not geocode_api_key:
+        return get_default_geocoder()
+    if geocode_api_key not in _external_geocoders:
+        _external_geocoders[geocode_api_key] = Geocoder(external=GoogleGeocoder(api_key=geocode_api_key))
+    return _external_geocoders[geocode_api_key]
+
+def get_crime_stats(address, geocode_api_key=None, radius_km=1.0, since=None, until=None, api=None):
     """
     Get crime statistics for an address.
     
+    The address is geocoded (offline index first, Google when an API key is
+    given), then counted against the indexed crime store through the
+    client's quantized memo, so addresses in the same building or block
+    reuse one computation.
+    
     Args:
         address (str): Address to get crime statistics for
-        geocode_api_key (str): API key for geocoding service
+        geocode_api_key (str): Google API key for addresses the offline index cannot place (optional)
         radius_km (float): Radius in kilometers
+        since (date or str): Only crimes reported on or after this date (optional)
+        until (date or str): Only crimes reported on or before this date (optional)
+        api (CrimeDataAPI): Client to query (default: the shared client)
         
     Returns:
-        dict: Crime statistics
+        dict: Crime statistics (total_crimes, crime_rate, crime_types,
+        most_common_crimes, lat, lon), or None if the address could not be placed
     """
-    # This would need a geocoding step to convert address to lat/lon
-    # For now, we'll just return dummy data
-    return {
-        "total_crimes": 45,
-        "crime_rate": 2.3,
-        "most_common_crimes": ["Theft", "Mischief", "Break and Enter"]
-    }
+    location = _get_geocoder(geocode_api_key).geocode(address)
+    if location is None:
+        logger.warning(f"Could not geocode {address!r}; no crime statistics")
+        return None
+    
+    lat, lon = location
+    api = api if api is not None else get_default_crime_api()
+    stats = api.get_memoized_crime_stats(lat, lon, radius_km, since, until)
+    ranked = sorted(stats["crime_types"].items(), key=lambda item: item[1], reverse=True)
+    stats["most_common_crimes"] = [name for name, _ in ranked[:3]]
+    stats["lat"], stats["lon"] = lat, lon
+    return stats
@@ -0,0 +1,137 @@
+"""
+Streaming ingestion of GeoJSON crime data into the columnar crime store.
+
+The GeoJSON export is parsed feature by feature as the response arrives:
+the parser keeps only the undecoded tail of the stream, decodes each
+complete feature object with the standard JSON decoder and hands features
+to the store in fixed-size batches. Peak memory is one network chunk, one
+feature and one batch, however large the dataset grows.
+"""
+import codecs
+import json
+import logging
+
+from src.crime_store import features_to_columns
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 5000
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+_WHITESPACE = " \t\r\n"
+
+def iter_geojson_features(chunks, array_key="features"):
+    """
+    Yield the features of a GeoJSON FeatureCollection from a byte stream.
+
+    Args:
+        chunks (iterable): Byte chunks of the document, e.g. response.iter_content()
+        array_key (str): Key of the array whose items are yielded
+
+    Yields:
+        dict: One decoded feature at a time
+
+    Raises:
+        ValueError: If the stream has no such array (e.g. an error body or HTML
+            page), ends inside it or holds invalid JSON
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    chunks = iter(chunks)
+    buffer = ""
+    head = ""  # Start of the document, to show what came back instead of the array
+    exhausted = False
+
+    def read_more():
+        nonlocal buffer, head, exhausted
+        chunk = next(chunks, None)
+        if chunk is None:
+            buffer += utf8.decode(b"", final=True)
+            exhausted = True
+            return False
+        text = utf8.decode(chunk)
+        buffer += text
+        if len(head) < 200:
+            head = (head + text)[:200]
+        return True
+
+    # Skip to the opening bracket of the features array
+    marker = f'"{array_key}"'
+    while True:
+        start = buffer.find(marker)
+        if start >= 0:
+            bracket = buffer.find("[", start + len(marker))
+            if bracket >= 0:
+                buffer = buffer[bracket + 1:]
+                break
+        elif len(buffer) > len(marker):
+            # Keep only what could still be the start of the marker
+            buffer = buffer[-len(marker):]
+        if not read_more():
+            if start < 0:
+                raise ValueError(f"No {array_key} array in the stream: {head!r}")
+            raise ValueError(f"Stream ended before the {array_key} array started")
+
+    pos = 0
+    while True:
+        while pos < len(buffer) and buffer[pos] in _WHITESPACE + ",":
+            pos += 1
+        if pos == len(buffer):
+            buffer, pos = "", 0
+            if not read_more():
+                raise ValueError(f"Stream ended inside the {array_key} array")
+            continue
+        if buffer[pos] == "]":
+            return
+        try:
+            feature, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            # Most likely the feature continues in the next chunk
+            buffer, pos = buffer[pos:], 0
+            if not read_more():
+                raise ValueError(f"Invalid or truncated feature in the {array_key} array")
+            continue
+        yield feature
+        pos = end
+        if pos > DEFAULT_CHUNK_SIZE:
+            buffer, pos = buffer[pos:], 0
+
+def ingest_features(features, store, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Append features to a crime store in fixed-size batches.
+
+    Args:
+        features (iterable): GeoJSON features (e.g. from iter_geojson_features)
+        store (CrimeStore): Store to append to
+        batch_size (int): Features per append
+
+    Returns:
+        int: Number of features appended
+    """
+    total = 0
+    batch = []
+    for feature in features:
+        batch.append(feature)
+        if len(batch) >= batch_size:
+            total += store.append(features_to_columns(batch))
+            batch = []
+            logger.debug(f"Ingested {total} crime incidents")
+    if batch:
+        total += store.append(features_to_columns(batch))
+    return total
+
+def ingest_geojson_stream(chunks, store, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Parse a GeoJSON byte stream and append its features to a crime store.
+
+    Args:
+        chunks (iterable): Byte chunks of a FeatureCollection
+        store (CrimeStore): Store to append to
+        batch_size (int): Features per append
+
+    Returns:
+        int: Number of features appended
+    """
+    total = ingest_features(iter_geojson_features(chunks), store, batch_size)
+    logger.info(f"Ingested {total} crime incidents into {store.directory}")
+    return total
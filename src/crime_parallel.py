@@ -0,0 +1,154 @@
+"""
+Parallel crime scoring of listings across a process pool.
+
+Listings are split into chunks that worker processes score independently.
+Nothing large is pickled: each worker opens the crime store and a saved copy
+of the spatial index as memory-mapped files when it starts, so all workers
+share the same incident pages through the OS page cache, and only listing
+coordinates go in and per-type count rows come back. The work per chunk is
+independent, so throughput grows with the number of cores.
+
+Run this module to benchmark scoring throughput for several worker counts.
+"""
+import os
+import time
+import argparse
+import logging
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+from src.crime_store import CrimeStore
+from src.spatial_index import GridIndex
+from src.config import CRIME_SCORING_CHUNK_SIZE
+
+logger = logging.getLogger(__name__)
+
+def count_crimes_by_type(index, offences, n_types, lats, lons, radius_m, since=None, until=None,
+                         chunk_size=CRIME_SCORING_CHUNK_SIZE):
+    """
+    Count incidents per offence code within a radius of each location.
+
+    Locations are processed in chunks so the candidate arrays of a batch
+    query stay bounded however many locations are scored.
+
+    Args:
+        index (GridIndex): Index over incidents
+        offences (ndarray): Offence code per incident row
+        n_types (int): Number of offence codes
+        lats, lons (ndarray): Locations; NaN matches nothing
+        radius_m (float): Radius in meters
+        since, until (int): Day-number window (optional)
+        chunk_size (int): Locations per batch query
+
+    Returns:
+        ndarray: int64 counts of shape (locations, n_types)
+    """
+    counts = np.zeros((len(lats), n_types), dtype=np.int64)
+    for start in range(0, len(lats), chunk_size):
+        chunk = slice(start, start + chunk_size)
+        query_ids, positions = index.query_pairs(lats[chunk], lons[chunk], radius_m, since, until)
+        size = len(lats[chunk])
+        counts[chunk] = np.bincount(query_ids * n_types + np.asarray(offences[positions], dtype=np.int64),
+                                    minlength=size * n_types).reshape(size, n_types)
+    return counts
+
+# Per-process state, opened once by _init_worker
+_worker = {}
+
+def _init_worker(store_directory, index_directory):
+    """Open the memory-mapped store and index in a worker process."""
+    _worker["offences"] = CrimeStore(store_directory).offence
+    _worker["index"] = GridIndex.load(index_directory)
+
+def _score_chunk(lats, lons, n_types, radius_m, since, until):
+    """Score one chunk of locations in a worker process."""
+    return count_crimes_by_type(_worker["index"], _worker["offences"], n_types, lats, lons, radius_m,
+                                since, until)
+
+def score_points_parallel(store_directory, index_directory, n_types, lats, lons, radius_m,
+                          since=None, until=None, processes=None, chunk_size=CRIME_SCORING_CHUNK_SIZE):
+    """
+    Count incidents per offence code around many locations in a process pool.
+
+    Args:
+        store_directory (str): Crime store directory
+        index_directory (str): Directory of a GridIndex saved over that store
+        n_types (int): Number of offence codes
+        lats, lons (array-like): Locations; NaN matches nothing
+        radius_m (float): Radius in meters
+        since, until (int): Day-number window (optional)
+        processes (int): Number of worker processes (defaults to the CPU count)
+        chunk_size (int): Locations per task
+
+    Returns:
+        ndarray: int64 counts of shape (locations, n_types), aligned with the input
+    """
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    starts = range(0, len(lats), chunk_size)
+    counts = np.zeros((len(lats), n_types), dtype=np.int64)
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker,
+                             initargs=(store_directory, index_directory)) as executor:
+        futures = [
+            executor.submit(_score_chunk, lats[start:start + chunk_size], lons[start:start + chunk_size],
+                            n_types, radius_m, since, until)
+            for start in starts
+        ]
+        for start, future in zip(starts, futures):
+            chunk = future.result()
+            counts[start:start + len(chunk)] = chunk
+    return counts
+
+def benchmark(api, n_points=50000, radius_km=1.0, process_counts=None, seed=0):
+    """
+    Time crime scoring of random locations for several worker counts.
+
+    Locations are drawn around stored incidents so every query does real work.
+
+    Args:
+        api (CrimeDataAPI): Crime data client with a loaded store
+        n_points (int): Number of locations to score
+        radius_km (float): Radius in kilometers
+        process_counts (list): Worker counts to time (default 1, 2, 4, ... up to the CPU count;
+            1 is the in-process path)
+
+    Returns:
+        dict: Seconds per worker count
+    """
+    store = api.load_store()
+    rng = np.random.default_rng(seed)
+    sample = rng.choice(np.flatnonzero(np.isfinite(store.lat)), size=n_points)
+    lats = store.lat[sample] + rng.normal(0, 0.01, n_points)
+    lons = store.lon[sample] + rng.normal(0, 0.01, n_points)
+    if process_counts is None:
+        process_counts = [1]
+        while process_counts[-1] * 2 <= (os.cpu_count() or 1):
+            process_counts.append(process_counts[-1] * 2)
+
+    api.get_shared_index_directory()  # Build and save the index outside the timings
+    expected = None
+    results = {}
+    for processes in process_counts:
+        start = time.perf_counter()
+        got = api.get_crime_stats_for_points(lats, lons, radius_km, processes=processes)
+        results[processes] = time.perf_counter() - start
+        if expected is None:
+            expected = got
+        assert got.equals(expected), "scoring results differ between worker counts"
+
+    print(f"{n_points} locations, {len(store)} incidents, radius {radius_km} km, {os.cpu_count()} CPUs")
+    for processes, seconds in results.items():
+        label = "in-process" if processes == 1 else f"{processes} processes"
+        print(f"  {label:14s} {seconds:8.2f} s  {n_points / seconds:10.0f} locations/s"
+              f"  ({results[process_counts[0]] / seconds:.2f}x)")
+    return results
+
+if __name__ == "__main__":
+    from src.crime_data_api import CrimeDataAPI
+
+    parser = argparse.ArgumentParser(description="Benchmark parallel crime scoring")
+    parser.add_argument("--points", type=int, default=50000, help="Number of locations to score")
+    parser.add_argument("--radius-km", type=float, default=1.0, help="Query radius")
+    parser.add_argument("--processes", type=int, nargs="*", help="Worker counts to time")
+    args = parser.parse_args()
+    benchmark(CrimeDataAPI(), args.points, args.radius_km, args.processes)
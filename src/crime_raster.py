@@ -0,0 +1,266 @@
+"""
+Crime density raster with summed-area tables.
+
+Incidents (optionally filtered to a year and offence type) are binned into
+a raster of square cells over the city, and the raster is turned into a
+summed-area table (SAT). The count in any rectangle is then four SAT
+lookups, whatever the number of incidents. Radius counts approximate the
+disk with a fixed number of horizontal strips, and fractional cell edges
+are handled by bilinear interpolation of the SAT (incidents are assumed
+evenly spread within a cell), so a query costs the same for every listing.
+
+Run this module for an accuracy report against exact radius queries.
+"""
+import argparse
+import math
+import time
+import logging
+import numpy as np
+import pandas as pd
+
+from src.config import CRIME_RASTER_CELL_METERS
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_M = 6371000
+
+class CrimeRaster:
+    """Summed-area table over a raster of incident counts."""
+
+    def __init__(self, sat, lat0, lon0, cell_lat, cell_lon, cell_meters):
+        """
+        Wrap a summed-area table.
+
+        Args:
+            sat (ndarray): int64 SAT of shape (rows + 1, cols + 1); sat[i, j] is the
+                number of incidents in raster rows < i and cols < j
+            lat0, lon0 (float): South-west corner of the raster
+            cell_lat, cell_lon (float): Cell size in degrees
+            cell_meters (float): Cell side in meters
+        """
+        self.sat = sat
+        self.lat0 = lat0
+        self.lon0 = lon0
+        self.cell_lat = cell_lat
+        self.cell_lon = cell_lon
+        self.cell_meters = cell_meters
+
+    @property
+    def shape(self):
+        """Raster shape (rows, cols)."""
+        return self.sat.shape[0] - 1, self.sat.shape[1] - 1
+
+    @property
+    def total(self):
+        """Number of incidents in the raster."""
+        return int(self.sat[-1, -1])
+
+    @classmethod
+    def build(cls, lats, lons, cell_meters=CRIME_RASTER_CELL_METERS, bounds=None):
+        """
+        Bin incidents into a raster and build its summed-area table.
+
+        Args:
+            lats, lons (array-like): Incident coordinates (NaN are ignored)
+            cell_meters (float): Cell side
+            bounds (tuple): (lat_min, lat_max, lon_min, lon_max) of the raster
+                (default: the incidents' extent)
+
+        Returns:
+            CrimeRaster: The raster
+        """
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        located = np.isfinite(lats) & np.isfinite(lons)
+        lats, lons = lats[located], lons[located]
+        if bounds is None:
+            bounds = ((lats.min(), lats.max(), lons.min(), lons.max()) if len(lats)
+                      else (0.0, 0.0, 0.0, 0.0))
+        lat_min, lat_max, lon_min, lon_max = bounds
+
+        cell_lat = cell_meters / (EARTH_RADIUS_M * math.pi / 180)
+        cell_lon = cell_lat / max(math.cos(math.radians((lat_min + lat_max) / 2)), 1e-12)
+        n_rows = int((lat_max - lat_min) // cell_lat) + 1
+        n_cols = int((lon_max - lon_min) // cell_lon) + 1
+
+        rows = ((lats - lat_min) // cell_lat).astype(np.int64)
+        cols = ((lons - lon_min) // cell_lon).astype(np.int64)
+        inside = (rows >= 0) & (rows < n_rows) & (cols >= 0) & (cols < n_cols)
+        counts = np.bincount(rows[inside] * n_cols + cols[inside], minlength=n_rows * n_cols)
+
+        sat = np.zeros((n_rows + 1, n_cols + 1), dtype=np.int64)
+        sat[1:, 1:] = counts.reshape(n_rows, n_cols).cumsum(axis=0).cumsum(axis=1)
+        return cls(sat, lat_min, lon_min, cell_lat, cell_lon, float(cell_meters))
+
+    @classmethod
+    def from_store(cls, store, year=None, offence=None, cell_meters=CRIME_RASTER_CELL_METERS):
+        """
+        Build a raster from a crime store, optionally for one year and offence type.
+
+        The raster always spans the extent of the whole store, so rasters for
+        different years and types line up.
+
+        Args:
+            store (CrimeStore): Crime store
+            year (int): Only count incidents of this year (optional)
+            offence (str): Only count incidents of this type (optional)
+            cell_meters (float): Cell side
+
+        Returns:
+            CrimeRaster: The raster
+        """
+        lats, lons = np.asarray(store.lat, dtype=np.float64), np.asarray(store.lon, dtype=np.float64)
+        located = np.isfinite(lats) & np.isfinite(lons)
+        bounds = ((lats[located].min(), lats[located].max(), lons[located].min(), lons[located].max())
+                  if located.any() else None)
+
+        keep = located
+        if year is not None:
+            keep = keep & (np.asarray(store.year) == year)
+        if offence is not None:
+            code = store.offences.index(offence) if offence in store.offences else -1
+            keep = keep & (np.asarray(store.offence) == code)
+        return cls.build(lats[keep], lons[keep], cell_meters, bounds)
+
+    def _sat_at(self, rows, cols):
+        """SAT at fractional raster positions, bilinearly interpolated and clipped to the raster."""
+        n_rows, n_cols = self.shape
+        rows = np.clip(rows, 0, n_rows)
+        cols = np.clip(cols, 0, n_cols)
+        r0 = np.minimum(np.floor(rows).astype(np.int64), n_rows - 1)
+        c0 = np.minimum(np.floor(cols).astype(np.int64), n_cols - 1)
+        fr, fc = rows - r0, cols - c0
+        s = self.sat
+        return ((1 - fr) * (1 - fc) * s[r0, c0] + (1 - fr) * fc * s[r0, c0 + 1]
+                + fr * (1 - fc) * s[r0 + 1, c0] + fr * fc * s[r0 + 1, c0 + 1])
+
+    def _positions(self, lats, lons):
+        """Fractional raster (row, col) positions of coordinates."""
+        return ((np.asarray(lats, dtype=np.float64) - self.lat0) / self.cell_lat,
+                (np.asarray(lons, dtype=np.float64) - self.lon0) / self.cell_lon)
+
+    def rect_count(self, lat_min, lat_max, lon_min, lon_max):
+        """
+        Count incidents in rectangles.
+
+        Args:
+            lat_min, lat_max, lon_min, lon_max (array-like): Rectangle bounds
+
+        Returns:
+            ndarray: Estimated counts (exact when the bounds fall on cell edges)
+        """
+        r0, c0 = self._positions(lat_min, lon_min)
+        r1, c1 = self._positions(lat_max, lon_max)
+        return self._sat_at(r1, c1) - self._sat_at(r0, c1) - self._sat_at(r1, c0) + self._sat_at(r0, c0)
+
+    def radius_count(self, lats, lons, radius_km, strips=8):
+        """
+        Estimate the number of incidents within a radius of each location.
+
+        The disk is approximated by horizontal strips, each a rectangle with
+        the same area as the part of the disk it covers; each strip is one
+        rectangle query.
+
+        Args:
+            lats, lons (array-like): Locations; NaN gives NaN
+            radius_km (float): Radius in kilometers
+            strips (int): Number of strips approximating the disk
+
+        Returns:
+            ndarray: Estimated counts
+        """
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        located = np.isfinite(lats) & np.isfinite(lons)
+        lats, lons = np.where(located, lats, self.lat0), np.where(located, lons, self.lon0)
+        lat_radius = radius_km * 1000 / (EARTH_RADIUS_M * math.pi / 180)
+        lon_scale = 1 / np.maximum(np.cos(np.radians(lats)), 1e-12)
+
+        def segment_area(y):
+            # Area of the unit half-disk between 0 and height y (integral of sqrt(1 - t^2))
+            return (y * math.sqrt(1 - y * y) + math.asin(y)) / 2
+
+        total = np.zeros(len(lats))
+        edges = np.linspace(-1.0, 1.0, strips + 1)
+        for low, high in zip(edges[:-1], edges[1:]):
+            half_width = (segment_area(high) - segment_area(low)) / (high - low) * lat_radius * lon_scale
+            total += self.rect_count(lats + low * lat_radius, lats + high * lat_radius,
+                                     lons - half_width, lons + half_width)
+        total[~located] = np.nan
+        return total
+
+    def save(self, path):
+        """Save the raster as .npz."""
+        np.savez(path, sat=self.sat, geometry=np.array([self.lat0, self.lon0, self.cell_lat, self.cell_lon,
+                                                        self.cell_meters]))
+        return path
+
+    @classmethod
+    def load(cls, path):
+        """Load a raster saved with save()."""
+        with np.load(path) as data:
+            return cls(data["sat"], *data["geometry"])
+
+def accuracy_report(api, lats, lons, radius_km=1.0, cell_meters=CRIME_RASTER_CELL_METERS, strips=8):
+    """
+    Compare raster radius counts with exact crimes_near_location results.
+
+    Args:
+        api (CrimeDataAPI): Crime data client with a loaded store
+        lats, lons (array-like): Sample locations
+        radius_km (float): Radius in kilometers
+        cell_meters (float): Raster cell side
+        strips (int): Strips approximating the disk
+
+    Returns:
+        dict: Error statistics and timings
+    """
+    raster = CrimeRaster.from_store(api.load_store(), cell_meters=cell_meters)
+
+    start = time.perf_counter()
+    exact = np.array([len(api.crimes_near_location(lat, lon, radius_km)) for lat, lon in zip(lats, lons)])
+    exact_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    estimate = raster.radius_count(lats, lons, radius_km, strips)
+    raster_s = time.perf_counter() - start
+
+    error = estimate - exact
+    nonzero = exact > 0
+    report = {
+        "points": len(exact),
+        "radius_km": radius_km,
+        "cell_meters": cell_meters,
+        "strips": strips,
+        "mean_exact_count": float(exact.mean()),
+        "mean_abs_error": float(np.abs(error).mean()),
+        "mean_abs_pct_error": float((np.abs(error[nonzero]) / exact[nonzero]).mean() * 100) if nonzero.any() else 0.0,
+        "max_abs_error": float(np.abs(error).max()),
+        "bias": float(error.mean()),
+        # Spearman correlation: does the raster rank locations like the exact counts?
+        "rank_correlation": float(pd.Series(exact).rank().corr(pd.Series(estimate).rank())),
+        "exact_ms_per_point": exact_s / len(exact) * 1000,
+        "raster_ms_per_point": raster_s / len(exact) * 1000,
+    }
+    for name, value in report.items():
+        print(f"  {name:22s} {value:.4g}" if isinstance(value, float) else f"  {name:22s} {value}")
+    return report
+
+if __name__ == "__main__":
+    from src.crime_data_api import CrimeDataAPI
+
+    parser = argparse.ArgumentParser(description="Accuracy of raster radius counts against exact queries")
+    parser.add_argument("--points", type=int, default=500, help="Number of random sample locations")
+    parser.add_argument("--radius-km", type=float, default=1.0, help="Query radius")
+    parser.add_argument("--cell-meters", type=float, default=CRIME_RASTER_CELL_METERS, help="Raster cell side")
+    parser.add_argument("--strips", type=int, default=8, help="Strips approximating the disk")
+    args = parser.parse_args()
+
+    api = CrimeDataAPI()
+    store = api.load_store()
+    rng = np.random.default_rng(0)
+    # Sample around real incidents so the locations are inside the city
+    sample = rng.choice(np.flatnonzero(np.isfinite(store.lat)), size=args.points)
+    sample_lats = store.lat[sample] + rng.normal(0, 0.005, args.points)
+    sample_lons = store.lon[sample] + rng.normal(0, 0.005, args.points)
+    accuracy_report(api, sample_lats, sample_lons, args.radius_km, args.cell_meters, args.strips)
@@ -0,0 +1,353 @@
+"""
+Columnar on-disk store for crime incidents.
+
+Incidents are kept as a struct of arrays instead of decoded GeoJSON:
+
+    lat, lon   float32   (NaN for incidents without a point location)
+    year       int16     (0 when unknown)
+    offence    int16     index into the offence dictionary in meta.json
+    date       int32     days since 1970-01-01 (DATE_MISSING when unknown)
+
+Each column is a raw little-endian .bin file next to a meta.json holding
+the row count and the offence dictionary. Readers memory-map the columns, so
+opening the store is instant in any process and costs no parsing. Appends
+write to the end of the column files and then replace meta.json, so a
+reader never sees a partially written batch.
+"""
+import json
+import os
+import shutil
+import logging
+from datetime import datetime, timezone
+import numpy as np
+import pandas as pd
+
+from src.config import CRIME_STORE_DIRECTORY
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = {
+    "lat": np.dtype("<f4"),
+    "lon": np.dtype("<f4"),
+    "year": np.dtype("<i2"),
+    "offence": np.dtype("<i2"),
+    "date": np.dtype("<i4"),
+}
+
+DATE_MISSING = np.iinfo(np.int32).min
+STORE_VERSION = 1
+
+# Property names used for the same field across versions of the dataset
+OFFENCE_FIELDS = ("offense_code", "CrimeType", "OFF_CATEG", "OFFENCE_SUMMARY")
+YEAR_FIELDS = ("reported_year", "Year", "REP_YEAR")
+DATE_FIELDS = ("reported_date", "REP_DATE", "Date", "OCC_DATE")
+
+def _first(properties, fields):
+    """Value of the first field present and non-empty."""
+    for field in fields:
+        value = properties.get(field)
+        if value not in (None, ""):
+            return value
+    return None
+
+def crime_type(properties):
+    """Crime type of an incident (the field name varies between dataset versions)."""
+    return _first(properties, OFFENCE_FIELDS) or "Unknown"
+
+def to_days(value):
+    """
+    Convert a date field to days since 1970-01-01.
+
+    Args:
+        value: Epoch milliseconds (as returned by ArcGIS), an ISO date string, or None
+
+    Returns:
+        int: Day number, or DATE_MISSING
+    """
+    if value is None:
+        return DATE_MISSING
+    try:
+        if isinstance(value, (int, float)):
+            return int(value // 86400000)
+        return (datetime.fromisoformat(str(value)[:10]).date() - datetime(1970, 1, 1).date()).days
+    except (ValueError, OverflowError):
+        return DATE_MISSING
+
+def from_days(days):
+    """ISO date for a day number, or None for DATE_MISSING."""
+    if days == DATE_MISSING:
+        return None
+    return datetime.fromtimestamp(int(days) * 86400, tz=timezone.utc).date().isoformat()
+
+def features_to_columns(features):
+    """
+    Convert GeoJSON features to column lists.
+
+    Args:
+        features (iterable): GeoJSON features
+
+    Returns:
+        dict: lat, lon, year and date lists plus 'offence' as type names
+    """
+    columns = {"lat": [], "lon": [], "year": [], "offence": [], "date": []}
+    for feature in features:
+        properties = feature.get("properties") or {}
+        geom = feature.get("geometry") or {}
+        coords = geom.get("coordinates") if geom.get("type") == "Point" else None  # [lon, lat]
+        columns["lon"].append(coords[0] if coords else np.nan)
+        columns["lat"].append(coords[1] if coords else np.nan)
+
+        days = to_days(_first(properties, DATE_FIELDS))
+        year = _first(properties, YEAR_FIELDS)
+        if year is None and days != DATE_MISSING:
+            year = int(from_days(days)[:4])
+        try:
+            columns["year"].append(int(year) if year is not None else 0)
+        except (TypeError, ValueError):
+            columns["year"].append(0)
+        columns["date"].append(days)
+        columns["offence"].append(crime_type(properties))
+    return columns
+
+class CrimeStore:
+    """Memory-mapped struct-of-arrays store of crime incidents."""
+
+    def __init__(self, directory=CRIME_STORE_DIRECTORY):
+        """
+        Open the store in a directory (an empty store if nothing is there yet).
+
+        Args:
+            directory (str): Store directory
+        """
+        self.directory = directory
+        self._columns = {}
+        self.reload()
+
+    @property
+    def meta_path(self):
+        return os.path.join(self.directory, "meta.json")
+
+    def _column_path(self, name):
+        return os.path.join(self.directory, f"{name}.bin")
+
+    def exists(self):
+        """Whether the store has been written."""
+        return os.path.exists(self.meta_path)
+
+    def reload(self):
+        """Re-read meta.json and re-map the columns (e.g. after another process appended)."""
+        if self.exists():
+            with open(self.meta_path, "r", encoding="utf-8") as f:
+                self.meta = json.load(f)
+        else:
+            self.meta = {"version": STORE_VERSION, "count": 0, "offences": [], "max_date": None}
+        self._columns = {}
+
+    def __len__(self):
+        return self.meta["count"]
+
+    @property
+    def offences(self):
+        """Offence dictionary: the type name for each code in the offence column."""
+        return self.meta["offences"]
+
+    def column(self, name):
+        """
+        Get a column as a read-only memory-mapped array.
+
+        Args:
+            name (str): One of COLUMNS
+
+        Returns:
+            ndarray: Column values, length len(self)
+        """
+        if name not in self._columns:
+            count = len(self)
+            if count == 0:
+                self._columns[name] = np.empty(0, dtype=COLUMNS[name])
+            else:
+                self._columns[name] = np.memmap(self._column_path(name), dtype=COLUMNS[name], mode="r",
+                                                shape=(count,))
+        return self._columns[name]
+
+    @property
+    def lat(self):
+        return self.column("lat")
+
+    @property
+    def lon(self):
+        return self.column("lon")
+
+    @property
+    def year(self):
+        return self.column("year")
+
+    @property
+    def offence(self):
+        return self.column("offence")
+
+    @property
+    def date(self):
+        return self.column("date")
+
+    def encode_offences(self, names):
+        """
+        Map offence names to codes, adding new names to the dictionary.
+
+        Args:
+            names (list): Offence type names
+
+        Returns:
+            ndarray: int16 codes
+        """
+        codes = {name: i for i, name in enumerate(self.meta["offences"])}
+        encoded = np.empty(len(names), dtype=COLUMNS["offence"])
+        for i, name in enumerate(names):
+            if name not in codes:
+                codes[name] = len(codes)
+                self.meta["offences"].append(name)
+            encoded[i] = codes[name]
+        return encoded
+
+    def append(self, columns):
+        """
+        Append incidents.
+
+        Args:
+            columns (dict): lat, lon, year, date arrays and 'offence' as type
+                names (e.g. from features_to_columns)
+
+        Returns:
+            int: Number of incidents appended
+        """
+        if len(columns["lat"]) == 0:
+            return 0
+        arrays = {
+            name: np.asarray(columns[name]).astype(dtype, copy=False)
+            for name, dtype in COLUMNS.items() if name != "offence"
+        }
+        arrays["offence"] = self.encode_offences(list(columns["offence"]))
+        return self._append_arrays(arrays)
+
+    def _append_arrays(self, arrays):
+        """Append encoded column arrays (offence as codes into this store's dictionary)."""
+        count = len(arrays["lat"])
+        if count == 0:
+            return 0
+        os.makedirs(self.directory, exist_ok=True)
+        existing = len(self)
+        for name, values in arrays.items():
+            path = self._column_path(name)
+            with open(path, "ab") as f:
+                # Drop bytes past the committed count left by an interrupted append
+                f.truncate(existing * COLUMNS[name].itemsize)
+                f.write(np.ascontiguousarray(values).tobytes())
+
+        dates = arrays["date"][arrays["date"] != DATE_MISSING]
+        if len(dates):
+            latest = int(dates.max())
+            self.meta["max_date"] = max(latest, self.meta["max_date"] if self.meta["max_date"] is not None
+                                        else latest)
+        self.meta["count"] = existing + count
+        self._write_meta()
+        self._columns = {}
+        return count
+
+    def rewrite(self, keep, columns=None):
+        """
+        Rewrite the store with a subset of its rows, optionally followed by new incidents.
+
+        The result is written to a staging store that then replaces this one,
+        so readers see either the old or the new contents.
+
+        Args:
+            keep (ndarray): Boolean mask of the rows to keep
+            columns (dict): Incidents to append, as for append() (optional)
+
+        Returns:
+            int: Number of rows in the rewritten store
+        """
+        staging = CrimeStore(self.directory + ".rewrite")
+        staging.clear()
+        staging.meta["offences"] = list(self.offences)
+        positions = np.flatnonzero(keep)
+        staging._append_arrays({name: np.asarray(self.column(name)[positions]) for name in COLUMNS})
+        if columns is not None:
+            staging.append(columns)
+        self.replace_with(staging)
+        return len(self)
+
+    def append_features(self, features):
+        """Append GeoJSON features. Returns the number appended."""
+        return self.append(features_to_columns(features))
+
+    def _write_meta(self):
+        """Replace meta.json atomically."""
+        temp_path = self.meta_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(self.meta, f)
+        os.replace(temp_path, self.meta_path)
+
+    def clear(self):
+        """Remove every incident (and the store directory)."""
+        if os.path.exists(self.directory):
+            shutil.rmtree(self.directory)
+        self.reload()
+
+    def replace_with(self, staging):
+        """
+        Replace this store's contents with a fully written staging store.
+
+        Args:
+            staging (CrimeStore): Store written in another directory; it is moved into place
+        """
+        if not staging.exists():
+            os.makedirs(staging.directory, exist_ok=True)
+            staging._write_meta()
+        if os.path.exists(self.directory):
+            shutil.rmtree(self.directory)
+        os.replace(staging.directory, self.directory)
+        staging.reload()
+        self.reload()
+
+    def records(self, positions):
+        """
+        Build incident dicts for some rows.
+
+        Args:
+            positions (array-like): Row positions
+
+        Returns:
+            list: Dicts with offense_code, reported_year, reported_date, lat and lon
+        """
+        positions = np.asarray(positions, dtype=np.int64)
+        offences = self.offences
+        return [
+            {
+                "offense_code": offences[code],
+                "reported_year": int(year) or None,
+                "reported_date": from_days(days),
+                "lat": float(lat),
+                "lon": float(lon),
+            }
+            for code, year, days, lat, lon in zip(self.offence[positions], self.year[positions],
+                                                  self.date[positions], self.lat[positions],
+                                                  self.lon[positions])
+        ]
+
+    def to_frame(self):
+        """
+        Get the incidents as a DataFrame with decoded offence names and dates.
+
+        Returns:
+            DataFrame: offense_code, reported_year, reported_date, lat and lon
+        """
+        dates = np.asarray(self.date)
+        return pd.DataFrame({
+            "offense_code": pd.Categorical.from_codes(np.asarray(self.offence), categories=self.offences)
+            if len(self) else pd.Categorical([]),
+            "reported_year": np.asarray(self.year),
+            "reported_date": pd.to_datetime(np.where(dates == DATE_MISSING, np.nan, dates), unit="D"),
+            "lat": np.asarray(self.lat),
+            "lon": np.asarray(self.lon),
+        })
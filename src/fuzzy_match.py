@@ -0,0 +1,164 @@
+"""
+Fuzzy address matching for rows the exact canonical-key join leaves unmatched.
+
+Comparing every unmatched address with every candidate is quadratic, so
+candidates are grouped into blocks first. Two addresses are only compared
+when they share a block: the same civic number and either the same first
+letter of the street name or the same postal-code prefix (FSA). Addresses
+without a civic number are blocked on the street name or FSA alone, and
+oversized blocks are skipped. Candidates in a block must agree on civic
+number, unit, street type and direction where both addresses have them, and
+are scored on the street name alone (with rapidfuzz when it is installed,
+and difflib otherwise), so one typo in a short name such as "Elm" is not
+enough to confuse it with "Elk".
+
+Run this module to check that distinct real street names are kept apart
+and common spelling variants are still matched.
+"""
+import logging
+import sys
+from collections import defaultdict
+import numpy as np
+
+try:
+    from rapidfuzz import fuzz
+    HAS_RAPIDFUZZ = True
+except ImportError:
+    import difflib
+    HAS_RAPIDFUZZ = False
+
+from src.address import parse_address
+from src.config import FUZZY_MATCH_THRESHOLD, FUZZY_MATCH_MAX_BLOCK
+
+logger = logging.getLogger(__name__)
+
+# Addresses that name different streets and must never be matched
+DISTINCT_STREETS = [
+    ("10 Elm St, Ottawa", "10 Elk St, Ottawa"),
+    ("25 Bank St, Ottawa", "25 Banff Ave, Ottawa"),
+    ("200 Kent St, Ottawa", "200 King St, Ottawa"),
+    ("300 Carling Ave, Ottawa", "300 Carlington Ave, Ottawa"),
+    ("150 Elgin St, Ottawa", "150 Elgin Ave, Ottawa"),
+    ("40 Rideau St, Ottawa", "40 Rideau Terr, Ottawa"),
+    ("100 Laurier Ave W, Ottawa", "100 Laurier Ave E, Ottawa"),
+    ("12 Oak St, Ottawa", "12 Oat St, Ottawa"),
+]
+
+# Spellings of the same address that must still be matched
+SAME_STREETS = [
+    ("250 Sommerset St W, Ottawa", "250 Somerset Street West, Ottawa"),
+    ("80 Rideu St, Ottawa", "80 Rideau St, Ottawa"),
+    ("1203-160 Gorge St, Ottawa ON K1N 9M2", "160 George Street Unit 1203, Ottawa"),
+    ("45 Mcleod St, Ottawa", "45 MacLeod St, Ottawa"),
+]
+
+def similarity(a, b):
+    """
+    String similarity in [0, 1] (2 * matching characters / total length).
+
+    Uses rapidfuzz's normalized InDel ratio when available, or difflib's
+    SequenceMatcher ratio, which measure the same thing.
+    """
+    if HAS_RAPIDFUZZ:
+        return fuzz.ratio(a, b) / 100
+    matcher = difflib.SequenceMatcher(None, a, b)
+    return matcher.ratio() if matcher.real_quick_ratio() > 0 else 0.0
+
+def _block_keys(parsed):
+    """Blocks an address belongs to."""
+    fsa = parsed.postal_code[:3] if parsed.postal_code else None
+    if parsed.number:
+        keys = [("street", parsed.number, parsed.street[:1])] if parsed.street else []
+        return keys + ([("postal", parsed.number, fsa)] if fsa else [])
+    keys = [("street", None, parsed.street)] if parsed.street else []
+    return keys + ([("postal", None, fsa)] if fsa else [])
+
+def _compatible(a, b):
+    """Whether two parsed addresses could be the same place despite spelling differences."""
+    for part in ("number", "unit", "suffix", "direction"):
+        if getattr(a, part) and getattr(b, part) and getattr(a, part) != getattr(b, part):
+            return False
+    if a.postal_code and b.postal_code:
+        return a.postal_code == b.postal_code
+    return not (a.city and b.city and a.city != b.city)
+
+def fuzzy_match_addresses(addresses, candidates, threshold=FUZZY_MATCH_THRESHOLD, max_block=FUZZY_MATCH_MAX_BLOCK):
+    """
+    Find the most similar candidate address for each address.
+
+    Args:
+        addresses (array-like): Addresses to match
+        candidates (array-like): Addresses they may match
+        threshold (float): Minimum street-name similarity for a match
+        max_block (int): Blocks with more candidates than this are not searched
+
+    Returns:
+        ndarray: Position in candidates of each address's match, or -1
+    """
+    addresses = list(addresses)
+    candidates = list(candidates)
+    matches = np.full(len(addresses), -1, dtype=np.int64)
+    if not addresses or not candidates:
+        return matches
+
+    parsed_candidates = [parse_address(c) if isinstance(c, str) else None for c in candidates]
+    names = [(p.street or "") if p else "" for p in parsed_candidates]
+    blocks = defaultdict(list)
+    for position, parsed in enumerate(parsed_candidates):
+        if parsed:
+            for key in _block_keys(parsed):
+                blocks[key].append(position)
+
+    resolved = {}
+    skipped_blocks = set()
+    for i, address in enumerate(addresses):
+        if not isinstance(address, str):
+            continue
+        if address not in resolved:
+            parsed = parse_address(address)
+            seen = set()
+            best, best_score = -1, threshold
+            for key in _block_keys(parsed):
+                block = blocks.get(key, ())
+                if len(block) > max_block:
+                    skipped_blocks.add(key)
+                    continue
+                for position in block:
+                    if position in seen:
+                        continue
+                    seen.add(position)
+                    if not _compatible(parsed, parsed_candidates[position]):
+                        continue
+                    score = similarity(parsed.street or "", names[position])
+                    # At least the threshold; ties go to the earliest candidate
+                    if score > best_score or (score == best_score and (best < 0 or position < best)):
+                        best, best_score = position, score
+            resolved[address] = best
+        matches[i] = resolved[address]
+
+    if skipped_blocks:
+        logger.warning(f"Skipped {len(skipped_blocks)} address blocks larger than {max_block} candidates")
+    return matches
+
+def self_check(threshold=FUZZY_MATCH_THRESHOLD):
+    """
+    Match the DISTINCT_STREETS and SAME_STREETS pairs and report mistakes.
+
+    Returns:
+        list: Descriptions of pairs matched when they should not be, or not matched when they should
+    """
+    failures = []
+    for pairs, expected in ((DISTINCT_STREETS, False), (SAME_STREETS, True)):
+        for address, candidate in pairs:
+            matched = fuzzy_match_addresses([address], [candidate], threshold)[0] >= 0
+            if matched != expected:
+                failures.append(f"{address!r} {'matched' if matched else 'did not match'} {candidate!r}")
+    return failures
+
+if __name__ == "__main__":
+    failures = self_check()
+    for failure in failures:
+        print(failure)
+    print(f"{len(DISTINCT_STREETS) + len(SAME_STREETS) - len(failures)} of "
+          f"{len(DISTINCT_STREETS) + len(SAME_STREETS)} address pairs handled correctly")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,470 @@
+"""
+Offline geocoding of listing addresses.
+
+An index is built once from an address-points file (one row per civic
+address with its coordinates) and saved as sorted 64-bit key hashes with
+float32 coordinates, plus postal-code and forward sortation area (FSA)
+centroids as a fallback. Each point is keyed by its civic address qualified
+with its municipality and with its FSA, and by the bare civic address; a key
+whose points lie far apart names several places and is left out rather than
+averaged. Lookups are a vectorized binary search, so thousands of addresses
+resolve per second without the network.
+
+Addresses the index cannot place exactly can be sent to an external
+geocoder (e.g. GoogleGeocoder); its answers are kept in a persistent cache
+so each address is only looked up once. Only definite answers are cached
+("not found" ones expire after GEOCODE_NEGATIVE_TTL); transient failures
+such as rate limiting are retried on the next lookup.
+"""
+import argparse
+import os
+import sqlite3
+import threading
+import time
+import logging
+import numpy as np
+import pandas as pd
+
+from src.config import (ADDRESS_POINTS_FILE, GEOCODER_INDEX_PATH, GEOCODE_CACHE_PATH, GEOCODE_NEGATIVE_TTL,
+                        GEOCODER_MAX_SPREAD_METERS, GOOGLE_MAPS_API_KEY, SCRAPE_DELAY)
+from src.address import canonical_key, street_key, qualified_street_keys, place_name, key_hash, parse_address
+from src.scrapers.base_scraper import APIScraper
+
+logger = logging.getLogger(__name__)
+
+GEOCODE_URL = "https://maps.googleapis.com/maps/api/geocode/json"
+
+# Geocoding API statuses that describe the address itself (worth caching), as
+# opposed to transient failures such as OVER_QUERY_LIMIT or a dropped connection
+CACHEABLE_STATUSES = {"OK", "ZERO_RESULTS"}
+
+class GeocodeError(Exception):
+    """A geocoder lookup that failed for a reason other than the address (e.g. rate limiting)."""
+
+# Column names in the address-points file
+DEFAULT_COLUMNS = {
+    "number": "number",
+    "street": "street",
+    "municipality": "municipality",
+    "postal_code": "postal_code",
+    "lat": "lat",
+    "lon": "lon",
+}
+
+def _hashes(keys):
+    """Key hashes as an int64 array (0 for missing keys)."""
+    return np.array([key_hash(key) if key else 0 for key in keys], dtype=np.int64)
+
+def _spread_meters(lat_min, lat_max, lon_min, lon_max):
+    """Approximate diagonal in meters of lat/lon bounding boxes."""
+    meters_per_degree = 111195.0
+    dlat = (lat_max - lat_min) * meters_per_degree
+    dlon = (lon_max - lon_min) * meters_per_degree * np.cos(np.radians((lat_min + lat_max) / 2))
+    return np.hypot(dlat, dlon)
+
+def _sorted_lookup(sorted_keys, keys):
+    """
+    Binary-search keys in a sorted key array.
+
+    Returns:
+        tuple: (positions, found) arrays; positions are only valid where found
+    """
+    if len(sorted_keys) == 0:
+        return np.zeros(len(keys), dtype=np.int64), np.zeros(len(keys), dtype=bool)
+    positions = np.searchsorted(sorted_keys, keys)
+    positions = np.minimum(positions, len(sorted_keys) - 1)
+    return positions, sorted_keys[positions] == keys
+
+class GeocoderIndex:
+    """Sorted on-disk index of address points and postal-code centroids."""
+
+    def __init__(self, keys, lats, lons, postal_keys=None, postal_lats=None, postal_lons=None):
+        """
+        Wrap index arrays.
+
+        Args:
+            keys (ndarray): Sorted int64 hashes of street keys (bare and qualified)
+            lats, lons (ndarray): Coordinates per key
+            postal_keys (ndarray): Sorted int64 hashes of postal codes and FSAs
+            postal_lats, postal_lons (ndarray): Centroid per postal key
+        """
+        self.keys = np.asarray(keys, dtype=np.int64)
+        self.lats = np.asarray(lats, dtype=np.float32)
+        self.lons = np.asarray(lons, dtype=np.float32)
+        self.postal_keys = np.asarray(postal_keys if postal_keys is not None else [], dtype=np.int64)
+        self.postal_lats = np.asarray(postal_lats if postal_lats is not None else [], dtype=np.float32)
+        self.postal_lons = np.asarray(postal_lons if postal_lons is not None else [], dtype=np.float32)
+
+    def __len__(self):
+        return len(self.keys)
+
+    @classmethod
+    def build(cls, source=ADDRESS_POINTS_FILE, columns=None, max_spread_meters=GEOCODER_MAX_SPREAD_METERS):
+        """
+        Build an index from an address-points file.
+
+        Points sharing a key within max_spread_meters of each other (e.g. the
+        entrances of one building) are indexed at their centroid. A key whose
+        points are spread further apart is ambiguous and is not indexed, so
+        lookups fall through to a more specific key or to the postal centroid.
+
+        Args:
+            source (str or DataFrame): CSV path or DataFrame with one row per address point
+            columns (dict): Overrides for DEFAULT_COLUMNS. 'street' holds the street
+                name with its type (e.g. 'George St'); 'municipality' and 'postal_code'
+                are optional.
+            max_spread_meters (float): Largest extent of the points of one key
+
+        Returns:
+            GeocoderIndex: The built index
+        """
+        columns = {**DEFAULT_COLUMNS, **(columns or {})}
+        points = source if isinstance(source, pd.DataFrame) else pd.read_csv(source, dtype=str)
+
+        lats = pd.to_numeric(points[columns["lat"]], errors="coerce")
+        lons = pd.to_numeric(points[columns["lon"]], errors="coerce")
+        lines = points[columns["number"]].astype(str).str.strip() + " " + points[columns["street"]].astype(str)
+        frame = pd.DataFrame({
+            "street": lines.map(street_key),
+            "lat": lats,
+            "lon": lons,
+        })
+        if columns["municipality"] in points.columns:
+            municipalities = points[columns["municipality"]]
+            frame["municipality"] = municipalities.map({m: place_name(m) for m in municipalities.dropna().unique()})
+        if columns["postal_code"] in points.columns:
+            frame["postal_code"] = [parse_address(code).postal_code for code in points[columns["postal_code"]].fillna("")]
+        frame = frame[frame["street"].notna() & frame["lat"].notna() & frame["lon"].notna()]
+
+        # The same keys qualified_street_keys() builds for a listing address
+        keys = [frame["street"]]
+        if "municipality" in frame.columns:
+            keys.append(frame["street"] + ", " + frame["municipality"])
+        if "postal_code" in frame.columns:
+            keys.append(frame["street"] + ", " + frame["postal_code"].str[:3].str.lower())
+        keyed = pd.concat([frame[["lat", "lon"]].assign(key=key) for key in keys]).dropna(subset=["key"])
+
+        # Several points can share a civic address (e.g. one per entrance); use their centroid,
+        # unless they are too far apart to be one place
+        stats = keyed.groupby("key")[["lat", "lon"]].agg(["mean", "min", "max"])
+        spread = _spread_meters(stats[("lat", "min")], stats[("lat", "max")],
+                                stats[("lon", "min")], stats[("lon", "max")])
+        ambiguous = spread > max_spread_meters
+        by_key = pd.DataFrame({"lat": stats[("lat", "mean")], "lon": stats[("lon", "mean")]})[~ambiguous]
+        by_key.index = [key_hash(key) for key in by_key.index]
+        by_key = by_key.sort_index()
+
+        postal = pd.DataFrame(columns=["lat", "lon"])
+        if "postal_code" in frame.columns:
+            coded = frame[frame["postal_code"].notna()]
+            full = coded.groupby("postal_code")[["lat", "lon"]].mean()
+            fsa = coded.assign(fsa=coded["postal_code"].str[:3]).groupby("fsa")[["lat", "lon"]].mean()
+            postal = pd.concat([full, fsa])
+            postal.index = [key_hash(code) for code in postal.index]
+            postal = postal.sort_index()
+
+        logger.info(f"Built geocoder index with {len(by_key)} address keys and {len(postal)} postal codes "
+                    f"from {len(points)} address points ({int(ambiguous.sum())} ambiguous keys left out)")
+        return cls(by_key.index.to_numpy(), by_key["lat"].to_numpy(), by_key["lon"].to_numpy(),
+                   postal.index.to_numpy(), postal["lat"].to_numpy(), postal["lon"].to_numpy())
+
+    def save(self, path=GEOCODER_INDEX_PATH):
+        """Save the index as an uncompressed .npz (fast to load)."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        np.savez(path, keys=self.keys, lats=self.lats, lons=self.lons, postal_keys=self.postal_keys,
+                 postal_lats=self.postal_lats, postal_lons=self.postal_lons)
+        logger.info(f"Geocoder index saved to {path}")
+        return path
+
+    @classmethod
+    def load(cls, path=GEOCODER_INDEX_PATH):
+        """Load an index saved with save()."""
+        with np.load(path) as data:
+            return cls(data["keys"], data["lats"], data["lons"],
+                       data["postal_keys"], data["postal_lats"], data["postal_lons"])
+
+    def lookup(self, addresses):
+        """
+        Place addresses by civic address, falling back to postal code, then FSA.
+
+        The civic address is tried qualified by its city, then by its FSA, then
+        bare; ambiguous keys are not in the index, so they fall through.
+
+        Args:
+            addresses (list): Address texts
+
+        Returns:
+            tuple: (lats, lons, sources) arrays; NaN and '' where nothing matched.
+            sources is 'address_point', 'postal_code' or 'fsa'.
+        """
+        n = len(addresses)
+        lats = np.full(n, np.nan)
+        lons = np.full(n, np.nan)
+        sources = np.full(n, "", dtype=object)
+
+        candidates = [qualified_street_keys(a) for a in addresses]
+        found = np.zeros(n, dtype=bool)
+        for level in range(max(map(len, candidates), default=0)):
+            pending = np.flatnonzero(~found)
+            keys = [candidates[i][level] if level < len(candidates[i]) else None for i in pending]
+            positions, hit = _sorted_lookup(self.keys, _hashes(keys))
+            lats[pending[hit]] = self.lats[positions[hit]]
+            lons[pending[hit]] = self.lons[positions[hit]]
+            found[pending[hit]] = True
+        sources[found] = "address_point"
+
+        missing = np.flatnonzero(~found)
+        if len(missing) and len(self.postal_keys):
+            codes = [parse_address(addresses[i]).postal_code for i in missing]
+            for source, keys in (("postal_code", codes), ("fsa", [c[:3] if c else None for c in codes])):
+                positions, hit = _sorted_lookup(self.postal_keys, _hashes(keys))
+                hit &= sources[missing] == ""
+                lats[missing[hit]] = self.postal_lats[positions[hit]]
+                lons[missing[hit]] = self.postal_lons[positions[hit]]
+                sources[missing[hit]] = source
+
+        return lats, lons, sources
+
+class GeocodeCache:
+    """SQLite cache of external geocoder results, keyed by canonical address."""
+
+    def __init__(self, path=GEOCODE_CACHE_PATH, negative_ttl=GEOCODE_NEGATIVE_TTL):
+        """
+        Open (or create) the cache.
+
+        Args:
+            path (str): SQLite file path, or ':memory:'
+            negative_ttl (int): Seconds a "could not be placed" entry stays valid
+        """
+        self.path = path
+        self.negative_ttl = negative_ttl
+        self._lock = threading.Lock()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS geocode_cache (
+                key TEXT PRIMARY KEY,
+                lat REAL,
+                lon REAL,
+                source TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+    def get_many(self, addresses):
+        """
+        Look up cached results.
+
+        Args:
+            addresses (list): Address texts
+
+        Returns:
+            dict: Address to (lat, lon), or to None for addresses the geocoder
+            could not place; cache misses and expired entries are left out
+        """
+        keys = {address: canonical_key(address) for address in addresses}
+        unique_keys = list(set(keys.values()))
+        negative_since = time.time() - self.negative_ttl
+        found = {}
+        with self._lock:
+            # SQLite limits the number of bound parameters per statement
+            for i in range(0, len(unique_keys), 500):
+                chunk = unique_keys[i:i + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, lat, lon FROM geocode_cache WHERE key IN ({placeholders}) "
+                    f"AND (lat IS NOT NULL OR created_at >= ?)", chunk + [negative_since]
+                ).fetchall()
+                found.update({key: None if lat is None else (lat, lon) for key, lat, lon in rows})
+        return {address: found[key] for address, key in keys.items() if key in found}
+
+    def put_many(self, results, source="external"):
+        """
+        Store geocoder results.
+
+        Args:
+            results (dict): Address to (lat, lon), or to None when the address could not be placed
+            source (str): Name of the geocoder that produced the results
+        """
+        now = time.time()
+        rows = [
+            (canonical_key(address), *(point if point else (None, None)), source, now)
+            for address, point in results.items()
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO geocode_cache (key, lat, lon, source, created_at) VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+            self._conn.commit()
+
+    def close(self):
+        """Close the database connection."""
+        self._conn.close()
+
+class GoogleGeocoder(APIScraper):
+    """External geocoder backed by the Google Geocoding API."""
+
+    def __init__(self, api_key=GOOGLE_MAPS_API_KEY, delay=SCRAPE_DELAY, base_url=GEOCODE_URL):
+        """
+        Initialize the geocoder.
+
+        Args:
+            api_key (str): Google Maps API key
+            delay (int): Delay before each request in seconds
+            base_url (str): Geocoding endpoint (override to point at a stub)
+        """
+        super().__init__(delay=delay)
+        self.api_key = api_key
+        self.base_url = base_url
+
+    def geocode(self, address):
+        """
+        Geocode one address.
+
+        Returns:
+            tuple: (lat, lon), or None if the address was not found
+
+        Raises:
+            GeocodeError: If the lookup failed for another reason (e.g. OVER_QUERY_LIMIT,
+                REQUEST_DENIED or no response), so the failure is not cached as "not found"
+        """
+        json_data = self.fetch_json(self.base_url, params={"address": address, "key": self.api_key})
+        status = json_data.get("status", "UNKNOWN_ERROR") if json_data else "NO_RESPONSE"
+        if status not in CACHEABLE_STATUSES:
+            raise GeocodeError(f"Geocoding failed for {address}: {status}")
+        if status == "ZERO_RESULTS" or not json_data.get("results"):
+            logger.warning(f"Geocoding found no results for {address}")
+            return None
+        location = json_data["results"][0]["geometry"]["location"]
+        return location["lat"], location["lng"]
+
+class Geocoder:
+    """Offline geocoder with an optional cached external fallback."""
+
+    def __init__(self, index=None, index_path=GEOCODER_INDEX_PATH, cache=None, external=None, use_cache=True):
+        """
+        Initialize the geocoder.
+
+        Args:
+            index (GeocoderIndex): Index to use (default: loaded from index_path if it exists)
+            index_path (str): Saved index location
+            cache (GeocodeCache): Cache of external results (default: the persistent cache)
+            external: Object with a geocode(address) method returning (lat, lon) or
+                None (not found) and raising GeocodeError on transient failures,
+                consulted for addresses the index cannot place exactly (optional)
+            use_cache (bool): Whether to read and store external results in the cache
+        """
+        if index is None:
+            if os.path.exists(index_path):
+                index = GeocoderIndex.load(index_path)
+            else:
+                logger.warning(f"No geocoder index at {index_path}; build one with build_geocoder_index()")
+                index = GeocoderIndex([], [], [])
+        self.index = index
+        self.cache = (cache if cache is not None else GeocodeCache()) if use_cache else None
+        self.external = external
+
+    def geocode_many(self, addresses):
+        """
+        Geocode many addresses.
+
+        Each address is resolved by the first of: an exact address point, a
+        cached external result, the external geocoder, the postal-code or FSA
+        centroid.
+
+        Args:
+            addresses (list): Address texts
+
+        Returns:
+            DataFrame: lat, lon and geocode_source per address, aligned with the input
+        """
+        addresses = list(addresses)
+        lats, lons, sources = self.index.lookup(addresses)
+        approximate = [i for i in range(len(addresses)) if sources[i] != "address_point"]
+
+        resolved = {}
+        if approximate and self.cache is not None:
+            resolved.update({a: (p, "cache") for a, p in
+                             self.cache.get_many([addresses[i] for i in approximate]).items()})
+        if self.external:
+            pending = {}
+            for i in approximate:
+                key = canonical_key(addresses[i])
+                if addresses[i] not in resolved and key not in pending:
+                    pending[key] = addresses[i]
+            if pending:
+                logger.info(f"Geocoding {len(pending)} addresses with {type(self.external).__name__}")
+                fetched = {}
+                for address in pending.values():
+                    try:
+                        fetched[address] = self.external.geocode(address)
+                    except GeocodeError as e:
+                        # Not cached, so the address is looked up again next time
+                        logger.warning(str(e))
+                if self.cache is not None:
+                    self.cache.put_many(fetched, type(self.external).__name__)
+                by_key = {canonical_key(a): p for a, p in fetched.items()}
+                for i in approximate:
+                    key = canonical_key(addresses[i])
+                    if addresses[i] not in resolved and key in by_key:
+                        resolved[addresses[i]] = (by_key[key], "external")
+
+        for i in approximate:
+            point, source = resolved.get(addresses[i], (None, None))
+            if point:
+                lats[i], lons[i] = point
+                sources[i] = source
+
+        placed = int(np.isfinite(lats).sum())
+        logger.info(f"Geocoded {placed} of {len(addresses)} addresses")
+        return pd.DataFrame({"lat": lats, "lon": lons, "geocode_source": sources})
+
+    def geocode(self, address):
+        """
+        Geocode one address.
+
+        Returns:
+            tuple: (lat, lon), or None if the address could not be placed
+        """
+        row = self.geocode_many([address]).iloc[0]
+        return None if np.isnan(row["lat"]) else (float(row["lat"]), float(row["lon"]))
+
+def build_geocoder_index(source=ADDRESS_POINTS_FILE, index_path=GEOCODER_INDEX_PATH, columns=None):
+    """
+    Build the geocoder index from an address-points file and save it.
+
+    Returns:
+        GeocoderIndex: The built index
+    """
+    index = GeocoderIndex.build(source, columns)
+    index.save(index_path)
+    return index
+
+_default_geocoder = None
+
+def get_default_geocoder():
+    """
+    Get the process-wide geocoder (saved index, persistent cache, no external geocoder).
+
+    Returns:
+        Geocoder: Shared geocoder instance
+    """
+    global _default_geocoder
+    if _default_geocoder is None:
+        _default_geocoder = Geocoder()
+    return _default_geocoder
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the offline geocoder index")
+    parser.add_argument("--source", default=ADDRESS_POINTS_FILE, help="Address-points CSV file")
+    parser.add_argument("--output", default=GEOCODER_INDEX_PATH, help="Index file to write")
+    for name, default in DEFAULT_COLUMNS.items():
+        parser.add_argument(f"--{name.replace('_', '-')}-column", default=default,
+                            help=f"Column holding the {name.replace('_', ' ')}")
+    args = parser.parse_args()
+    build_geocoder_index(args.source, args.output, {
+        name: getattr(args, f"{name}_column") for name in DEFAULT_COLUMNS
+    })
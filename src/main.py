@@ -24,6 +24,7 @@ from src.scrapers.scrape_realtor import scrape_ottawa_listings
 from src.crime_data_api import get_crime_stats  # Changed from crimes_near_location
 from src.scrapers.commute_time import scrape_commute_data
 from src.merge_data import create_final_dataset
+from src.address import unique_addresses
 from src.config import GOOGLE_MAPS_API_KEY, DEFAULT_DESTINATION, OUTPUT_DIRECTORY, DEFAULT_OUTPUT_FILENAME
 
 def parse_args():
@@ -90,6 +91,12 @@ def main():
         else:
             addresses = realtor_df['address'].tolist()
     
+    # Route each distinct address once; the merge fans results back out to every listing
+    unique = unique_addresses(addresses)
+    if len(unique) < len(addresses):
+        logger.info(f"Deduplicated {len(addresses)} addresses to {len(unique)} distinct addresses")
+    addresses = unique
+    
     commute_df = scrape_commute_data(addresses, args.destination)
     commute_csv = os.path.join(raw_dir, "commute_data.csv")
     commute_df.to_csv(commute_csv, index=False)
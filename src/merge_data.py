@@ -2,8 +2,19 @@
 Module for merging data from different sources (real estate, crime, commute).
 """
 import pandas as pd
+import numpy as np
 import os
-from src.config import OUTPUT_DIRECTORY, DEFAULT_OUTPUT_FILENAME
+import time
+import argparse
+from src.config import OUTPUT_DIRECTORY, DEFAULT_OUTPUT_FILENAME, CRIME_RADIUS_KM, CRIME_TOP_TYPES, PEOPLE_PER_SQ_KM
+from src.address import canonical_key, address_codes
+from src.fuzzy_match import fuzzy_match_addresses
+from src.spatial_index import GridIndex
+from src.crime_parallel import count_crimes_by_type
+from src.geocoder import get_default_geocoder
+
+# Coordinate column pairs recognized in listing and crime data
+COORDINATE_COLUMNS = (('lat', 'lon'), ('latitude', 'longitude'))
 
 def load_dataframes(real_estate_file, commute_time_file, crime_data_file=None):
     """
@@ -41,55 +52,206 @@ def load_dataframes(real_estate_file, commute_time_file, crime_data_file=None):
     
     return real_estate_df, commute_df, crime_df
 
-def merge_real_estate_and_commute(real_estate_df, commute_df):
+def merge_real_estate_and_commute(real_estate_df, commute_df, fuzzy=True):
     """
     Merge real estate and commute data based on address.
     
+    Addresses are matched on their canonical key, so spelling variants of the
+    same address join, and each address keeps a single commute row. Both
+    address columns are numbered together (see address_codes), so every
+    distinct spelling is parsed once, and the join is on the int64 codes;
+    neither input DataFrame is modified. Listings left
+    unmatched then go through a blocked fuzzy match against the commute
+    addresses (see src.fuzzy_match).
+    
     Args:
         real_estate_df (DataFrame): Real estate listings data
         commute_df (DataFrame): Commute times data
+        fuzzy (bool): Whether to run the fuzzy second pass
         
     Returns:
-        DataFrame: Merged data
+        DataFrame: Merged data, one row per listing in the input order. The
+        rows matched by each pass are in merged_df.attrs["match_report"].
     """
-    # Clean and standardize address fields for matching
-    real_estate_df['address_clean'] = real_estate_df['address'].str.lower().str.strip()
-    commute_df['address_clean'] = commute_df['address'].str.lower().str.strip()
-    
-    # Merge dataframes on cleaned address
-    merged_df = pd.merge(
-        real_estate_df, 
-        commute_df, 
-        left_on='address_clean', 
-        right_on='address_clean', 
-        how='left',
-        suffixes=('', '_commute')
-    )
+    listing_keys, commute_keys = address_codes(real_estate_df['address'], commute_df['address'])
+    
+    # First commute row of every address that has one
+    first = (commute_keys >= 0) & ~pd.Series(commute_keys).duplicated().to_numpy()
+    row_of_key = np.full(max(listing_keys.max(initial=-1), commute_keys.max(initial=-1)) + 2, -1, dtype=np.int64)
+    row_of_key[commute_keys[first]] = np.arange(int(first.sum()))
+    # Missing listing addresses (-1) look up the last slot, which no key uses
+    positions = row_of_key[listing_keys]
+    report = {"exact": int((positions >= 0).sum()), "fuzzy": 0}
     
-    # Drop duplicate address columns and temporary columns
-    if 'address_commute' in merged_df.columns:
-        merged_df = merged_df.drop(columns=['address_commute'])
-    merged_df = merged_df.drop(columns=['address_clean'])
+    if fuzzy:
+        pending = np.flatnonzero((positions < 0) & (listing_keys >= 0))
+        if len(pending):
+            found = fuzzy_match_addresses(real_estate_df['address'].to_numpy()[pending],
+                                          commute_df['address'].to_numpy()[first])
+            positions[pending] = found
+            report["fuzzy"] = int((found >= 0).sum())
+    report["unmatched"] = int((positions < 0).sum())
+    print(f"Commute data matched for {report['exact']} listings exactly and {report['fuzzy']} by fuzzy "
+          f"matching; {report['unmatched']} without a match")
     
+    # Commute columns in listing order (NaN rows where nothing matched)
+    commute_columns = commute_df.loc[first].drop(columns=['address']).reset_index(drop=True)
+    commute_columns = commute_columns.rename(
+        columns={col: f"{col}_commute" for col in commute_columns.columns if col in real_estate_df.columns})
+    commute_columns = commute_columns.reindex(positions).reset_index(drop=True)
+    
+    merged_df = pd.concat([real_estate_df.reset_index(drop=True), commute_columns], axis=1)
+    merged_df.attrs["match_report"] = report
     return merged_df
 
-def add_crime_data(merged_df, crime_df):
+def _string_merge(real_estate_df, commute_df):
+    """Reference join: canonical key strings as object columns and pd.merge (for benchmarks)."""
+    real_estate_df = real_estate_df.assign(address_key=real_estate_df['address'].map(canonical_key))
+    commute_df = commute_df.assign(address_key=commute_df['address'].map(canonical_key))
+    commute_df = commute_df.drop_duplicates(subset='address_key')
+    merged_df = pd.merge(real_estate_df, commute_df, on='address_key', how='left', suffixes=('', '_commute'))
+    return merged_df.drop(columns=['address_commute', 'address_key'])
+
+def benchmark_merge(n_rows=1000000, overlap=0.9, seed=0, repeat=3):
+    """
+    Time the code-keyed commute join against the string-keyed merge.
+    
+    Listings and commute rows use different spellings of the same
+    addresses, so every match goes through canonicalization.
+    
+    Args:
+        n_rows (int): Rows on each side
+        overlap (float): Share of listings that have a commute row
+        repeat (int): Runs of each join, alternating between them; the fastest run counts
+        
+    Returns:
+        dict: Timings in seconds
+    """
+    rng = np.random.default_rng(seed)
+    streets = np.array([f"street{i}" for i in range(5000)])
+    # Distinct (number, street) pairs: number and street come from one permutation
+    pairs = rng.permutation(9999 * len(streets))[:n_rows * 2]
+    numbers, street_ids = pairs % 9999 + 1, pairs // 9999
+    listing_addresses = [f"{n} {streets[s]} Street, Ottawa, ON" for n, s in zip(numbers[:n_rows], street_ids[:n_rows])]
+    matched = int(n_rows * overlap)
+    commute_addresses = [f"{n} {streets[s].upper()} ST, OTTAWA" for n, s in
+                         zip(np.r_[numbers[:matched], numbers[n_rows:2 * n_rows - matched]],
+                             np.r_[street_ids[:matched], street_ids[n_rows:2 * n_rows - matched]])]
+    real_estate_df = pd.DataFrame({"address": listing_addresses, "price": rng.integers(200000, 2000000, n_rows)})
+    commute_df = pd.DataFrame({"address": commute_addresses,
+                               "commute_time_seconds": rng.integers(300, 5400, n_rows)}).sample(frac=1, random_state=seed)
+    
+    results = {"code_join_s": float("inf"), "string_merge_s": float("inf")}
+    for _ in range(repeat):
+        canonical_key.cache_clear()
+        start = time.perf_counter()
+        merged = merge_real_estate_and_commute(real_estate_df, commute_df, fuzzy=False)
+        results["code_join_s"] = min(results["code_join_s"], time.perf_counter() - start)
+        
+        canonical_key.cache_clear()
+        start = time.perf_counter()
+        expected = _string_merge(real_estate_df, commute_df)
+        results["string_merge_s"] = min(results["string_merge_s"], time.perf_counter() - start)
+    assert merged.equals(expected), "code join and string merge disagree"
+    
+    # Join step alone, on keys computed ahead of time
+    listing_keys, commute_keys = address_codes(real_estate_df['address'], commute_df['address'])
+    start = time.perf_counter()
+    pd.Index(pd.unique(commute_keys)).get_indexer(listing_keys)
+    results["int64_key_join_s"] = time.perf_counter() - start
+    listing_strings = real_estate_df['address'].map(canonical_key)
+    commute_strings = commute_df['address'].map(canonical_key)
+    start = time.perf_counter()
+    pd.merge(listing_strings.to_frame('k'), commute_strings.drop_duplicates().to_frame('k'), on='k', how='left')
+    results["string_key_join_s"] = time.perf_counter() - start
+    
+    print(f"{n_rows} listings x {n_rows} commute rows, {merged['commute_time_seconds'].notna().mean():.0%} matched")
+    for name, value in results.items():
+        print(f"  {name:20s} {value:8.2f} s")
+    print(f"  key memory           {listing_keys.nbytes / 1e6:8.1f} MB int64 vs "
+          f"{listing_strings.memory_usage(deep=True) / 1e6:.1f} MB strings")
+    return results
+
+def _coordinates(df):
+    """(lats, lons) float arrays from the first coordinate column pair present, or None."""
+    for lat_col, lon_col in COORDINATE_COLUMNS:
+        if lat_col in df.columns and lon_col in df.columns:
+            return (pd.to_numeric(df[lat_col], errors='coerce').to_numpy(dtype=np.float64),
+                    pd.to_numeric(df[lon_col], errors='coerce').to_numpy(dtype=np.float64))
+    return None
+
+def add_crime_data(merged_df, crime_df, radius_km=CRIME_RADIUS_KM, top_types=CRIME_TOP_TYPES, geocoder=None):
     """
     Add crime data to the merged dataframe.
     
+    A spatial join of listings against the incidents: the incidents are
+    put in a grid index and every listing's incidents within the radius are
+    counted per offence type in one batch query. Listings without lat/lon
+    columns are geocoded from their address.
+    
+    Added columns:
+        crime_count (Int32): Incidents within the radius
+        crime_rate (float64): Incidents per 1000 people (area population estimate)
+        top_crime_<n> (category): n-th most common offence type nearby
+        top_crime_<n>_count (Int32): Incidents of that type
+    All are missing for listings that could not be placed. There are always
+    top_types pairs of top_crime columns; a listing with fewer offence types
+    nearby has a missing type and a count of 0 in the remaining ones.
+    
     Args:
         merged_df (DataFrame): Merged real estate and commute data
-        crime_df (DataFrame): Crime data with location information
+        crime_df (DataFrame): Crime incidents with lat/lon (or latitude/longitude)
+            and offense_code columns, e.g. from CrimeDataAPI.get_crime_dataframe()
+        radius_km (float): Radius around each listing in kilometers
+        top_types (int): Number of top offence types per listing
+        geocoder (Geocoder): Geocoder for listings without coordinates (default: the shared one)
         
     Returns:
-        DataFrame: Final merged dataframe with crime data
+        DataFrame: Final merged dataframe with crime data (merged_df is not modified)
     """
     if crime_df is None:
         return merged_df
+    crime_coordinates = _coordinates(crime_df)
+    if crime_coordinates is None:
+        print("Warning: Crime data has no coordinate columns. Skipping crime columns.")
+        return merged_df
     
-    # This would need to be implemented based on the actual crime data structure
-    # For now, we'll just return the merged_df
-    return merged_df
+    coordinates = _coordinates(merged_df)
+    if coordinates is None:
+        geocoded = (geocoder or get_default_geocoder()).geocode_many(merged_df['address'].tolist())
+        coordinates = geocoded['lat'].to_numpy(dtype=np.float64), geocoded['lon'].to_numpy(dtype=np.float64)
+    lats, lons = coordinates
+    located = np.isfinite(lats) & np.isfinite(lons)
+    
+    # Offence codes for the incidents, then counts per listing and code
+    offences = crime_df['offense_code'] if 'offense_code' in crime_df.columns else pd.Series('Unknown', index=crime_df.index)
+    codes, names = pd.factorize(offences.fillna('Unknown').astype(str))
+    index = GridIndex(*crime_coordinates)
+    counts = count_crimes_by_type(index, codes, max(len(names), 1), lats, lons, radius_km * 1000)
+    totals = counts.sum(axis=1)
+    if counts.shape[1] < top_types:
+        # Fewer offence types than top_crime columns; the padding types never occur
+        counts = np.pad(counts, ((0, 0), (0, top_types - counts.shape[1])))
+    
+    result = merged_df.copy()
+    result['crime_count'] = pd.arrays.IntegerArray(totals.astype(np.int32), ~located)
+    estimated_population = np.pi * radius_km * radius_km * PEOPLE_PER_SQ_KM
+    result['crime_rate'] = np.where(located, totals / estimated_population * 1000, np.nan)
+    
+    # Most common types first; ties keep the order types first appear in the data
+    ranked = np.argsort(-counts, axis=1, kind='stable')[:, :top_types]
+    categories = pd.Index(names)
+    for n in range(top_types):
+        top_codes = ranked[:, n]
+        top_counts = counts[np.arange(len(counts)), top_codes]
+        present = located & (top_counts > 0)
+        result[f'top_crime_{n + 1}'] = pd.Categorical.from_codes(np.where(present, top_codes, -1),
+                                                                 categories=categories)
+        result[f'top_crime_{n + 1}_count'] = pd.arrays.IntegerArray(top_counts.astype(np.int32), ~located)
+    
+    print(f"Added crime data for {int(located.sum())} of {len(result)} listings "
+          f"({len(crime_df)} incidents, {radius_km:g} km radius)")
+    return result
 
 def create_final_dataset(real_estate_file, commute_time_file, crime_data_file=None, output_file=None):
     """
@@ -127,6 +289,15 @@ def create_final_dataset(real_estate_file, commute_time_file, crime_data_file=No
     return final_df
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Merge real estate, commute and crime data")
+    parser.add_argument("--benchmark", action="store_true", help="Benchmark the commute join instead")
+    parser.add_argument("--rows", type=int, default=1000000, help="Rows per side for --benchmark")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs of each join for --benchmark")
+    args = parser.parse_args()
+    if args.benchmark:
+        benchmark_merge(args.rows, repeat=args.repeat)
+        raise SystemExit
+    
     # Example usage
     output_path = os.path.join(OUTPUT_DIRECTORY, DEFAULT_OUTPUT_FILENAME)
     
@@ -35,7 +35,7 @@ class BaseScraper:
         self.session = requests.Session()
         self.session.headers.update({"User-Agent": self.user_agent})
     
-    def make_request(self, url, method="get", params=None, data=None, headers=None, timeout=10):
+    def make_request(self, url, method="get", params=None, data=None, headers=None, timeout=10, stream=False):
         """
         Make an HTTP request with error handling and rate limiting.
         
@@ -46,6 +46,7 @@ class BaseScraper:
             data (dict): Form data for POST requests
             headers (dict): Additional headers
             timeout (int): Request timeout in seconds
+            stream (bool): Whether to stream the response body instead of reading it at once
             
         Returns:
             requests.Response: Response object or None if request failed
@@ -59,7 +60,7 @@ class BaseScraper:
         
         try:
             if method.lower() == "get":
-                response = self.session.get(url, params=params, timeout=timeout)
+                response = self.session.get(url, params=params, timeout=timeout, stream=stream)
             elif method.lower() == "post":
                 response = self.session.post(url, data=data, params=params, timeout=timeout)
             else:
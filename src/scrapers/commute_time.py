@@ -2,8 +2,8 @@
 Module for calculating commute times using Google Maps Distance Matrix API.
 """
 import requests
+import numpy as np
 import pandas as pd
-import time
 import sys
 import os
 
@@ -11,8 +11,12 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
 from src.config import GOOGLE_MAPS_API_KEY, SCRAPE_DELAY, DEFAULT_DESTINATION
+from src.scrapers.distance_matrix import DistanceMatrixClient, commute_rows
+from src.commute_cache import get_default_cache
+from src.commute_estimator import CommuteEstimator
 
-def get_commute_time(origin, destination=DEFAULT_DESTINATION, mode="driving", api_key=GOOGLE_MAPS_API_KEY):
+def get_commute_time(origin, destination=DEFAULT_DESTINATION, mode="driving", api_key=GOOGLE_MAPS_API_KEY,
+                     use_cache=True):
     """
     Get the commute time between two locations using Google Maps API.
     
@@ -21,10 +25,17 @@ def get_commute_time(origin, destination=DEFAULT_DESTINATION, mode="driving", ap
         destination (str): Ending address or coordinates (defaults to config setting)
         mode (str): Travel mode ('driving', 'walking', 'transit', 'bicycling')
         api_key (str): Google Maps API key
+        use_cache (bool): Whether to check the persistent commute cache first
         
     Returns:
         dict: Dictionary containing commute information
     """
+    cache = get_default_cache() if use_cache else None
+    if cache:
+        cached = cache.get(origin, destination, mode)
+        if cached:
+            return cached
+    
     base_url = "https://maps.googleapis.com/maps/api/distancematrix/json"
     params = {
         "origins": origin,
@@ -48,46 +59,71 @@ def get_commute_time(origin, destination=DEFAULT_DESTINATION, mode="driving", ap
             print(f"Error for route: {element['status']}")
             return {"text": "N/A", "value": None}
             
-        return {
+        result = {
             "text": element["duration"]["text"],
             "value": element["duration"]["value"],  # in seconds
             "distance_text": element["distance"]["text"],
             "distance_value": element["distance"]["value"]  # in meters
         }
+        if cache:
+            cache.put(origin, destination, result, mode)
+        return result
     except Exception as e:
         print(f"Error fetching commute time: {e}")
         return {"text": "N/A", "value": None}
 
-def scrape_commute_data(addresses, workplace=DEFAULT_DESTINATION, mode="driving"):
+def scrape_commute_data(addresses, workplace=DEFAULT_DESTINATION, mode="driving", use_cache=True,
+                        coordinates=None, workplace_coordinates=None, max_commute_seconds=None,
+                        estimator=None):
     """
     Returns a DataFrame of addresses and commute times to a single workplace.
     
+    Addresses are sent to the Distance Matrix API in batches of many origins
+    per request, with the rate-limit delay applied per request rather than
+    per address.
+    
+    When coordinates, workplace_coordinates and max_commute_seconds are all
+    given, listings whose offline estimate is clearly over the limit are not
+    routed; their rows carry the estimate and commute_estimated=True.
+    
     Args:
         addresses (list): List of addresses to calculate commute from
         workplace (str): Destination address (defaults to config setting)
         mode (str): Travel mode (driving, walking, transit, bicycling)
+        use_cache (bool): Whether to serve previously routed addresses from the commute cache
+        coordinates (list): (lat, lon) per address, or None where unknown (optional)
+        workplace_coordinates (tuple): (lat, lon) of the workplace (optional)
+        max_commute_seconds (float): Commute limit used to skip far-away listings (optional)
+        estimator (CommuteEstimator): Estimator to use (defaults to the saved calibration)
         
     Returns:
         pandas.DataFrame: DataFrame with commute information
     """
-    results = []
-    for addr in addresses:
-        commute = get_commute_time(addr, workplace, mode)
-        
-        # Add to results
-        results.append({
-            "address": addr,
-            "commute_time_text": commute["text"],
-            "commute_time_seconds": commute["value"],
-            "distance_text": commute.get("distance_text", "N/A"),
-            "distance_value": commute.get("distance_value", None),
-            "mode": mode
-        })
-        
-        # Sleep to avoid hitting rate limits
-        time.sleep(SCRAPE_DELAY)
-
-    return pd.DataFrame(results)
+    skipped = {}
+    if coordinates is not None and workplace_coordinates and max_commute_seconds:
+        estimator = estimator or CommuteEstimator.load()
+        points = np.array([c if c else (np.nan, np.nan) for c in coordinates], dtype=np.float64).reshape(-1, 2)
+        too_far = estimator.clearly_exceeds(points[:, 0], points[:, 1], workplace_coordinates,
+                                            max_commute_seconds, mode)
+        distance, duration = estimator.estimate(points[:, 0], points[:, 1], [workplace_coordinates], mode)
+        for i in np.flatnonzero(too_far):
+            minutes = int(round(duration[i, 0] / 60))
+            skipped[addresses[i]] = {
+                "text": f"~{minutes} mins",
+                "value": int(duration[i, 0]),
+                "distance_text": f"~{distance[i, 0] / 1000:.1f} km",
+                "distance_value": int(distance[i, 0]),
+            }
+        print(f"Skipping {len(skipped)} of {len(addresses)} listings estimated to exceed "
+              f"{max_commute_seconds / 60:.0f} minutes")
+    
+    client = DistanceMatrixClient(api_key=GOOGLE_MAPS_API_KEY, delay=SCRAPE_DELAY, use_cache=use_cache)
+    results = client.get_commute_times([a for a in addresses if a not in skipped], workplace, mode)
+    results.update(skipped)
+    
+    commute_df = pd.DataFrame(commute_rows(addresses, results, mode))
+    commute_df["commute_estimated"] = [addr in skipped for addr in addresses]
+    return commute_df
 
 if __name__ == "__main__":
     # Test with sample addresses
@@ -0,0 +1,381 @@
+"""
+Batched client for the Google Maps Distance Matrix API.
+
+The API accepts many origins and destinations per request, so instead of one
+round trip per address the client packs addresses into requests that respect
+the per-request limits and maps the response rows back to their addresses.
+
+Run this module to check batching, fan-out and caching against a local stub
+of the endpoint.
+"""
+import json
+import logging
+import sys
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import urlparse, parse_qs
+
+# Add the parent directory to sys.path to allow for import
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.scrapers.base_scraper import APIScraper
+from src.config import GOOGLE_MAPS_API_KEY, SCRAPE_DELAY
+from src.commute_cache import CommuteCache, get_default_cache
+from src.address import canonical_key, unique_addresses
+
+logger = logging.getLogger(__name__)
+
+DISTANCE_MATRIX_URL = "https://maps.googleapis.com/maps/api/distancematrix/json"
+
+# Per-request limits of the Distance Matrix API
+MAX_ORIGINS = 25
+MAX_DESTINATIONS = 25
+MAX_ELEMENTS = 100
+
+def _missing(status):
+    """Result used when no duration is available for an origin/destination pair."""
+    return {"text": "N/A", "value": None, "status": status}
+
+def _parse_element(element):
+    """
+    Convert one response element to the commute dict used across the project.
+
+    Args:
+        element (dict): Element from a Distance Matrix response row
+
+    Returns:
+        dict: Commute information, or an N/A result carrying the element status
+    """
+    status = element.get("status", "UNKNOWN_ERROR")
+    if status != "OK":
+        return _missing(status)
+    try:
+        return {
+            "text": element["duration"]["text"],
+            "value": element["duration"]["value"],  # in seconds
+            "distance_text": element["distance"]["text"],
+            "distance_value": element["distance"]["value"],  # in meters
+            "status": status
+        }
+    except (KeyError, TypeError):
+        return _missing("INVALID_ELEMENT")
+
+def _valid_address(address):
+    """Whether an address can be sent to the API (a non-blank string)."""
+    return isinstance(address, str) and bool(address.strip())
+
+def _chunks(items, size):
+    """Split a list into consecutive chunks of at most size items."""
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+class DistanceMatrixClient(APIScraper):
+    """Distance Matrix client that sends many origins per request."""
+
+    def __init__(self, api_key=GOOGLE_MAPS_API_KEY, delay=SCRAPE_DELAY, base_url=DISTANCE_MATRIX_URL,
+                 max_origins=MAX_ORIGINS, max_destinations=MAX_DESTINATIONS, max_elements=MAX_ELEMENTS,
+                 use_cache=True, cache=None):
+        """
+        Initialize the client.
+
+        Args:
+            api_key (str): Google Maps API key
+            delay (int): Delay before each request in seconds
+            base_url (str): Distance Matrix endpoint (override to point at a stub)
+            max_origins (int): Maximum origins per request
+            max_destinations (int): Maximum destinations per request
+            max_elements (int): Maximum origins x destinations per request
+            use_cache (bool): Whether to serve repeated routes from the commute cache
+            cache (CommuteCache): Cache to use (defaults to the shared persistent cache)
+        """
+        super().__init__(delay=delay)
+        self.api_key = api_key
+        self.base_url = base_url
+        self.max_origins = max_origins
+        self.max_destinations = max_destinations
+        self.max_elements = max_elements
+        self.cache = (cache or get_default_cache()) if use_cache else None
+        self.requests_made = 0
+
+    def plan_batches(self, origins, destinations):
+        """
+        Split origins and destinations into request-sized batches.
+
+        Args:
+            origins (list): Unique origin addresses
+            destinations (list): Unique destination addresses
+
+        Returns:
+            list: (origin_batch, destination_batch) tuples
+        """
+        batches = []
+        for destination_batch in _chunks(destinations, self.max_destinations):
+            origins_per_request = max(1, min(self.max_origins, self.max_elements // len(destination_batch)))
+            for origin_batch in _chunks(origins, origins_per_request):
+                batches.append((origin_batch, destination_batch))
+        return batches
+
+    def _request_batch(self, origin_batch, destination_batch, mode, departure_time=None):
+        """
+        Send one request and map its rows and elements back to addresses.
+
+        Args:
+            origin_batch (list): Origin addresses
+            destination_batch (list): Destination addresses
+            mode (str): Travel mode
+            departure_time (int or str): Departure time ('now' or a Unix timestamp, optional)
+
+        Returns:
+            dict: (origin, destination) to commute dict
+        """
+        # '|' separates addresses in the request, but Realtor.ca uses it inside addresses
+        params = {
+            "origins": "|".join(o.replace("|", ", ") for o in origin_batch),
+            "destinations": "|".join(d.replace("|", ", ") for d in destination_batch),
+            "mode": mode,
+            "key": self.api_key
+        }
+        if departure_time is not None:
+            params["departure_time"] = departure_time
+
+        self.requests_made += 1
+        json_data = self.fetch_json(self.base_url, params=params)
+        status = json_data.get("status") if json_data else "NO_RESPONSE"
+
+        if status != "OK":
+            logger.error(f"Error from Google Maps API for {len(origin_batch)} origins: {status}")
+            return {(o, d): _missing(status) for o in origin_batch for d in destination_batch}
+
+        rows = json_data.get("rows", [])
+        if len(rows) != len(origin_batch):
+            logger.error(f"Expected {len(origin_batch)} rows from Google Maps API, got {len(rows)}")
+
+        results = {}
+        for i, origin in enumerate(origin_batch):
+            elements = rows[i].get("elements", []) if i < len(rows) else []
+            for j, destination in enumerate(destination_batch):
+                if j < len(elements):
+                    result = _parse_element(elements[j])
+                else:
+                    result = _missing("MISSING_ELEMENT")
+                if result["status"] != "OK":
+                    logger.warning(f"Error for route {origin} -> {destination}: {result['status']}")
+                results[(origin, destination)] = result
+        return results
+
+    def get_commute_matrix(self, origins, destinations, mode="driving", departure_time=None):
+        """
+        Get commute information for every origin/destination pair.
+
+        Addresses are requested once per canonical key (so spelling variants
+        of the same address share a route), and only routes missing from the
+        commute cache reach the API. Missing or blank addresses (None, NaN, '')
+        are never sent; their pairs get an N/A result with status INVALID_ADDRESS.
+
+        Args:
+            origins (list): Origin addresses
+            destinations (list): Destination addresses
+            mode (str): Travel mode (driving, walking, bicycling, transit)
+            departure_time (int or str): Departure time ('now' or a Unix timestamp, optional)
+
+        Returns:
+            dict: (origin, destination) to commute dict with text, value,
+            distance_text, distance_value and status
+        """
+        invalid = {
+            (o, d): _missing("INVALID_ADDRESS")
+            for o in origins for d in destinations
+            if not (_valid_address(o) and _valid_address(d))
+        }
+        if invalid:
+            logger.warning(f"Skipping {len(invalid)} routes with a missing or blank address")
+        results = self._request_matrix([o for o in origins if _valid_address(o)],
+                                       [d for d in destinations if _valid_address(d)],
+                                       mode, departure_time)
+        results.update(invalid)
+        return results
+
+    def _request_matrix(self, origins, destinations, mode, departure_time):
+        """get_commute_matrix() for addresses that are all valid."""
+        unique_origins = unique_addresses(origins)
+        unique_destinations = unique_addresses(destinations)
+        if not unique_origins or not unique_destinations:
+            return {}
+
+        results = {}
+        if self.cache:
+            for destination in unique_destinations:
+                hits = self.cache.get_many(unique_origins, destination, mode, departure_time)
+                results.update({(origin, destination): result for origin, result in hits.items()})
+        # Group origins by the destinations they still need so cached pairs are never re-requested
+        pending = {}
+        for origin in unique_origins:
+            missing = tuple(d for d in unique_destinations if (origin, d) not in results)
+            if missing:
+                pending.setdefault(missing, []).append(origin)
+        if not pending:
+            logger.info(f"All {len(results)} routes served from the commute cache")
+            return self._fan_out(results, origins, destinations)
+
+        batches = []
+        for missing, pending_origins in pending.items():
+            batches.extend(self.plan_batches(pending_origins, list(missing)))
+        logger.info(f"Requesting {sum(len(o) * len(d) for o, d in batches)} routes in {len(batches)} "
+                    f"requests ({len(results)} routes cached)")
+
+        fetched = {}
+        for origin_batch, destination_batch in batches:
+            fetched.update(self._request_batch(origin_batch, destination_batch, mode, departure_time))
+
+        if self.cache:
+            for destination in unique_destinations:
+                self.cache.put_many(
+                    {o: r for (o, d), r in fetched.items() if d == destination},
+                    destination, mode, departure_time
+                )
+        results.update(fetched)
+        return self._fan_out(results, origins, destinations)
+
+    def _fan_out(self, results, origins, destinations):
+        """Copy results for representative addresses to every spelling the caller passed."""
+        by_key = {(canonical_key(o), canonical_key(d)): r for (o, d), r in results.items()}
+        fanned = {}
+        for origin in origins:
+            for destination in destinations:
+                result = by_key.get((canonical_key(origin), canonical_key(destination)))
+                if result is not None:
+                    fanned[(origin, destination)] = result
+        return fanned
+
+    def get_commute_times(self, origins, destination, mode="driving", departure_time=None):
+        """
+        Get commute information from many origins to one destination.
+
+        Args:
+            origins (list): Origin addresses
+            destination (str): Destination address
+            mode (str): Travel mode (driving, walking, bicycling, transit)
+            departure_time (int or str): Departure time ('now' or a Unix timestamp, optional)
+
+        Returns:
+            dict: Origin address to commute dict
+        """
+        matrix = self.get_commute_matrix(origins, [destination], mode, departure_time)
+        return {origin: result for (origin, _), result in matrix.items()}
+
+def commute_rows(addresses, results, mode):
+    """
+    Build the commute DataFrame rows for addresses in their original order.
+
+    Args:
+        addresses (list): Addresses as given by the caller (duplicates allowed)
+        results (dict): Address to commute dict
+        mode (str): Travel mode
+
+    Returns:
+        list: Row dicts with the columns written to commute_data.csv
+    """
+    rows = []
+    for addr in addresses:
+        commute = results.get(addr) or _missing("NOT_REQUESTED")
+        rows.append({
+            "address": addr,
+            "commute_time_text": commute["text"],
+            "commute_time_seconds": commute["value"],
+            "distance_text": commute.get("distance_text", "N/A"),
+            "distance_value": commute.get("distance_value", None),
+            "mode": mode
+        })
+    return rows
+
+class _StubHandler(BaseHTTPRequestHandler):
+    """Distance Matrix stub: every route takes one minute per character of its origin."""
+
+    requests = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)
+        origins = query["origins"][0].split("|")
+        destinations = query["destinations"][0].split("|")
+        self.requests.append((len(origins), len(destinations)))
+        rows = [{"elements": [
+            {"status": "OK", "duration": {"text": f"{len(o)} mins", "value": len(o) * 60},
+             "distance": {"text": "1 km", "value": 1000}}
+            for _ in destinations
+        ]} for o in origins]
+        body = json.dumps({"status": "OK", "rows": rows}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.end_headers()
+        self.wfile.write(body)
+
+def self_check():
+    """
+    Run the client against a local stub endpoint and report mistakes.
+
+    Checks that requests respect the origin, destination and element limits,
+    that every pair is answered, that spelling variants share one route, that
+    repeated routes come from the cache and that blank addresses are never sent.
+
+    Returns:
+        list: Descriptions of failed checks
+    """
+    server = HTTPServer(("127.0.0.1", 0), _StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/json"
+    failures = []
+
+    def check(condition, description):
+        if not condition:
+            failures.append(description)
+
+    try:
+        client = DistanceMatrixClient(api_key="stub", delay=0, base_url=url, cache=CommuteCache(":memory:"))
+        cases = [
+            ([f"{i} Bank St, Ottawa" for i in range(60)], ["Parliament Hill, Ottawa"]),
+            ([f"{i} Elgin St, Ottawa" for i in range(30)], [f"{i} Slater St, Ottawa" for i in range(7)]),
+            ([f"{i} Kent St, Ottawa" for i in range(3)], [f"{i} Queen St, Ottawa" for i in range(30)]),
+        ]
+        for origins, destinations in cases:
+            _StubHandler.requests.clear()
+            matrix = client.get_commute_matrix(origins, destinations)
+            sizes = list(_StubHandler.requests)
+            check(all(o <= MAX_ORIGINS and d <= MAX_DESTINATIONS and o * d <= MAX_ELEMENTS for o, d in sizes),
+                  f"request over the limits for {len(origins)}x{len(destinations)}: {sizes}")
+            check(sum(o * d for o, d in sizes) == len(origins) * len(destinations),
+                  f"{len(origins)}x{len(destinations)} routes sent in {sizes}")
+            check(len(matrix) == len(origins) * len(destinations)
+                  and all(r["value"] == len(o) * 60 for (o, _), r in matrix.items()),
+                  f"wrong or missing results for {len(origins)}x{len(destinations)}")
+
+            _StubHandler.requests.clear()
+            cached = client.get_commute_matrix(origins, destinations)
+            check(not _StubHandler.requests and cached == matrix,
+                  f"repeated {len(origins)}x{len(destinations)} routes were requested again")
+
+        _StubHandler.requests.clear()
+        variants = ["#5 - 22 Main Street|Ottawa", "22 MAIN ST UNIT 5, Ottawa", "Apt 5, 22 Main St, Ottawa"]
+        times = client.get_commute_times(variants, "City Hall, Ottawa")
+        check(_StubHandler.requests == [(1, 1)], f"spelling variants sent as {_StubHandler.requests}")
+        check(set(times) == set(variants) and len({r["value"] for r in times.values()}) == 1,
+              f"spelling variants not fanned out: {times}")
+
+        _StubHandler.requests.clear()
+        times = client.get_commute_times(["1 Bank St, Ottawa", None, "  ", float("nan")], "City Hall, Ottawa")
+        check(_StubHandler.requests == [(1, 1)], f"blank addresses were sent: {_StubHandler.requests}")
+        check(times.get(None, {}).get("status") == "INVALID_ADDRESS", "missing address not marked INVALID_ADDRESS")
+    finally:
+        server.shutdown()
+        server.server_close()
+    return failures
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    failures = self_check()
+    for failure in failures:
+        print(failure)
+    print("Distance Matrix stub check " + ("failed" if failures else "passed"))
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,181 @@
+"""
+Shared Chrome driver profile for the Selenium-based scrapers.
+
+Builds the Chrome options used by RealtorScraper and DynamicScraper, blocks
+heavy or irrelevant subresources (images, fonts, stylesheets, map tiles,
+analytics, ads) through the DevTools protocol, and measures how many bytes a
+page actually transferred.
+"""
+import logging
+import sys
+import os
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+
+# Add the parent directory to sys.path to allow for import
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.config import PAGE_LOAD_STRATEGY, BLOCKED_URL_PATTERNS
+
+logger = logging.getLogger(__name__)
+
+# Sum of transferSize over the navigation entry and every resource entry
+TRANSFERRED_BYTES_SCRIPT = """
+var entries = performance.getEntriesByType('navigation')
+    .concat(performance.getEntriesByType('resource'));
+var total = 0;
+for (var i = 0; i < entries.length; i++) {
+    total += entries[i].transferSize || 0;
+}
+return total;
+"""
+
+def build_chrome_options(headless=True, user_agent=None, page_load_strategy=PAGE_LOAD_STRATEGY,
+                         disable_images=True, hide_automation=False):
+    """
+    Build Chrome options for a scraping session.
+
+    Args:
+        headless (bool): Whether to run the browser in headless mode
+        user_agent (str): User agent string to use (optional)
+        page_load_strategy (str): Selenium page load strategy ('normal', 'eager', 'none')
+        disable_images (bool): Whether to disable images through the content settings
+        hide_automation (bool): Whether to remove the automation flags Chrome exposes
+
+    Returns:
+        Options: Configured Chrome options
+    """
+    options = Options()
+    options.page_load_strategy = page_load_strategy
+
+    if headless:
+        options.add_argument("--headless")
+
+    if user_agent:
+        options.add_argument(f"user-agent={user_agent}")
+
+    # Add additional options for stability
+    options.add_argument("--disable-gpu")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+
+    if disable_images:
+        prefs = {"profile.managed_default_content_settings.images": 2}
+        options.add_experimental_option("prefs", prefs)
+
+    if hide_automation:
+        options.add_argument("--disable-blink-features=AutomationControlled")
+        options.add_experimental_option("excludeSwitches", ["enable-automation"])
+        options.add_experimental_option("useAutomationExtension", False)
+
+    return options
+
+def enable_resource_blocking(driver, blocked_url_patterns=None):
+    """
+    Block requests matching the given URL patterns for the rest of the session.
+
+    Args:
+        driver (webdriver.Chrome): Running Chrome driver
+        blocked_url_patterns (list): URL patterns with '*' wildcards
+            (defaults to BLOCKED_URL_PATTERNS from config)
+
+    Returns:
+        bool: True if blocking was enabled, False otherwise
+    """
+    patterns = BLOCKED_URL_PATTERNS if blocked_url_patterns is None else list(blocked_url_patterns)
+    if not patterns:
+        return False
+
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": patterns})
+        logger.info(f"Blocking {len(patterns)} URL patterns")
+        return True
+    except Exception as e:
+        logger.warning(f"Could not enable resource blocking: {e}")
+        return False
+
+def get_transferred_bytes(driver):
+    """
+    Get the number of bytes transferred for the current page.
+
+    Uses the Resource Timing API, so it counts the document and every
+    subresource fetched since the last navigation. Cached and blocked
+    requests count as zero.
+
+    Args:
+        driver (webdriver.Chrome): Running Chrome driver
+
+    Returns:
+        int: Bytes transferred, or None if they could not be measured
+    """
+    try:
+        return int(driver.execute_script(TRANSFERRED_BYTES_SCRIPT) or 0)
+    except Exception as e:
+        logger.warning(f"Could not measure transferred bytes: {e}")
+        return None
+
+def log_page_weight(driver, url):
+    """
+    Log the bytes transferred for a page that has just been loaded.
+
+    Args:
+        driver (webdriver.Chrome): Running Chrome driver
+        url (str): URL of the page (for the log message)
+
+    Returns:
+        int: Bytes transferred, or None if they could not be measured
+    """
+    transferred = get_transferred_bytes(driver)
+    if transferred is not None:
+        logger.info(f"Transferred {transferred / 1024:.1f} KiB for {url}")
+    return transferred
+
+def compare_page_weight(url, headless=True, blocked_url_patterns=None, settle_time=5):
+    """
+    Load a page with the default profile and with the blocking profile and
+    report the bytes transferred by each.
+
+    Args:
+        url (str): URL to load
+        headless (bool): Whether to run the browser in headless mode
+        blocked_url_patterns (list): URL patterns to block in the second run
+        settle_time (int): Seconds to let late subresources arrive before measuring
+
+    Returns:
+        dict: Bytes transferred before and after blocking
+    """
+    import time
+
+    results = {}
+    runs = [
+        ("before", "normal", False, []),
+        ("after", PAGE_LOAD_STRATEGY, True, blocked_url_patterns),
+    ]
+    for label, strategy, disable_images, patterns in runs:
+        options = build_chrome_options(
+            headless=headless,
+            page_load_strategy=strategy,
+            disable_images=disable_images
+        )
+        driver = webdriver.Chrome(options=options)
+        try:
+            enable_resource_blocking(driver, patterns)
+            driver.get(url)
+            time.sleep(settle_time)
+            results[label] = get_transferred_bytes(driver)
+        finally:
+            driver.quit()
+
+    if results.get("before") and results.get("after") is not None:
+        saved = 1 - results["after"] / results["before"]
+        logger.info(f"{url}: {results['before']} bytes before, {results['after']} bytes after "
+                    f"({saved:.0%} saved)")
+    return results
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO,
+                       format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    for test_url in sys.argv[1:] or ["https://www.realtor.ca/"]:
+        print(test_url, compare_page_weight(test_url))
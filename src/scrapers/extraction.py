@@ -0,0 +1,226 @@
+"""
+Declarative extraction specs for scraping repeated listing elements.
+
+A spec maps field names to a CSS selector and a type converter. It is
+compiled once (selectors are pre-compiled for the parsed-HTML backend and
+turned into a single script for the in-browser backend) and then applied in
+one pass per listing.
+
+Example:
+    spec = ExtractionSpec("div.listing", {
+        "price": ("span.price", "price"),
+        "year_built": ("span.year-built", "int"),
+        "url": {"selector": "a", "attr": "href"},
+    })
+    rows = spec.extract_html(html)            # parsed-HTML backend
+    rows = spec.extract_browser(driver)       # in-browser backend
+"""
+import json
+import re
+import logging
+import soupsieve
+from bs4 import BeautifulSoup, SoupStrainer
+
+logger = logging.getLogger(__name__)
+
+def _to_text(value):
+    """Return the stripped text."""
+    return value.strip()
+
+def _to_number(value):
+    """Strip currency symbols, thousands separators and units from a number."""
+    match = re.search(r"-?\d[\d,]*(?:\.\d+)?", value)
+    if not match:
+        raise ValueError(f"No number in {value!r}")
+    return match.group(0).replace(",", "")
+
+def _to_int(value):
+    """Convert text such as '3' or '1,500 sqft' to an int."""
+    return int(float(_to_number(value)))
+
+def _to_float(value):
+    """Convert text such as '2.5' to a float."""
+    return float(_to_number(value))
+
+# Named converters usable in specs; any callable taking a string also works
+CONVERTERS = {
+    "text": _to_text,
+    "int": _to_int,
+    "float": _to_float,
+    "price": _to_int,
+}
+
+class FieldSpec:
+    """A single compiled field: selector, optional attribute, converter and default."""
+
+    def __init__(self, name, selector, converter="text", attr=None, default="N/A"):
+        """
+        Compile a field.
+
+        Args:
+            name (str): Output column name
+            selector (str): CSS selector relative to the listing element
+            converter (str or callable): Name in CONVERTERS or a callable taking a string
+            attr (str): Attribute to read instead of the element text (optional)
+            default: Value used when the element is missing or conversion fails
+        """
+        self.name = name
+        self.selector = selector
+        self.attr = attr
+        self.default = default
+        self.convert = CONVERTERS[converter] if isinstance(converter, str) else converter
+        self.compiled = soupsieve.compile(selector)
+
+    def convert_raw(self, raw):
+        """
+        Convert a raw string to the field's value.
+
+        Args:
+            raw (str): Text or attribute value, or None if the element is missing
+
+        Returns:
+            Converted value, or the default
+        """
+        if raw is None:
+            return self.default
+        try:
+            return self.convert(raw)
+        except (ValueError, TypeError):
+            return self.default
+
+class ExtractionSpec:
+    """Compiled extraction spec for one kind of listing element."""
+
+    def __init__(self, item_selector, fields):
+        """
+        Compile a spec.
+
+        Args:
+            item_selector (str): CSS selector matching each listing element
+            fields (dict): Field name to either a selector string, a
+                (selector, converter) tuple or a dict of FieldSpec arguments
+        """
+        self.item_selector = item_selector
+        self.compiled_item = soupsieve.compile(item_selector)
+        self.fields = []
+        for name, definition in fields.items():
+            if isinstance(definition, str):
+                field = FieldSpec(name, definition)
+            elif isinstance(definition, (tuple, list)):
+                field = FieldSpec(name, *definition)
+            else:
+                field = FieldSpec(name, **definition)
+            self.fields.append(field)
+        self._browser_script = self._build_browser_script()
+        self._strainer = self._build_strainer()
+
+    def _build_strainer(self):
+        """
+        Build a SoupStrainer for simple 'tag', '.class' or 'tag.class' item selectors.
+
+        Returns:
+            SoupStrainer: Strainer keeping only listing elements, or None for
+            selectors it cannot express (the whole page is parsed then)
+        """
+        match = re.fullmatch(r"([a-zA-Z][\w-]*)?(?:\.([\w-]+))?", self.item_selector.strip())
+        if not match or not any(match.groups()):
+            return None
+        name, class_ = match.groups()
+        if class_:
+            # Match the class as one word of a space-separated class attribute
+            pattern = re.compile(rf"(^|\s){re.escape(class_)}(\s|$)")
+            return SoupStrainer(name, class_=pattern)
+        return SoupStrainer(name)
+
+    def _build_browser_script(self):
+        """Build the script that pulls every field for every listing in one call."""
+        fields = [[field.selector, field.attr] for field in self.fields]
+        return f"""
+var fields = {json.dumps(fields)};
+var items = document.querySelectorAll({json.dumps(self.item_selector)});
+var rows = [];
+for (var i = 0; i < items.length; i++) {{
+    var row = [];
+    for (var j = 0; j < fields.length; j++) {{
+        var el = items[i].querySelector(fields[j][0]);
+        if (!el) {{
+            row.push(null);
+        }} else if (fields[j][1]) {{
+            row.push(el.getAttribute(fields[j][1]));
+        }} else {{
+            row.push(el.textContent);
+        }}
+    }}
+    rows.push(row);
+}}
+return rows;
+"""
+
+    def extract_item(self, item):
+        """
+        Extract all fields from one parsed listing element.
+
+        Args:
+            item (bs4.Tag): Listing element
+
+        Returns:
+            dict: Field values
+        """
+        row = {}
+        for field in self.fields:
+            el = field.compiled.select_one(item)
+            if el is None:
+                raw = None
+            elif field.attr:
+                raw = el.get(field.attr)
+            else:
+                raw = el.get_text()
+            row[field.name] = field.convert_raw(raw)
+        return row
+
+    def extract_html(self, html):
+        """
+        Extract every listing from page HTML.
+
+        Only the listing elements are kept while parsing, so the rest of the
+        page is never built into a tree.
+
+        Args:
+            html (str): Page source
+
+        Returns:
+            list: One dict per listing
+        """
+        soup = BeautifulSoup(html, "html.parser", parse_only=self._strainer)
+        return [self.extract_item(item) for item in self.compiled_item.select(soup)]
+
+    def extract_browser(self, driver):
+        """
+        Extract every listing by running the compiled script in the browser.
+
+        Args:
+            driver (webdriver.Chrome): Driver with the page loaded
+
+        Returns:
+            list: One dict per listing
+        """
+        raw_rows = driver.execute_script(self._browser_script) or []
+        return [
+            {field.name: field.convert_raw(raw) for field, raw in zip(self.fields, raw_row)}
+            for raw_row in raw_rows
+        ]
+
+def default_listing_spec(element_class="listing"):
+    """
+    Spec matching the selectors scrape_dynamic_content has always used.
+
+    Args:
+        element_class (str): CSS class of listing elements
+
+    Returns:
+        ExtractionSpec: Compiled spec for price and year built
+    """
+    return ExtractionSpec(f"div.{element_class}", {
+        "price": "span.price",
+        "year_built": "span.year-built",
+    })
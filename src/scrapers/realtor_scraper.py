@@ -3,12 +3,15 @@ A more robust scraper for Realtor.ca that uses Selenium to bypass anti-scraping
 """
 import time
 import random
+import math
+import queue
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode, quote
 import pandas as pd
 import logging
 import os
 import sys
 from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
 # Add WebDriver Manager to auto-download the correct ChromeDriver
 from webdriver_manager.chrome import ChromeDriverManager
@@ -26,17 +29,81 @@ from selenium.webdriver.common.keys import Keys
 
 # Add the parent directory to sys.path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from src.config import USER_AGENT, SCRAPE_DELAY
+from src.config import USER_AGENT, SCRAPE_DELAY, PAGE_LOAD_STRATEGY
+from src.scrapers.driver_profile import build_chrome_options, enable_resource_blocking, log_page_weight
+from src.scrapers.tracing import StepTracer
 
 logger = logging.getLogger(__name__)
 
+REALTOR_MAP_URL = "https://www.realtor.ca/map"
+
+# Number of listing cards Realtor.ca shows per result page in list view
+RESULTS_PER_PAGE = 12
+
+# Extra attempts for a result page that fails to load before it is given up on
+PAGE_RETRIES = 2
+
+# Empty-state message the list view shows instead of cards when a search has no (more) results
+NO_RESULTS_SELECTOR = "#noResultsMessage, .noResultsMessage, .noResults"
+
+class SearchError(Exception):
+    """A search that failed, with the properties found before the failure."""
+    
+    def __init__(self, message, properties=None):
+        super().__init__(message)
+        self.properties = properties or []
+
+def build_search_url(location, page=1, min_price=None, max_price=None, min_bedrooms=None):
+    """
+    Build a Realtor.ca search URL that addresses a result page directly.
+    
+    Args:
+        location (str): Location to search in
+        page (int): Result page number (1-based)
+        min_price (int): Minimum price
+        max_price (int): Maximum price
+        min_bedrooms (int): Minimum number of bedrooms
+        
+    Returns:
+        str: Search URL with the query in its fragment
+    """
+    params = {
+        "view": "list",
+        "GeoName": location,
+        "PropertySearchTypeId": 1,
+        "TransactionTypeId": 2,
+        "Currency": "CAD",
+    }
+    if min_price:
+        params["PriceMin"] = min_price
+    if max_price:
+        params["PriceMax"] = max_price
+    if min_bedrooms:
+        params["BedRange"] = f"{min_bedrooms}-0"
+    params["CurrentPage"] = page
+    return f"{REALTOR_MAP_URL}#{urlencode(params, quote_via=quote)}"
+
+def listing_key(property_dict):
+    """
+    Get the key used to de-duplicate listing cards.
+    
+    Args:
+        property_dict (dict): Property dictionary from a result card
+        
+    Returns:
+        str: Listing URL, or the lowercased address when the card has no URL
+    """
+    return property_dict.get("url") or (property_dict.get("address") or "").lower()
+
 class RealtorScraper:
     """
     A class to scrape real estate listings from Realtor.ca using Selenium.
     This approach is more robust against anti-scraping measures than direct API requests.
     """
     
-    def __init__(self, headless=False, user_agent=USER_AGENT, delay=SCRAPE_DELAY):
+    def __init__(self, headless=False, user_agent=USER_AGENT, delay=SCRAPE_DELAY,
+                 block_resources=True, blocked_url_patterns=None, page_load_strategy=PAGE_LOAD_STRATEGY,
+                 tracer=None):
         """
         Initialize the scraper.
         
@@ -44,63 +111,88 @@ class RealtorScraper:
             headless (bool): Whether to run the browser in headless mode (default=False to debug)
             user_agent (str): User agent string to use
             delay (int): Delay between actions in seconds
+            block_resources (bool): Whether to block fonts, stylesheets, map tiles, analytics and ads
+            blocked_url_patterns (list): URL patterns to block (defaults to BLOCKED_URL_PATTERNS)
+            page_load_strategy (str): Selenium page load strategy ('normal', 'eager', 'none')
+            tracer (StepTracer): Tracer recording step timings (a new one is created if omitted)
         """
         # Running in non-headless mode so you can see what's happening
         self.headless = headless  
         self.user_agent = user_agent
         self.delay = delay
+        self.block_resources = block_resources
+        self.blocked_url_patterns = blocked_url_patterns
+        self.page_load_strategy = page_load_strategy
+        self.tracer = tracer or StepTracer("RealtorScraper")
         self.driver = None
         
     def _setup_driver(self):
         """Set up the Selenium WebDriver with appropriate options."""
-        options = Options()
-        
-        if self.headless:
-            options.add_argument("--headless")
-        
-        # Use random user agent if available, else use the provided one
-        if HAS_FAKE_UA:
-            ua = UserAgent(os='windows')
-            user_agent = ua.random
-            logger.info(f"Using random user agent: {user_agent}")
-            options.add_argument(f"user-agent={user_agent}")
-        elif self.user_agent:
-            options.add_argument(f"user-agent={self.user_agent}")
-        
-        # Add additional options for stability and to avoid detection
-        options.add_argument("--disable-gpu")
-        options.add_argument("--no-sandbox")
-        options.add_argument("--disable-dev-shm-usage")
-        options.add_argument("--disable-blink-features=AutomationControlled")
-        
-        # Disable images for faster loading
-        prefs = {"profile.managed_default_content_settings.images": 2}
-        options.add_experimental_option("prefs", prefs)
-        
-        # Remove automation flags
-        options.add_experimental_option("excludeSwitches", ["enable-automation"])
-        options.add_experimental_option("useAutomationExtension", False)
-        
-        # Initialize the driver with automatic ChromeDriver installation
-        try:
-            # Try using WebDriver Manager to automatically download and use the correct ChromeDriver
-            self.driver = webdriver.Chrome(
-                service=Service(ChromeDriverManager().install()),
-                options=options
+        with self.tracer.span("driver_setup"):
+            # Use random user agent if available, else use the provided one
+            user_agent = self.user_agent
+            if HAS_FAKE_UA:
+                ua = UserAgent(os='windows')
+                user_agent = ua.random
+                logger.info(f"Using random user agent: {user_agent}")
+        
+            # Shared profile: images disabled, eager page loads, automation flags removed
+            options = build_chrome_options(
+                headless=self.headless,
+                user_agent=user_agent,
+                page_load_strategy=self.page_load_strategy,
+                hide_automation=True
             )
-            logger.info("Successfully initialized Chrome driver using WebDriver Manager")
-        except Exception as e:
-            # Fallback to standard initialization
-            logger.warning(f"Failed to use WebDriver Manager: {e}. Falling back to standard initialization.")
-            self.driver = webdriver.Chrome(options=options)
         
-        # Set window size
-        self.driver.set_window_size(1920, 1080)
+            # Initialize the driver with automatic ChromeDriver installation
+            try:
+                # Try using WebDriver Manager to automatically download and use the correct ChromeDriver
+                self.driver = webdriver.Chrome(
+                    service=Service(ChromeDriverManager().install()),
+                    options=options
+                )
+                logger.info("Successfully initialized Chrome driver using WebDriver Manager")
+            except Exception as e:
+                # Fallback to standard initialization
+                logger.warning(f"Failed to use WebDriver Manager: {e}. Falling back to standard initialization.")
+                self.driver = webdriver.Chrome(options=options)
+        
+            # Block fonts, stylesheets, map tiles, analytics and ads
+            if self.block_resources:
+                enable_resource_blocking(self.driver, self.blocked_url_patterns)
         
-        # Add a script to help avoid detection
-        self.driver.execute_script(
-            "Object.defineProperty(navigator, 'webdriver', {get: () => undefined})"
-        )
+            # Set window size
+            self.driver.set_window_size(1920, 1080)
+        
+            # Add a script to help avoid detection
+            self.driver.execute_script(
+                "Object.defineProperty(navigator, 'webdriver', {get: () => undefined})"
+            )
+    
+    def _get(self, url):
+        """Navigate to a URL, recording a 'get' span."""
+        with self.tracer.span("get", url=url):
+            self.driver.get(url)
+    
+    def _wait(self, timeout, condition):
+        """
+        Wait for an expected condition, recording a 'wait' span.
+        
+        Args:
+            timeout (int): Maximum time to wait in seconds
+            condition (callable): Selenium expected condition
+            
+        Returns:
+            The value returned by the condition
+        """
+        name = getattr(condition, "__qualname__", type(condition).__name__).split(".")[0]
+        with self.tracer.span("wait", condition=name, timeout=timeout):
+            return WebDriverWait(self.driver, timeout).until(condition)
+    
+    def _pause(self, seconds):
+        """Sleep for a human-like delay, recording a 'sleep' span."""
+        with self.tracer.span("sleep", seconds=round(seconds, 2)):
+            time.sleep(seconds)
     
     def close(self):
         """Close the WebDriver."""
@@ -109,7 +201,7 @@ class RealtorScraper:
             self.driver = None
     
     def search_properties(self, location, min_price=None, max_price=None, 
-                          min_bedrooms=None, max_results=50):
+                          min_bedrooms=None, max_results=50, raise_errors=False):
         """
         Search for properties on Realtor.ca.
         
@@ -119,6 +211,8 @@ class RealtorScraper:
             max_price (int): Maximum price
             min_bedrooms (int): Minimum number of bedrooms
             max_results (int): Maximum number of results to return
+            raise_errors (bool): Raise SearchError when the search fails instead of
+                logging it and returning an empty list
             
         Returns:
             list: List of property dictionaries
@@ -128,17 +222,18 @@ class RealtorScraper:
             
         # Navigate to Realtor.ca
         logger.info(f"Navigating to Realtor.ca to search for: {location}")
-        self.driver.get("https://www.realtor.ca/")
+        self._get("https://www.realtor.ca/")
+        log_page_weight(self.driver, "https://www.realtor.ca/")
         
         try:
             # Increase wait time for page load
             logger.info("Waiting for main search page to load...")
-            WebDriverWait(self.driver, 15).until(
+            self._wait(15,
                 EC.presence_of_element_located((By.CSS_SELECTOR, "body"))
             )
             
             # More realistic human delay
-            time.sleep(random.uniform(3, 5))
+            self._pause(random.uniform(3, 5))
             
             # Try multiple search input selectors (the site may have changed)
             search_selectors = [
@@ -158,7 +253,7 @@ class RealtorScraper:
             for selector in search_selectors:
                 try:
                     logger.info(f"Trying selector: {selector}")
-                    search_box = WebDriverWait(self.driver, 5).until(
+                    search_box = self._wait(5,
                         EC.element_to_be_clickable((By.CSS_SELECTOR, selector))
                     )
                     if search_box:
@@ -172,7 +267,9 @@ class RealtorScraper:
                 logger.info("Search box not found, navigating directly to search URL...")
                 encoded_location = location.replace(" ", "%20")
                 self.driver.execute_script(f"window.location = 'https://www.realtor.ca/map#locationQuery={encoded_location}'")
-                time.sleep(5)
+                self._pause(5)
+                if raise_errors:
+                    raise SearchError(f"Search box not found for {location}")
                 return
             
             # Click and interact with the search box
@@ -182,12 +279,13 @@ class RealtorScraper:
             search_box.clear()
             
             # Type location with random delays between keystrokes
-            for char in location:
-                search_box.send_keys(char)
-                time.sleep(random.uniform(0.1, 0.3))
+            with self.tracer.span("type_location", location=location):
+                for char in location:
+                    search_box.send_keys(char)
+                    time.sleep(random.uniform(0.1, 0.3))
             
             # More realistic human delay
-            time.sleep(random.uniform(2, 3))
+            self._pause(random.uniform(2, 3))
             
             # Try different approaches to submit the search
             try:
@@ -214,130 +312,308 @@ class RealtorScraper:
                 search_box.send_keys(webdriver.Keys.RETURN)
             
             # Wait for search results page to load
-            WebDriverWait(self.driver, 15).until(
+            self._wait(15,
                 EC.presence_of_element_located((By.CSS_SELECTOR, ".cardCon"))
             )
+            log_page_weight(self.driver, self.driver.current_url)
             
             # Apply filters if needed
             if min_price or max_price or min_bedrooms:
-                try:
-                    # Click on filters button
-                    filter_button = WebDriverWait(self.driver, 10).until(
-                        EC.element_to_be_clickable((By.CSS_SELECTOR, ".filtersBtn"))
-                    )
-                    filter_button.click()
+                with self.tracer.span("filters"):
+                    try:
+                        # Click on filters button
+                        filter_button = self._wait(10,
+                            EC.element_to_be_clickable((By.CSS_SELECTOR, ".filtersBtn"))
+                        )
+                        filter_button.click()
                     
-                    # Wait for filter modal to appear
-                    WebDriverWait(self.driver, 10).until(
-                        EC.presence_of_element_located((By.CSS_SELECTOR, ".filterModal"))
-                    )
+                        # Wait for filter modal to appear
+                        self._wait(10,
+                            EC.presence_of_element_located((By.CSS_SELECTOR, ".filterModal"))
+                        )
                     
-                    # Apply price filters
-                    if min_price:
-                        min_price_input = self.driver.find_element(By.CSS_SELECTOR, "input[name='PriceMin']")
-                        min_price_input.clear()
-                        min_price_input.send_keys(str(min_price))
+                        # Apply price filters
+                        if min_price:
+                            min_price_input = self.driver.find_element(By.CSS_SELECTOR, "input[name='PriceMin']")
+                            min_price_input.clear()
+                            min_price_input.send_keys(str(min_price))
                         
-                    if max_price:
-                        max_price_input = self.driver.find_element(By.CSS_SELECTOR, "input[name='PriceMax']")
-                        max_price_input.clear()
-                        max_price_input.send_keys(str(max_price))
+                        if max_price:
+                            max_price_input = self.driver.find_element(By.CSS_SELECTOR, "input[name='PriceMax']")
+                            max_price_input.clear()
+                            max_price_input.send_keys(str(max_price))
                     
-                    # Apply bedroom filter
-                    if min_bedrooms:
-                        bedroom_dropdown = self.driver.find_element(By.CSS_SELECTOR, "select[name='BedroomsMin']")
-                        bedroom_dropdown.click()
-                        bedroom_option = self.driver.find_element(By.CSS_SELECTOR, f"option[value='{min_bedrooms}']")
-                        bedroom_option.click()
+                        # Apply bedroom filter
+                        if min_bedrooms:
+                            bedroom_dropdown = self.driver.find_element(By.CSS_SELECTOR, "select[name='BedroomsMin']")
+                            bedroom_dropdown.click()
+                            bedroom_option = self.driver.find_element(By.CSS_SELECTOR, f"option[value='{min_bedrooms}']")
+                            bedroom_option.click()
                     
-                    # Apply filters
-                    apply_button = self.driver.find_element(By.CSS_SELECTOR, ".applyFiltersBtn")
-                    apply_button.click()
+                        # Apply filters
+                        apply_button = self.driver.find_element(By.CSS_SELECTOR, ".applyFiltersBtn")
+                        apply_button.click()
                     
-                    # Wait for filtered results to load
-                    time.sleep(3)
+                        # Wait for filtered results to load
+                        self._pause(3)
                     
-                except (TimeoutException, NoSuchElementException) as e:
-                    logger.warning(f"Error applying filters: {e}")
+                    except (TimeoutException, NoSuchElementException) as e:
+                        logger.warning(f"Error applying filters: {e}")
             
             # Scrape the results
             properties = []
+            seen = set()
             page = 1
             
             while len(properties) < max_results:
-                logger.info(f"Scraping page {page} of results")
-                
-                # Find all property cards
-                property_cards = self.driver.find_elements(By.CSS_SELECTOR, ".cardCon")
+                with self.tracer.span("page", page=page):
+                    logger.info(f"Scraping page {page} of results")
                 
-                if not property_cards:
-                    logger.warning("No property cards found on page")
-                    break
+                    # Find all property cards
+                    property_cards = self.driver.find_elements(By.CSS_SELECTOR, ".cardCon")
                 
-                # Process each property card
-                for card in property_cards:
-                    if len(properties) >= max_results:
+                    if not property_cards:
+                        logger.warning("No property cards found on page")
                         break
-                        
-                    try:
-                        # Extract basic info
-                        address = card.find_element(By.CSS_SELECTOR, ".address").text.strip()
-                        price = card.find_element(By.CSS_SELECTOR, ".listingCardPrice").text.strip()
-                        
-                        # Extract price value (remove $ and commas)
-                        price_value = None
-                        if price:
-                            price_value = int(price.replace("$", "").replace(",", ""))
-                        
-                        # Try to get bedrooms
-                        bedrooms = None
-                        try:
-                            beds_element = card.find_element(By.CSS_SELECTOR, ".listingCardIconNum.propertyIcon-Beds")
-                            bedrooms = beds_element.text.strip()
-                        except NoSuchElementException:
-                            pass
-                            
-                        # Try to get bathrooms
-                        bathrooms = None
-                        try:
-                            baths_element = card.find_element(By.CSS_SELECTOR, ".listingCardIconNum.propertyIcon-Baths")
-                            bathrooms = baths_element.text.strip()
-                        except NoSuchElementException:
-                            pass
-                        
-                        # Create property dictionary
-                        property_dict = {
-                            "address": address,
-                            "price": price_value,
-                            "bedrooms": bedrooms,
-                            "bathrooms": bathrooms,
-                            "url": card.get_attribute("data-url")
-                        }
-                        
+                
+                    # Process each property card, skipping listings already seen on earlier pages
+                    for property_dict in self._extract_cards(property_cards):
+                        if len(properties) >= max_results:
+                            break
+                        key = listing_key(property_dict)
+                        if key in seen:
+                            continue
+                        seen.add(key)
                         properties.append(property_dict)
-                        
-                    except (NoSuchElementException, Exception) as e:
-                        logger.warning(f"Error processing property card: {e}")
                 
-                # Check if we need to go to next page
-                if len(properties) < max_results:
-                    try:
-                        next_button = self.driver.find_element(By.CSS_SELECTOR, ".paginationNext")
-                        if "disabled" not in next_button.get_attribute("class"):
-                            next_button.click()
-                            time.sleep(random.uniform(2, 4))  # Wait for next page to load
-                            page += 1
-                        else:
-                            break  # No more pages
-                    except NoSuchElementException:
-                        break  # No next button found
+                    # Check if we need to go to next page
+                    if len(properties) < max_results:
+                        try:
+                            next_button = self.driver.find_element(By.CSS_SELECTOR, ".paginationNext")
+                            if "disabled" not in next_button.get_attribute("class"):
+                                next_button.click()
+                                self._pause(random.uniform(2, 4))  # Wait for next page to load
+                                page += 1
+                            else:
+                                break  # No more pages
+                        except NoSuchElementException:
+                            break  # No next button found
             
             return properties
             
+        except SearchError:
+            raise
         except Exception as e:
+            if raise_errors:
+                raise SearchError(f"Error searching properties: {type(e).__name__}: {e}") from e
             logger.error(f"Error searching properties: {e}")
             return []
         
+    def _extract_cards(self, property_cards):
+        """
+        Extract property dictionaries from result cards.
+        
+        Args:
+            property_cards (list): Web elements matching .cardCon
+            
+        Returns:
+            list: List of property dictionaries
+        """
+        properties = []
+        with self.tracer.span("extract", cards=len(property_cards)):
+            for card in property_cards:
+                try:
+                    # Extract basic info
+                    address = card.find_element(By.CSS_SELECTOR, ".address").text.strip()
+                    price = card.find_element(By.CSS_SELECTOR, ".listingCardPrice").text.strip()
+                
+                    # Extract price value (remove $ and commas)
+                    price_value = None
+                    if price:
+                        price_value = int(price.replace("$", "").replace(",", ""))
+                
+                    # Try to get bedrooms
+                    bedrooms = None
+                    try:
+                        beds_element = card.find_element(By.CSS_SELECTOR, ".listingCardIconNum.propertyIcon-Beds")
+                        bedrooms = beds_element.text.strip()
+                    except NoSuchElementException:
+                        pass
+                    
+                    # Try to get bathrooms
+                    bathrooms = None
+                    try:
+                        baths_element = card.find_element(By.CSS_SELECTOR, ".listingCardIconNum.propertyIcon-Baths")
+                        bathrooms = baths_element.text.strip()
+                    except NoSuchElementException:
+                        pass
+                
+                    # Create property dictionary
+                    properties.append({
+                        "address": address,
+                        "price": price_value,
+                        "bedrooms": bedrooms,
+                        "bathrooms": bathrooms,
+                        "url": card.get_attribute("data-url")
+                    })
+                
+                except (NoSuchElementException, Exception) as e:
+                    logger.warning(f"Error processing property card: {e}")
+        
+        return properties
+    
+    def scrape_result_page(self, location, page, min_price=None, max_price=None, min_bedrooms=None):
+        """
+        Load one page of search results directly by its page number and extract its cards.
+        
+        Args:
+            location (str): Location to search in
+            page (int): Result page number (1-based)
+            min_price (int): Minimum price
+            max_price (int): Maximum price
+            min_bedrooms (int): Minimum number of bedrooms
+            
+        Returns:
+            list: List of property dictionaries (empty if the page has no results)
+            
+        Raises:
+            TimeoutException: If the page showed neither cards nor the no-results
+                message in time, so a slow page is never mistaken for the end of the results
+        """
+        if not self.driver:
+            self._setup_driver()
+        
+        url = build_search_url(location, page, min_price, max_price, min_bedrooms)
+        logger.info(f"Loading result page {page}: {url}")
+        with self.tracer.span("page", page=page):
+            already_on_map = self.driver.current_url.startswith(REALTOR_MAP_URL)
+            self._get(url)
+            if already_on_map:
+                # Only the fragment changed, so the browser did not reload; force the app to re-read it
+                with self.tracer.span("refresh", url=url):
+                    self.driver.refresh()
+            
+            try:
+                self._wait(15, EC.any_of(
+                    EC.presence_of_element_located((By.CSS_SELECTOR, ".cardCon")),
+                    EC.presence_of_element_located((By.CSS_SELECTOR, NO_RESULTS_SELECTOR))
+                ))
+            except TimeoutException as e:
+                raise TimeoutException(f"Result page {page} did not finish loading") from e
+            log_page_weight(self.driver, url)
+            
+            property_cards = self.driver.find_elements(By.CSS_SELECTOR, ".cardCon")
+            if not property_cards:
+                logger.info(f"No property cards on result page {page}")
+            return self._extract_cards(property_cards)
+    
+    def search_properties_parallel(self, location, min_price=None, max_price=None,
+                                   min_bedrooms=None, max_results=50, page_workers=4,
+                                   results_per_page=RESULTS_PER_PAGE, page_retries=PAGE_RETRIES,
+                                   raise_errors=False):
+        """
+        Search for properties by loading result pages concurrently.
+        
+        Each page is addressed directly through the search URL and dispatched to a
+        pool of drivers (this scraper plus page_workers - 1 extra browsers). Pages are
+        requested in waves of page_workers until enough listings are found or a page
+        comes back empty. A page that raises is retried up to page_retries times; if it
+        still fails it is skipped and logged rather than taken as the end of the results
+        (a wave in which every page fails stops the search). Cards are de-duplicated by
+        listing URL so results that shift between pages are only counted once.
+        
+        Args:
+            location (str): Location to search in (city, neighborhood, postal code)
+            min_price (int): Minimum price
+            max_price (int): Maximum price
+            min_bedrooms (int): Minimum number of bedrooms
+            max_results (int): Maximum number of results to return
+            page_workers (int): Number of browsers loading pages at the same time
+            results_per_page (int): Number of cards Realtor.ca shows per page
+            page_retries (int): Extra attempts for a page that fails to load
+            raise_errors (bool): Raise SearchError, carrying the properties that were found,
+                when pages failed instead of only logging them
+            
+        Returns:
+            list: List of property dictionaries in page order
+        """
+        page_workers = max(1, page_workers)
+        pool = queue.Queue()
+        pool.put(self)
+        extra_scrapers = []
+        for _ in range(page_workers - 1):
+            scraper = RealtorScraper(
+                headless=self.headless,
+                user_agent=self.user_agent,
+                delay=self.delay,
+                block_resources=self.block_resources,
+                blocked_url_patterns=self.blocked_url_patterns,
+                page_load_strategy=self.page_load_strategy,
+                tracer=self.tracer
+            )
+            extra_scrapers.append(scraper)
+            pool.put(scraper)
+        
+        def load_page(page):
+            """Cards of a result page ([] when it has none), or None if every attempt failed."""
+            scraper = pool.get()
+            try:
+                for attempt in range(1, page_retries + 2):
+                    try:
+                        return scraper.scrape_result_page(location, page, min_price, max_price, min_bedrooms)
+                    except Exception as e:
+                        logger.warning(f"Error loading result page {page} "
+                                       f"(attempt {attempt} of {page_retries + 1}): {e}")
+                return None
+            finally:
+                pool.put(scraper)
+        
+        properties = []
+        failed_pages = []
+        seen = set()
+        next_page = 1
+        # Never request more pages than max_results could possibly need
+        last_page = max(1, math.ceil(max_results / results_per_page))
+        
+        try:
+            with ThreadPoolExecutor(max_workers=page_workers) as executor:
+                while len(properties) < max_results and next_page <= last_page:
+                    pages = list(range(next_page, min(next_page + page_workers, last_page + 1)))
+                    next_page = pages[-1] + 1
+                    
+                    exhausted = False
+                    wave_failed = 0
+                    for page, page_properties in zip(pages, executor.map(load_page, pages)):
+                        if page_properties is None:
+                            failed_pages.append(page)
+                            wave_failed += 1
+                            continue
+                        if not page_properties:
+                            exhausted = True
+                            break
+                        for property_dict in page_properties:
+                            key = listing_key(property_dict)
+                            if key in seen:
+                                continue
+                            seen.add(key)
+                            properties.append(property_dict)
+                    
+                    if exhausted or wave_failed == len(pages):
+                        break
+                    # Pages may have shifted under us; keep going if duplicates left us short
+                    if len(properties) < max_results and next_page > last_page:
+                        last_page += math.ceil((max_results - len(properties)) / results_per_page)
+        finally:
+            for scraper in extra_scrapers:
+                scraper.close()
+        
+        if failed_pages:
+            message = f"Result pages {failed_pages} for {location} failed after {page_retries + 1} attempts"
+            if raise_errors:
+                raise SearchError(message, properties[:max_results])
+            logger.error(message)
+        return properties[:max_results]
+    
     def get_property_details(self, property_url):
         """
         Get detailed information for a specific property.
@@ -353,12 +629,13 @@ class RealtorScraper:
             
         try:
             # Navigate to property page
-            self.driver.get(property_url)
+            self._get(property_url)
             
             # Wait for page to load
-            WebDriverWait(self.driver, 10).until(
+            self._wait(10,
                 EC.presence_of_element_located((By.CSS_SELECTOR, ".propertyDetailsSectionContent"))
             )
+            log_page_weight(self.driver, property_url)
             
             # Extract additional details
             details = {}
@@ -407,7 +684,8 @@ class RealtorScraper:
             logger.error(f"Error getting property details: {e}")
             return {}
 
-def scrape_realtor_listings(location="Ottawa, ON", max_properties=50, min_price=None, max_price=None, min_bedrooms=None):
+def scrape_realtor_listings(location="Ottawa, ON", max_properties=50, min_price=None, max_price=None, min_bedrooms=None,
+                            page_workers=1, trace_file=None):
     """
     Scrape real estate listings from Realtor.ca.
     
@@ -417,6 +695,10 @@ def scrape_realtor_listings(location="Ottawa, ON", max_properties=50, min_price=
         min_price (int): Minimum price
         max_price (int): Maximum price
         min_bedrooms (int): Minimum number of bedrooms
+        page_workers (int): Number of result pages to load concurrently; 1 keeps the
+            serial search-box and paginationNext flow
+        trace_file (str): Path to write a Chrome trace-event JSON of the session (optional);
+            a per-step timing summary is logged as well
         
     Returns:
         DataFrame: DataFrame with property listings
@@ -433,13 +715,23 @@ def scrape_realtor_listings(location="Ottawa, ON", max_properties=50, min_price=
     
     try:
         # Search for properties
-        properties = scraper.search_properties(
-            location=location,
-            min_price=min_price,
-            max_price=max_price,
-            min_bedrooms=min_bedrooms,
-            max_results=max_properties
-        )
+        if page_workers > 1:
+            properties = scraper.search_properties_parallel(
+                location=location,
+                min_price=min_price,
+                max_price=max_price,
+                min_bedrooms=min_bedrooms,
+                max_results=max_properties,
+                page_workers=page_workers
+            )
+        else:
+            properties = scraper.search_properties(
+                location=location,
+                min_price=min_price,
+                max_price=max_price,
+                min_bedrooms=min_bedrooms,
+                max_results=max_properties
+            )
         
         if not properties:
             logger.warning("No properties found")
@@ -477,6 +769,9 @@ def scrape_realtor_listings(location="Ottawa, ON", max_properties=50, min_price=
         return pd.DataFrame()
     finally:
         scraper.close()
+        if trace_file:
+            scraper.tracer.save_chrome_trace(trace_file)
+            scraper.tracer.log_summary()
 
 if __name__ == "__main__":
     # Configure logging
@@ -7,17 +7,30 @@ import time
 import logging
 from src.config import GOOGLE_MAPS_API_KEY, SCRAPE_DELAY, DEFAULT_DESTINATION
 from src.scrapers.base_scraper import BaseScraper
+from src.scrapers.distance_matrix import DistanceMatrixClient, DISTANCE_MATRIX_URL, commute_rows
+from src.commute_cache import get_default_cache
 
 logger = logging.getLogger(__name__)
 
 class CommuteTimeScraper(BaseScraper):
     """Scraper for Google Maps Distance Matrix API."""
     
-    def __init__(self, api_key=GOOGLE_MAPS_API_KEY, delay=SCRAPE_DELAY):
-        """Initialize the commute time scraper."""
+    def __init__(self, api_key=GOOGLE_MAPS_API_KEY, delay=SCRAPE_DELAY, use_cache=True, cache=None):
+        """
+        Initialize the commute time scraper.
+        
+        Args:
+            api_key (str): Google Maps API key
+            delay (int): Delay between requests in seconds
+            use_cache (bool): Whether to serve repeated routes from the commute cache
+            cache (CommuteCache): Cache to use (defaults to the shared persistent cache)
+        """
         super().__init__(delay=delay)
         self.api_key = api_key
-        self.base_url = "https://maps.googleapis.com/maps/api/distancematrix/json"
+        self.base_url = DISTANCE_MATRIX_URL
+        self.cache = (cache or get_default_cache()) if use_cache else None
+        self.client = DistanceMatrixClient(api_key=api_key, delay=delay, base_url=self.base_url,
+                                           use_cache=use_cache, cache=self.cache)
         
     def get_commute_time(self, origin, destination=DEFAULT_DESTINATION, mode="driving"):
         """
@@ -31,6 +44,11 @@ class CommuteTimeScraper(BaseScraper):
         Returns:
             dict: Dictionary with commute information
         """
+        if self.cache:
+            cached = self.cache.get(origin, destination, mode)
+            if cached:
+                return cached
+        
         params = {
             "origins": origin,
             "destinations": destination,
@@ -50,12 +68,15 @@ class CommuteTimeScraper(BaseScraper):
                 logger.error(f"Error for route: {element['status']}")
                 return {"text": "N/A", "value": None}
                 
-            return {
+            result = {
                 "text": element["duration"]["text"],
                 "value": element["duration"]["value"],  # in seconds
                 "distance_text": element["distance"]["text"],
                 "distance_value": element["distance"]["value"]  # in meters
             }
+            if self.cache:
+                self.cache.put(origin, destination, result, mode)
+            return result
         except (KeyError, IndexError) as e:
             logger.error(f"Error parsing Google Maps API response: {e}")
             return {"text": "N/A", "value": None}
@@ -64,6 +85,8 @@ class CommuteTimeScraper(BaseScraper):
         """
         Scrape commute times for multiple addresses.
         
+        Uses batched Distance Matrix requests (many origins per request).
+        
         Args:
             addresses (list): List of origin addresses
             destination (str): Destination address
@@ -72,21 +95,9 @@ class CommuteTimeScraper(BaseScraper):
         Returns:
             DataFrame: DataFrame with commute information
         """
-        results = []
-        for addr in addresses:
-            logger.info(f"Getting commute time from {addr} to {destination}")
-            commute = self.get_commute_time(addr, destination, mode)
-            
-            results.append({
-                "address": addr,
-                "commute_time_text": commute["text"],
-                "commute_time_seconds": commute["value"],
-                "distance_text": commute.get("distance_text", "N/A"),
-                "distance_value": commute.get("distance_value", None),
-                "mode": mode
-            })
-        
-        return pd.DataFrame(results)
+        logger.info(f"Getting commute times from {len(addresses)} addresses to {destination}")
+        results = self.client.get_commute_times(addresses, destination, mode)
+        return pd.DataFrame(commute_rows(addresses, results, mode))
 
 def scrape_commute_data(addresses, destination=DEFAULT_DESTINATION, mode="driving", api_key=GOOGLE_MAPS_API_KEY):
     """
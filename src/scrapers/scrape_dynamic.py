@@ -6,7 +6,6 @@ import pandas as pd
 import logging
 from bs4 import BeautifulSoup
 from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
@@ -18,6 +17,10 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
 from src.scrapers.base_scraper import BaseScraper
+from src.scrapers.extraction import default_listing_spec
+from src.scrapers.tracing import StepTracer
+from src.scrapers.driver_profile import build_chrome_options, enable_resource_blocking, log_page_weight
+from src.config import PAGE_LOAD_STRATEGY
 
 logger = logging.getLogger(__name__)
 
@@ -26,7 +29,9 @@ class DynamicScraper(BaseScraper):
     Scraper for dynamic websites using Selenium.
     """
     
-    def __init__(self, headless=True, delay=2, user_agent=None, chromedriver_path=None):
+    def __init__(self, headless=True, delay=2, user_agent=None, chromedriver_path=None,
+                 block_resources=True, blocked_url_patterns=None, page_load_strategy=PAGE_LOAD_STRATEGY,
+                 tracer=None):
         """
         Initialize the dynamic scraper.
         
@@ -35,37 +40,42 @@ class DynamicScraper(BaseScraper):
             delay (int): Delay between actions in seconds
             user_agent (str): Browser user agent
             chromedriver_path (str): Path to chromedriver binary
+            block_resources (bool): Whether to block fonts, stylesheets, map tiles, analytics and ads
+            blocked_url_patterns (list): URL patterns to block (defaults to BLOCKED_URL_PATTERNS)
+            page_load_strategy (str): Selenium page load strategy ('normal', 'eager', 'none')
+            tracer (StepTracer): Tracer recording step timings (a new one is created if omitted)
         """
         super().__init__(delay=delay, user_agent=user_agent)
         self.headless = headless
         self.chromedriver_path = chromedriver_path
+        self.block_resources = block_resources
+        self.blocked_url_patterns = blocked_url_patterns
+        self.page_load_strategy = page_load_strategy
+        self.tracer = tracer or StepTracer("DynamicScraper")
         self.driver = None
     
     def _setup_driver(self):
         """Set up Selenium webdriver."""
-        options = Options()
+        with self.tracer.span("driver_setup"):
+            options = build_chrome_options(
+                headless=self.headless,
+                user_agent=self.user_agent,
+                page_load_strategy=self.page_load_strategy
+            )
         
-        if self.headless:
-            options.add_argument("--headless")
-            
-        # Add user agent
-        if self.user_agent:
-            options.add_argument(f"user-agent={self.user_agent}")
-        
-        # Add additional options for stability
-        options.add_argument("--disable-gpu")
-        options.add_argument("--no-sandbox")
-        options.add_argument("--disable-dev-shm-usage")
+            # Initialize the driver with service if path is provided
+            if self.chromedriver_path:
+                service = Service(executable_path=self.chromedriver_path)
+                self.driver = webdriver.Chrome(service=service, options=options)
+            else:
+                self.driver = webdriver.Chrome(options=options)
         
-        # Initialize the driver with service if path is provided
-        if self.chromedriver_path:
-            service = Service(executable_path=self.chromedriver_path)
-            self.driver = webdriver.Chrome(service=service, options=options)
-        else:
-            self.driver = webdriver.Chrome(options=options)
+            # Block fonts, stylesheets, map tiles, analytics and ads
+            if self.block_resources:
+                enable_resource_blocking(self.driver, self.blocked_url_patterns)
             
-        # Set window size
-        self.driver.set_window_size(1920, 1080)
+            # Set window size
+            self.driver.set_window_size(1920, 1080)
     
     def load_page(self, url, wait_for_element=None, wait_time=10):
         """
@@ -83,13 +93,17 @@ class DynamicScraper(BaseScraper):
             self._setup_driver()
             
         try:
-            self.driver.get(url)
-            
-            if wait_for_element:
-                by, selector = wait_for_element
-                WebDriverWait(self.driver, wait_time).until(
-                    EC.presence_of_element_located((by, selector))
-                )
+            with self.tracer.span("page", url=url):
+                with self.tracer.span("get", url=url):
+                    self.driver.get(url)
+                
+                if wait_for_element:
+                    by, selector = wait_for_element
+                    with self.tracer.span("wait", selector=selector, timeout=wait_time):
+                        WebDriverWait(self.driver, wait_time).until(
+                            EC.presence_of_element_located((by, selector))
+                        )
+                log_page_weight(self.driver, url)
             return True
         except Exception as e:
             logger.error(f"Error loading page {url}: {e}")
@@ -132,13 +146,38 @@ class DynamicScraper(BaseScraper):
             return []
         return self.driver.find_elements(by, selector)
     
+    def extract(self, spec, backend="soup"):
+        """
+        Extract listings from the current page with a compiled spec.
+        
+        Args:
+            spec (ExtractionSpec): Compiled extraction spec
+            backend (str): 'soup' to parse the page source, 'browser' to run
+                the extraction inside the browser in a single script call
+            
+        Returns:
+            list: One dict per listing
+        """
+        if not self.driver:
+            return []
+        if backend not in ("soup", "browser"):
+            raise ValueError(f"Unknown extraction backend: {backend}")
+        with self.tracer.span("extract", backend=backend) as span_args:
+            if backend == "browser":
+                rows = spec.extract_browser(self.driver)
+            else:
+                rows = spec.extract_html(self.driver.page_source)
+            span_args["listings"] = len(rows)
+        return rows
+    
     def close(self):
         """Close the webdriver."""
         if self.driver:
             self.driver.quit()
             self.driver = None
 
-def scrape_dynamic_content(url, element_class="listing", wait_time=10):
+def scrape_dynamic_content(url, element_class="listing", wait_time=10, spec=None, backend="soup",
+                           trace_file=None):
     """
     Convenience function to scrape a dynamic website.
     
@@ -146,36 +185,26 @@ def scrape_dynamic_content(url, element_class="listing", wait_time=10):
         url (str): URL to scrape
         element_class (str): CSS class of elements to extract
         wait_time (int): Time to wait for page to load
+        spec (ExtractionSpec): Compiled extraction spec (defaults to price and
+            year built inside div.<element_class>)
+        backend (str): 'soup' to parse the page source, 'browser' to extract in the browser
+        trace_file (str): Path to write a Chrome trace-event JSON of the session (optional);
+            a per-step timing summary is logged as well
         
     Returns:
         DataFrame: Scraped data
     """
     scraper = DynamicScraper(headless=True)
+    spec = spec or default_listing_spec(element_class)
     
     try:
         # Load the page and wait for listings to appear
-        scraper.load_page(url, wait_for_element=(By.CLASS_NAME, element_class), wait_time=wait_time)
-        
-        # Get the page content with BeautifulSoup
-        soup = scraper.parse_with_soup()
-        if not soup:
-            return pd.DataFrame()
-        
-        # Find all listing elements
-        listings = soup.find_all("div", class_=element_class)
-        
-        data = []
-        for listing in listings:
-            # Extract data from each listing - replace these selectors with actual ones
-            price = listing.find("span", class_="price").get_text(strip=True) if listing.find("span", class_="price") else "N/A"
-            year_built = listing.find("span", class_="year-built").get_text(strip=True) if listing.find("span", class_="year-built") else "N/A"
-            
-            data.append({
-                "price": price,
-                "year_built": year_built
-            })
+        scraper.load_page(url, wait_for_element=(By.CSS_SELECTOR, spec.item_selector), wait_time=wait_time)
         
-        return pd.DataFrame(data)
+        return pd.DataFrame(scraper.extract(spec, backend=backend))
     finally:
         # Always close the browser
-        scraper.close()
\ No newline at end of file
+        scraper.close()
+        if trace_file:
+            scraper.tracer.save_chrome_trace(trace_file)
+            scraper.tracer.log_summary()
\ No newline at end of file
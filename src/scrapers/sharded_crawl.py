@@ -0,0 +1,246 @@
+"""
+Sharded Realtor.ca crawl across many locations and filter sets.
+
+Each (location, filter set) pair is a shard. Shards run in a process pool with
+one headless Chrome driver per worker, and their listings are streamed into a
+single combined CSV as they finish, skipping listings an earlier shard already
+wrote. A failing shard is logged and recorded in the summary without stopping
+the others.
+"""
+import os
+import sys
+import time
+import argparse
+import logging
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# Add the parent directory to sys.path to allow for import
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.scrapers.realtor_scraper import RealtorScraper, SearchError, listing_key
+
+logger = logging.getLogger(__name__)
+
+FILTER_KEYS = ("min_price", "max_price", "min_bedrooms")
+
+SUMMARY_COLUMNS = ["shard_id", "location", *FILTER_KEYS, "listings", "elapsed_seconds", "error"]
+
+def build_shards(locations, filter_sets=None, max_properties=50, page_workers=1):
+    """
+    Build one shard per (location, filter set) pair.
+
+    Args:
+        locations (list): Locations to search in
+        filter_sets (list): Dicts with optional min_price, max_price and min_bedrooms
+            (defaults to a single unfiltered search per location)
+        max_properties (int): Maximum number of properties per shard
+        page_workers (int): Result pages each shard loads concurrently
+
+    Returns:
+        list: Shard dictionaries
+    """
+    filter_sets = filter_sets or [{}]
+    shards = []
+    for location in locations:
+        for filters in filter_sets:
+            shards.append({
+                "shard_id": len(shards),
+                "location": location,
+                "filters": {key: filters.get(key) for key in FILTER_KEYS},
+                "max_properties": max_properties,
+                "page_workers": page_workers
+            })
+    return shards
+
+def crawl_shard(shard):
+    """
+    Crawl a single shard in its own headless browser.
+
+    Runs inside a worker process, so every exception is caught and returned
+    with the shard instead of being raised. The search is asked to raise its
+    errors rather than swallow them, so a failed search is reported as a
+    failed shard; listings found before a failure are kept.
+
+    Args:
+        shard (dict): Shard from build_shards
+
+    Returns:
+        dict: Shard result with properties, error and elapsed time
+    """
+    start = time.time()
+    scraper = RealtorScraper(headless=True)
+    properties = []
+    error = None
+
+    try:
+        if shard["page_workers"] > 1:
+            properties = scraper.search_properties_parallel(
+                location=shard["location"],
+                max_results=shard["max_properties"],
+                page_workers=shard["page_workers"],
+                raise_errors=True,
+                **shard["filters"]
+            )
+        else:
+            properties = scraper.search_properties(
+                location=shard["location"],
+                max_results=shard["max_properties"],
+                raise_errors=True,
+                **shard["filters"]
+            )
+        properties = properties or []
+    except SearchError as e:
+        properties = e.properties
+        error = f"{type(e).__name__}: {e}"
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    finally:
+        try:
+            scraper.close()
+        except Exception:
+            pass
+
+    return {
+        "shard_id": shard["shard_id"],
+        "properties": properties,
+        "error": error,
+        "elapsed": time.time() - start
+    }
+
+def _shard_rows(shard, properties):
+    """Tag each property with the shard it came from."""
+    rows = []
+    for property_dict in properties:
+        row = dict(property_dict)
+        row["shard_id"] = shard["shard_id"]
+        row["search_location"] = shard["location"]
+        for key in FILTER_KEYS:
+            row[f"search_{key}"] = shard["filters"][key]
+        rows.append(row)
+    return rows
+
+def run_sharded_crawl(locations, filter_sets=None, max_properties=50, processes=None,
+                      output_file=None, page_workers=1):
+    """
+    Crawl many locations and filter sets in a process pool.
+
+    Args:
+        locations (list): Locations to search in
+        filter_sets (list): Dicts with optional min_price, max_price and min_bedrooms
+        max_properties (int): Maximum number of properties per shard
+        processes (int): Number of worker processes (defaults to the CPU count)
+        output_file (str): CSV file that listings are appended to as shards finish (optional)
+        page_workers (int): Result pages each shard loads concurrently
+
+    Listings that an earlier shard already returned are dropped as each shard
+    finishes, so the CSV and the returned listings hold the same rows. The
+    summary counts each shard's listings before de-duplication.
+
+    Returns:
+        tuple: (listings DataFrame de-duplicated across shards, per-shard summary DataFrame)
+    """
+    shards = build_shards(locations, filter_sets, max_properties, page_workers)
+    shards_by_id = {shard["shard_id"]: shard for shard in shards}
+    logger.info(f"Crawling {len(shards)} shards with {processes or os.cpu_count()} processes")
+
+    if output_file:
+        os.makedirs(os.path.dirname(output_file) or ".", exist_ok=True)
+        if os.path.exists(output_file):
+            os.remove(output_file)
+
+    all_rows = []
+    seen = set()
+    summary = []
+    header_written = False
+
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        futures = {executor.submit(crawl_shard, shard): shard["shard_id"] for shard in shards}
+
+        for done, future in enumerate(as_completed(futures), start=1):
+            shard = shards_by_id[futures[future]]
+            try:
+                result = future.result()
+            except Exception as e:
+                # The worker process itself died; the shard is lost but the crawl goes on
+                result = {"shard_id": shard["shard_id"], "properties": [],
+                          "error": f"{type(e).__name__}: {e}", "elapsed": None}
+
+            rows = _shard_rows(shard, result["properties"])
+            if result["error"]:
+                logger.error(f"[{done}/{len(shards)}] Shard {shard['shard_id']} "
+                             f"({shard['location']}) failed: {result['error']}")
+            else:
+                logger.info(f"[{done}/{len(shards)}] Shard {shard['shard_id']} "
+                            f"({shard['location']}): {len(rows)} listings in {result['elapsed']:.1f}s")
+
+            # The same listing can show up in overlapping locations; keep its first shard's row
+            new_rows = []
+            for row in rows:
+                key = listing_key(row)
+                if key not in seen:
+                    seen.add(key)
+                    new_rows.append(row)
+
+            # Stream each finished shard straight to disk
+            if output_file and new_rows:
+                pd.DataFrame(new_rows).to_csv(output_file, mode="a", header=not header_written, index=False)
+                header_written = True
+
+            all_rows.extend(new_rows)
+            summary.append({
+                "shard_id": shard["shard_id"],
+                "location": shard["location"],
+                **shard["filters"],
+                "listings": len(rows),
+                "elapsed_seconds": result["elapsed"],
+                "error": result["error"]
+            })
+
+    listings_df = pd.DataFrame(all_rows)
+    summary_df = pd.DataFrame(summary, columns=SUMMARY_COLUMNS).sort_values("shard_id").reset_index(drop=True)
+    failed = summary_df["error"].notna().sum()
+    logger.info(f"Crawl finished: {len(listings_df)} unique listings, {failed}/{len(shards)} shards failed")
+
+    return listings_df, summary_df
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Sharded Realtor.ca crawl")
+    parser.add_argument("locations", nargs="+",
+                      help="Locations to search in, e.g. 'Kanata, ON'")
+    parser.add_argument("--max-listings", type=int, default=50,
+                      help="Maximum number of listings per shard")
+    parser.add_argument("--processes", type=int,
+                      help="Number of worker processes (default: CPU count)")
+    parser.add_argument("--page-workers", type=int, default=1,
+                      help="Result pages each shard loads concurrently")
+    parser.add_argument("--min-price", type=int, nargs="*", default=[None],
+                      help="Minimum prices; one shard per value")
+    parser.add_argument("--max-price", type=int,
+                      help="Maximum price for every shard")
+    parser.add_argument("--min-bedrooms", type=int,
+                      help="Minimum bedrooms for every shard")
+    parser.add_argument("--output", type=str, default="data/raw/realtor_crawl.csv",
+                      help="Combined output CSV")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO,
+                       format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    args = parse_args()
+    filter_sets = [
+        {"min_price": min_price, "max_price": args.max_price, "min_bedrooms": args.min_bedrooms}
+        for min_price in args.min_price
+    ]
+    listings_df, summary_df = run_sharded_crawl(
+        args.locations,
+        filter_sets,
+        max_properties=args.max_listings,
+        processes=args.processes,
+        output_file=args.output,
+        page_workers=args.page_workers
+    )
+    print(summary_df)
+    print(f"Found {len(listings_df)} unique listings")
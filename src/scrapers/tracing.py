@@ -0,0 +1,132 @@
+"""
+Step-level timing for scraping sessions.
+
+A StepTracer records a span for every step of a session (driver setup,
+navigation, waits, extraction, pages). Spans can be exported as Chrome
+trace-event JSON (open in chrome://tracing or https://ui.perfetto.dev) and
+summarised per step.
+"""
+import json
+import os
+import threading
+import time
+import logging
+from contextlib import contextmanager
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+class StepTracer:
+    """Collects timed spans for the steps of a scraping session."""
+
+    def __init__(self, name="scraper"):
+        """
+        Initialize the tracer.
+
+        Args:
+            name (str): Process name shown in the trace viewer
+        """
+        self.name = name
+        self.spans = []
+        self._origin = time.perf_counter()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, step, **args):
+        """
+        Time a step.
+
+        Args:
+            step (str): Step name, e.g. 'driver_setup', 'get', 'wait', 'extract', 'page'
+            **args: Extra details stored with the span (URL, selector, page number)
+
+        Yields:
+            dict: The span's args, so callers can add details while it runs
+        """
+        start = time.perf_counter()
+        error = None
+        try:
+            yield args
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            end = time.perf_counter()
+            if error:
+                args["error"] = error
+            with self._lock:
+                self.spans.append({
+                    "step": step,
+                    "start": start - self._origin,
+                    "duration": end - start,
+                    "thread": threading.get_ident(),
+                    "args": args
+                })
+
+    def to_chrome_trace(self):
+        """
+        Convert the spans to Chrome trace-event format.
+
+        Returns:
+            dict: Trace with complete ('X') events in microseconds
+        """
+        pid = os.getpid()
+        events = [{
+            "name": "process_name", "ph": "M", "pid": pid, "tid": 0,
+            "args": {"name": self.name}
+        }]
+        for span in self.spans:
+            events.append({
+                "name": span["step"],
+                "cat": "scraper",
+                "ph": "X",
+                "ts": round(span["start"] * 1e6, 3),
+                "dur": round(span["duration"] * 1e6, 3),
+                "pid": pid,
+                "tid": span["thread"],
+                "args": {key: str(value) for key, value in span["args"].items()}
+            })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def save_chrome_trace(self, filename):
+        """
+        Write the spans as a Chrome trace-event JSON file.
+
+        Args:
+            filename (str): Output path
+
+        Returns:
+            str: Path to the saved file
+        """
+        os.makedirs(os.path.dirname(filename) or ".", exist_ok=True)
+        with open(filename, "w", encoding="utf-8") as f:
+            json.dump(self.to_chrome_trace(), f)
+        logger.info(f"Trace saved to {filename}")
+        return filename
+
+    def summary(self):
+        """
+        Summarise time spent per step.
+
+        Returns:
+            DataFrame: One row per step with count, total, mean and max seconds
+            and the share of the session's wall time, slowest step first
+        """
+        if not self.spans:
+            return pd.DataFrame(columns=["step", "count", "total_s", "mean_s", "max_s", "share"])
+
+        df = pd.DataFrame({
+            "step": [span["step"] for span in self.spans],
+            "duration": [span["duration"] for span in self.spans]
+        })
+        summary = df.groupby("step")["duration"].agg(["count", "sum", "mean", "max"]).reset_index()
+        summary.columns = ["step", "count", "total_s", "mean_s", "max_s"]
+        # Spans nest (a page contains its waits), so shares are of wall time, not of the sum
+        wall_time = max(span["start"] + span["duration"] for span in self.spans) - min(
+            span["start"] for span in self.spans)
+        summary["share"] = summary["total_s"] / wall_time if wall_time else 0.0
+        return summary.sort_values("total_s", ascending=False).reset_index(drop=True)
+
+    def log_summary(self):
+        """Log the per-step summary table."""
+        logger.info("Step timing summary:\n" + self.summary().to_string(index=False, float_format="%.3f"))
@@ -0,0 +1,366 @@
+"""
+Uniform grid index for radius queries over points.
+
+Points are projected to meters around the mean latitude, bucketed into
+square cells and sorted by cell id, so the points of a cell are one slice of
+the sorted arrays. A radius query scans only the slices of the cells under
+the query's bounding box and checks exact great-circle distances on those
+candidates with NumPy.
+
+Points can carry a day number (e.g. the reported date). Within a cell they
+are then sorted by day, and each point gets the sort key
+cell * day_span + day offset, so the points of a cell inside a date window
+are also one slice, found by binary search on the keys.
+
+Run this module to benchmark the index against a linear scan.
+"""
+import json
+import math
+import os
+import time
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_M = 6371000
+
+# Batch queries within this radius settle most candidates with planar distances, which are
+# within PLANAR_TOLERANCE of great-circle distances at that scale; only candidates that close
+# to the radius get an exact great-circle check
+PLANAR_MAX_RADIUS_M = 50000
+PLANAR_TOLERANCE = 0.01
+
+# Arrays and scalar attributes of a GridIndex written by save()
+INDEX_ARRAYS = ("keys", "positions", "lats", "lons")
+INDEX_SCALARS = ("cell_meters", "lat0", "cos0", "x_min", "y_min", "n_cols", "n_rows",
+                 "has_days", "day_min", "day_span")
+
+def haversine_to_point(lats, lons, lat, lon):
+    """
+    Great-circle distances from many points to one point.
+
+    Args:
+        lats, lons (ndarray): Point coordinates in decimal degrees
+        lat, lon (float or ndarray): Query coordinates in decimal degrees; arrays
+            of the same shape as lats give pairwise distances
+
+    Returns:
+        ndarray: Distances in meters
+    """
+    phi1, phi2 = np.radians(lats), np.radians(lat)
+    a = (np.sin((phi2 - phi1) / 2) ** 2
+         + np.cos(phi1) * np.cos(phi2) * np.sin(np.radians(lon - lons) / 2) ** 2)
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+class GridIndex:
+    """Points bucketed into a uniform grid of projected cells."""
+
+    def __init__(self, lats, lons, cell_meters=500, days=None, missing_day=None):
+        """
+        Build the index.
+
+        Args:
+            lats, lons (array-like): Point coordinates; points with NaN are left out
+            cell_meters (float): Side of a grid cell
+            days (array-like): Integer day number per point, for date-window queries (optional)
+            missing_day (int): Value of days marking an unknown day; such points
+                never match a date window
+        """
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        valid = np.isfinite(lats) & np.isfinite(lons)
+        positions = np.flatnonzero(valid)
+
+        self.cell_meters = float(cell_meters)
+        self.lat0 = float(lats[valid].mean()) if len(positions) else 0.0
+        self.cos0 = math.cos(math.radians(self.lat0))
+
+        x, y = self._project(lats[valid], lons[valid])
+        self.x_min = float(x.min()) if len(positions) else 0.0
+        self.y_min = float(y.min()) if len(positions) else 0.0
+        cx = ((x - self.x_min) // self.cell_meters).astype(np.int64)
+        cy = ((y - self.y_min) // self.cell_meters).astype(np.int64)
+        self.n_cols = int(cx.max()) + 1 if len(positions) else 1
+        self.n_rows = int(cy.max()) + 1 if len(positions) else 1
+
+        cells = cy * self.n_cols + cx
+        # Offset of each point's day within its cell's key range; 0 is an unknown day
+        self.has_days = days is not None
+        offsets = np.zeros(len(positions), dtype=np.int64)
+        self.day_min, self.day_span = 0, 1
+        if self.has_days:
+            days = np.asarray(days, dtype=np.int64)[valid]
+            known = days != missing_day if missing_day is not None else np.ones(len(days), dtype=bool)
+            if known.any():
+                self.day_min = int(days[known].min())
+                self.day_span = int(days[known].max()) - self.day_min + 2
+                offsets[known] = days[known] - self.day_min + 1
+
+        self.keys = cells * self.day_span + offsets
+        order = np.argsort(self.keys, kind="stable")
+        self.keys = self.keys[order]
+        self.positions = positions[order]
+        self.lats = lats[valid][order]
+        self.lons = lons[valid][order]
+
+    def __len__(self):
+        return len(self.positions)
+
+    def save(self, directory, **extra):
+        """
+        Write the index as .npy arrays plus meta.json, for memory-mapped loading.
+
+        Args:
+            directory (str): Target directory
+            **extra: Additional values stored in meta.json (e.g. what the index was built from)
+
+        Returns:
+            str: The directory
+        """
+        os.makedirs(directory, exist_ok=True)
+        for name in INDEX_ARRAYS:
+            np.save(os.path.join(directory, f"{name}.npy"), getattr(self, name))
+        meta = {name: getattr(self, name) for name in INDEX_SCALARS}
+        meta.update(extra)
+        # Replace meta.json last so a reader never pairs it with partly written arrays
+        temp_path = os.path.join(directory, "meta.json.tmp")
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(temp_path, os.path.join(directory, "meta.json"))
+        return directory
+
+    @staticmethod
+    def saved_meta(directory):
+        """meta.json of an index saved in a directory, or None if there is none."""
+        path = os.path.join(directory, "meta.json")
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    @classmethod
+    def load(cls, directory, mmap_mode="r"):
+        """
+        Open an index written by save().
+
+        With the default mmap_mode the arrays are memory-mapped, so processes
+        opening the same index share its pages instead of copying them.
+
+        Args:
+            directory (str): Index directory
+            mmap_mode (str): numpy mmap mode, or None to read the arrays into memory
+
+        Returns:
+            GridIndex: The index
+        """
+        index = cls.__new__(cls)
+        for name, value in cls.saved_meta(directory).items():
+            if name in INDEX_SCALARS:
+                setattr(index, name, value)
+        for name in INDEX_ARRAYS:
+            setattr(index, name, np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode))
+        return index
+
+    def _project(self, lats, lons):
+        """Equirectangular projection to meters around the mean latitude."""
+        x = np.radians(lons) * EARTH_RADIUS_M * self.cos0
+        y = np.radians(lats) * EARTH_RADIUS_M
+        return x, y
+
+    def _day_offsets(self, since, until):
+        """Key offsets (low, high) within a cell covering days since..until, both inclusive."""
+        if not self.has_days:
+            raise ValueError("Date windows need an index built with days")
+        low = 1 if since is None else min(max(since - self.day_min + 1, 1), self.day_span)
+        high = self.day_span - 1 if until is None else min(until - self.day_min + 1, self.day_span - 1)
+        return low, high
+
+    def _candidates(self, lat, lon, radius_m, since=None, until=None):
+        """
+        Sorted-array positions of the points in cells under the query's bounding
+        box, restricted to days since..until (inclusive) when either is given.
+        """
+        if not len(self.positions):
+            return np.empty(0, dtype=np.int64)
+        lat_deg = math.degrees(radius_m / EARTH_RADIUS_M)
+        # Widest longitude span of a great circle of this radius around the query
+        ratio = math.sin(radius_m / EARTH_RADIUS_M) / max(math.cos(math.radians(lat)), 1e-12)
+        lon_deg = 180.0 if ratio >= 1 else math.degrees(math.asin(ratio))
+
+        x0, y0 = self._project(lat - lat_deg, lon - lon_deg)
+        x1, y1 = self._project(lat + lat_deg, lon + lon_deg)
+        col0 = max(0, int((x0 - self.x_min) // self.cell_meters))
+        col1 = min(self.n_cols - 1, int((x1 - self.x_min) // self.cell_meters))
+        row0 = max(0, int((y0 - self.y_min) // self.cell_meters))
+        row1 = min(self.n_rows - 1, int((y1 - self.y_min) // self.cell_meters))
+        if col0 > col1 or row0 > row1:
+            return np.empty(0, dtype=np.int64)
+
+        rows = np.arange(row0, row1 + 1) * self.n_cols
+        if since is None and until is None:
+            # The cells of one grid row are contiguous in the sorted keys
+            starts = np.searchsorted(self.keys, (rows + col0) * self.day_span, side="left")
+            ends = np.searchsorted(self.keys, (rows + col1 + 1) * self.day_span, side="left")
+        else:
+            # Within a cell the keys are sorted by day: one binary search per cell and bound
+            low, high = self._day_offsets(since, until)
+            if low > high:
+                return np.empty(0, dtype=np.int64)
+            cells = (rows[:, None] + np.arange(col0, col1 + 1)[None, :]).ravel() * self.day_span
+            starts = np.searchsorted(self.keys, cells + low, side="left")
+            ends = np.searchsorted(self.keys, cells + high, side="right")
+        slices = [np.arange(s, e) for s, e in zip(starts, ends) if e > s]
+        return np.concatenate(slices) if slices else np.empty(0, dtype=np.int64)
+
+    def query_radius(self, lat, lon, radius_m, since=None, until=None):
+        """
+        Find the points within a radius of a location.
+
+        Args:
+            lat, lon (float): Query coordinates in decimal degrees
+            radius_m (float): Radius in meters
+            since, until (int): Only points whose day is in this inclusive range
+                (optional; either bound may be left open)
+
+        Returns:
+            ndarray: Positions of the matching points in the arrays given to the
+            constructor, in ascending order
+        """
+        candidates = self._candidates(lat, lon, radius_m, since, until)
+        if not len(candidates):
+            return candidates
+        distances = haversine_to_point(self.lats[candidates], self.lons[candidates], lat, lon)
+        return np.sort(self.positions[candidates[distances <= radius_m]])
+
+    def query_pairs(self, lats, lons, radius_m, since=None, until=None):
+        """
+        Find every (query, point) pair within a radius, for many queries at once.
+
+        Candidates of all queries are gathered first and their distances are
+        computed in a single vectorized pass.
+
+        Args:
+            lats, lons (array-like): Query coordinates; NaN queries match nothing
+            radius_m (float): Radius in meters
+            since, until (int): Only points whose day is in this inclusive range
+
+        Returns:
+            tuple: (query_ids, positions) arrays of equal length; positions refer
+            to the arrays given to the constructor
+        """
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        query_ids, candidates = [], []
+        for q in np.flatnonzero(np.isfinite(lats) & np.isfinite(lons)):
+            found = self._candidates(lats[q], lons[q], radius_m, since, until)
+            query_ids.append(np.full(len(found), q, dtype=np.int64))
+            candidates.append(found)
+        if not candidates:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+        query_ids = np.concatenate(query_ids)
+        candidates = np.concatenate(candidates)
+        if radius_m > PLANAR_MAX_RADIUS_M:
+            distances = haversine_to_point(self.lats[candidates], self.lons[candidates],
+                                           lats[query_ids], lons[query_ids])
+            within = distances <= radius_m
+            return query_ids[within], self.positions[candidates[within]]
+
+        # Planar distances (in radians) with each query's own longitude scale
+        scale = np.cos(np.radians(lats))
+        dy = np.radians(self.lats[candidates] - lats[query_ids])
+        dx = np.radians(self.lons[candidates] - lons[query_ids]) * scale[query_ids]
+        planar = dx * dx + dy * dy
+        radius = radius_m / EARTH_RADIUS_M
+        within = planar <= (radius * (1 - PLANAR_TOLERANCE)) ** 2
+        edge = np.flatnonzero(~within & (planar <= (radius * (1 + PLANAR_TOLERANCE)) ** 2))
+        edge_ids, edge_candidates = query_ids[edge], candidates[edge]
+        within[edge] = haversine_to_point(self.lats[edge_candidates], self.lons[edge_candidates],
+                                          lats[edge_ids], lons[edge_ids]) <= radius_m
+        return query_ids[within], self.positions[candidates[within]]
+
+    def query_radius_many(self, lats, lons, radius_m, since=None, until=None):
+        """
+        Find the points within a radius of each of many locations.
+
+        Args:
+            lats, lons (array-like): Query coordinates; NaN queries match nothing
+            radius_m (float): Radius in meters
+            since, until (int): Only points whose day is in this inclusive range
+
+        Returns:
+            list: One array of point positions per query
+        """
+        empty = np.empty(0, dtype=np.int64)
+        return [
+            self.query_radius(lat, lon, radius_m, since, until) if np.isfinite(lat) and np.isfinite(lon) else empty
+            for lat, lon in zip(np.asarray(lats, dtype=np.float64), np.asarray(lons, dtype=np.float64))
+        ]
+
+def _linear_scan(lats, lons, lat, lon, radius_m):
+    """Reference query: bounding box and scalar haversine over every point."""
+    from src.crime_data_api import haversine_distance
+    lat_deg = radius_m / 1000 / 111
+    lon_deg = radius_m / 1000 / (111 * abs(math.cos(math.radians(lat))))
+    found = []
+    for i, (crime_lat, crime_lon) in enumerate(zip(lats, lons)):
+        if lat - lat_deg <= crime_lat <= lat + lat_deg and lon - lon_deg <= crime_lon <= lon + lon_deg:
+            if haversine_distance(lat, lon, crime_lat, crime_lon) <= radius_m:
+                found.append(i)
+    return found
+
+def benchmark(n_points=100000, n_queries=1000, radius_m=1000, cell_meters=500, seed=0):
+    """
+    Time single and batch radius queries against a linear scan.
+
+    Points and queries are drawn uniformly over an Ottawa-sized area.
+
+    Returns:
+        dict: Timings in seconds
+    """
+    rng = np.random.default_rng(seed)
+    lats = rng.uniform(45.2, 45.5, n_points).tolist()
+    lons = rng.uniform(-76.0, -75.5, n_points).tolist()
+    q_lats = rng.uniform(45.2, 45.5, n_queries)
+    q_lons = rng.uniform(-76.0, -75.5, n_queries)
+
+    start = time.perf_counter()
+    index = GridIndex(lats, lons, cell_meters)
+    build = time.perf_counter() - start
+
+    # The linear scan is slow, so time a sample of queries and extrapolate
+    sample = min(n_queries, 20)
+    start = time.perf_counter()
+    expected = [_linear_scan(lats, lons, q_lats[i], q_lons[i], radius_m) for i in range(sample)]
+    linear_single = (time.perf_counter() - start) / sample
+
+    start = time.perf_counter()
+    got = [index.query_radius(q_lats[i], q_lons[i], radius_m) for i in range(sample)]
+    index_single = (time.perf_counter() - start) / sample
+    assert all(list(g) == e for g, e in zip(got, expected)), "index and linear scan disagree"
+
+    start = time.perf_counter()
+    index.query_radius_many(q_lats, q_lons, radius_m)
+    index_batch = time.perf_counter() - start
+
+    start = time.perf_counter()
+    index.query_pairs(q_lats, q_lons, radius_m)
+    index_pairs = time.perf_counter() - start
+
+    results = {
+        "build_s": build,
+        "linear_single_s": linear_single,
+        "index_single_s": index_single,
+        "linear_batch_s (extrapolated)": linear_single * n_queries,
+        "index_batch_s": index_batch,
+        "index_pairs_s": index_pairs,
+    }
+    print(f"{n_points} points, {n_queries} queries, radius {radius_m} m, cells {cell_meters} m")
+    for name, value in results.items():
+        print(f"  {name:32s} {value * 1000:10.3f} ms")
+    print(f"  speedup (single query)           {linear_single / index_single:10.1f}x")
+    return results
+
+if __name__ == "__main__":
+    benchmark()